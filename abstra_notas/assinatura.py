@@ -4,13 +4,43 @@ from cryptography.hazmat.primitives.serialization.pkcs12 import (
     load_key_and_certificates,
 )
 from cryptography.hazmat.backends import default_backend
+from collections import OrderedDict
+from copy import deepcopy
+from hashlib import sha256
 from pathlib import Path
 from tempfile import NamedTemporaryFile
-from lxml.etree import tostring, fromstring, ElementBase
+from threading import Lock
+from typing import Optional, Tuple, Union
+from lxml.etree import Element, QName, SubElement, tostring, fromstring, ElementBase
+import base64
 import xmlsec
 
+NS_XMLDSIG = {"ds": "http://www.w3.org/2000/09/xmldsig#"}
+
+
+def c14n_inclusiva(elemento: ElementBase) -> bytes:
+    """
+    Forma canônica (C14N inclusiva) de `elemento` como subconjunto do seu
+    documento, com os namespaces herdados declarados nele.
+
+    O lxml só canonicaliza corretamente documentos inteiros, por isso o
+    elemento é copiado como raiz de um novo documento.
+    """
+    copia = Element(elemento.tag, elemento.attrib, nsmap=elemento.nsmap)
+    copia.text = elemento.text
+    copia.extend(deepcopy(filho) for filho in elemento)
+    return tostring(copia, method="c14n")
+
 
 class Assinador:
+    """
+    Assina XMLs e dados com o certificado de um arquivo PFX.
+
+    A chave e o certificado são lidos uma única vez, na criação do assinador,
+    e reaproveitados em todas as assinaturas. O mesmo assinador pode ser usado
+    por várias threads.
+    """
+
     pfx_path: Path
     pfx_password: str
     cert_pem_bytes: bytes
@@ -42,6 +72,18 @@ class Assinador:
         self.cert_pem_bytes = cert_pem
         self.private_key_pem_bytes = private_key_pem
 
+        self._private_key = private_key
+        self._certificado_base64 = base64.b64encode(
+            certificate.public_bytes(serialization.Encoding.DER)
+        ).decode("ascii")
+        self._xmlsec_key = xmlsec.Key.from_memory(
+            private_key_pem, format=xmlsec.constants.KeyDataFormatPem
+        )
+        self._xmlsec_key.load_cert_from_memory(
+            cert_pem, xmlsec.constants.KeyDataFormatPem
+        )
+        self._xmlsec_lock = Lock()
+
     @property
     def cert_pem_file(self):
         file = NamedTemporaryFile()
@@ -56,13 +98,16 @@ class Assinador:
         file.seek(0)
         return file
 
-    def assinar_xml(self, element: ElementBase) -> ElementBase:
-        element = fromstring(tostring(element, encoding=str))
-        key = xmlsec.Key.from_memory(
-            self.private_key_pem_bytes,
-            format=xmlsec.constants.KeyDataFormatPem,
-            password=self.pfx_password,
-        )
+    def assinar_xml(self, element: ElementBase, copiar: bool = True) -> ElementBase:
+        """
+        Adiciona a assinatura XMLDSig envelopada ao documento.
+
+        :param copiar: Se o documento deve ser copiado antes da assinatura.
+            Quando falso, a assinatura é adicionada ao próprio `element`, que
+            deve ser a raiz do documento.
+        """
+        if copiar:
+            element = fromstring(tostring(element, encoding=str))
         signature_node: ElementBase = xmlsec.template.create(
             element,
             c14n_method=xmlsec.constants.TransformInclC14N,
@@ -77,21 +122,67 @@ class Assinador:
         key_info = xmlsec.template.ensure_key_info(signature_node)
         xmlsec.template.add_x509_data(key_info)
         ctx = xmlsec.SignatureContext()
-        ctx.key = key
-        ctx.key.load_cert_from_memory(
-            self.cert_pem_bytes, xmlsec.constants.KeyDataFormatPem
-        )
+        # O contexto recebe uma cópia da chave; a cópia é feita sob lock para
+        # que várias threads possam assinar com o mesmo assinador.
+        with self._xmlsec_lock:
+            ctx.key = self._xmlsec_key
         ctx.sign(signature_node)
         return element
 
-    def assinar_bytes_rsa_sh1(self, data: bytes) -> bytes:
-        private_key = serialization.load_pem_private_key(
-            self.private_key_pem_bytes,
-            password=None,
-            backend=default_backend(),
+    def assinatura_xml(self, raiz: ElementBase, digest: bytes) -> ElementBase:
+        """
+        Monta a assinatura XMLDSig envelopada, com os mesmos algoritmos de
+        `assinar_xml`, para um documento que não está em memória, a partir do
+        SHA1 da sua forma canônica (C14N).
+
+        :param raiz: Elemento raiz do documento, sem filhos, que recebe a
+            assinatura. Define os namespaces usados na canonicalização.
+        :param digest: SHA1 do documento canônico, sem a assinatura.
+        """
+        ds = NS_XMLDSIG["ds"]
+        signature_node = SubElement(raiz, QName(ds, "Signature"), nsmap={None: ds})
+        signed_info = SubElement(signature_node, QName(ds, "SignedInfo"))
+        SubElement(
+            signed_info,
+            QName(ds, "CanonicalizationMethod"),
+            Algorithm=xmlsec.constants.TransformInclC14N.href,
+        )
+        SubElement(
+            signed_info,
+            QName(ds, "SignatureMethod"),
+            Algorithm=xmlsec.constants.TransformRsaSha1.href,
         )
+        reference = SubElement(signed_info, QName(ds, "Reference"), URI="")
+        transforms = SubElement(reference, QName(ds, "Transforms"))
+        for transform in (
+            xmlsec.constants.TransformEnveloped,
+            xmlsec.constants.TransformInclC14N,
+        ):
+            SubElement(transforms, QName(ds, "Transform"), Algorithm=transform.href)
+        SubElement(
+            reference,
+            QName(ds, "DigestMethod"),
+            Algorithm=xmlsec.constants.TransformSha1.href,
+        )
+        SubElement(reference, QName(ds, "DigestValue")).text = base64.b64encode(
+            digest
+        ).decode("ascii")
+
+        SubElement(signature_node, QName(ds, "SignatureValue")).text = (
+            base64.b64encode(
+                self.assinar_bytes_rsa_sh1(c14n_inclusiva(signed_info))
+            ).decode("ascii")
+        )
+        x509_data = SubElement(
+            SubElement(signature_node, QName(ds, "KeyInfo")), QName(ds, "X509Data")
+        )
+        SubElement(x509_data, QName(ds, "X509Certificate")).text = (
+            self._certificado_base64
+        )
+        return signature_node
 
-        signature = private_key.sign(
+    def assinar_bytes_rsa_sh1(self, data: bytes) -> bytes:
+        signature = self._private_key.sign(
             data,
             padding.PKCS1v15(),
             hashes.SHA1(),
@@ -99,8 +190,79 @@ class Assinador:
         return signature
 
 
+class RegistroAssinadores:
+    """
+    Cache LRU de assinadores já carregados, para não decodificar o mesmo PFX a
+    cada operação.
+
+    Os assinadores são identificados pelo caminho do PFX, pela data de
+    modificação do arquivo e por um hash da senha. Um PFX substituído em disco
+    é carregado novamente na próxima chamada.
+    """
+
+    def __init__(self, tamanho_maximo: int = 128):
+        """
+        :param tamanho_maximo: Número máximo de assinadores mantidos em memória.
+            Os usados há mais tempo são descartados primeiro.
+        """
+        self.tamanho_maximo = tamanho_maximo
+        self._assinadores: "OrderedDict[Tuple[str, str], Tuple[int, Assinador]]" = (
+            OrderedDict()
+        )
+        self._lock = Lock()
+
+    def _chave(self, caminho_pfx: Union[str, Path], senha_pfx: str) -> Tuple[str, str]:
+        caminho = str(Path(caminho_pfx).resolve())
+        return caminho, sha256(senha_pfx.encode()).hexdigest()
+
+    def obter(self, caminho_pfx: Union[str, Path], senha_pfx: str) -> Assinador:
+        chave = self._chave(caminho_pfx, senha_pfx)
+        modificado = Path(caminho_pfx).stat().st_mtime_ns
+
+        with self._lock:
+            registro = self._assinadores.get(chave)
+            if registro is not None and registro[0] == modificado:
+                self._assinadores.move_to_end(chave)
+                return registro[1]
+
+        assinador = Assinador(caminho_pfx, senha_pfx)
+
+        with self._lock:
+            self._assinadores[chave] = (modificado, assinador)
+            self._assinadores.move_to_end(chave)
+            while len(self._assinadores) > self.tamanho_maximo:
+                self._assinadores.popitem(last=False)
+        return assinador
+
+    def invalidar(self, caminho_pfx: Optional[Union[str, Path]] = None):
+        """
+        Descarta os assinadores do PFX informado, com qualquer senha, ou todos
+        quando nenhum caminho é informado.
+        """
+        with self._lock:
+            if caminho_pfx is None:
+                self._assinadores.clear()
+                return
+            caminho = str(Path(caminho_pfx).resolve())
+            for chave in [c for c in self._assinadores if c[0] == caminho]:
+                del self._assinadores[chave]
+
+    def __len__(self) -> int:
+        return len(self._assinadores)
+
+
+registro_assinadores = RegistroAssinadores()
+
+
+def obter_assinador(caminho_pfx: Union[str, Path], senha_pfx: str) -> Assinador:
+    """
+    Retorna o assinador do PFX a partir do registro compartilhado pelo processo.
+    """
+    return registro_assinadores.obter(caminho_pfx, senha_pfx)
+
+
 class AssinadorMock:
-    def assinar_xml(self, element: ElementBase) -> ElementBase:
+    def assinar_xml(self, element: ElementBase, copiar: bool = True) -> ElementBase:
         signature = """
         <Signature xmlns="http://www.w3.org/2000/09/xmldsig#">
             <SignedInfo>
@@ -125,5 +287,45 @@ class AssinadorMock:
         element.append(fromstring(signature))
         return element
 
+    def assinatura_xml(self, raiz: ElementBase, digest: bytes) -> ElementBase:
+        return self.assinar_xml(raiz)[-1]
+
     def assinar_bytes_rsa_sh1(self, data: bytes) -> bytes:
         return data
+
+
+def gerar_pfx_autoassinado(caminho: Path, senha: str) -> Path:
+    """
+    Gera um certificado PFX autoassinado. Útil apenas para testes.
+    """
+    from cryptography import x509
+    from cryptography.x509.oid import NameOID
+    from cryptography.hazmat.primitives.asymmetric import rsa
+    from cryptography.hazmat.primitives.serialization.pkcs12 import (
+        serialize_key_and_certificates,
+    )
+    from datetime import datetime, timedelta, timezone
+
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    nome = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "abstra-notas-teste")])
+    agora = datetime.now(timezone.utc)
+    certificate = (
+        x509.CertificateBuilder()
+        .subject_name(nome)
+        .issuer_name(nome)
+        .public_key(private_key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(agora - timedelta(days=1))
+        .not_valid_after(agora + timedelta(days=365))
+        .sign(private_key, hashes.SHA256())
+    )
+    pfx_data = serialize_key_and_certificates(
+        b"abstra-notas-teste",
+        private_key,
+        certificate,
+        None,
+        serialization.BestAvailableEncryption(senha.encode()),
+    )
+    caminho = Path(caminho)
+    caminho.write_bytes(pfx_data)
+    return caminho
@@ -0,0 +1,125 @@
+from unittest import TestCase
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest.mock import patch
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.asymmetric import padding
+from cryptography.x509 import load_pem_x509_certificate
+from lxml.etree import fromstring, tostring
+from .assinatura import Assinador, RegistroAssinadores, gerar_pfx_autoassinado
+from os import utime
+from hashlib import sha1
+import xmlsec
+
+NS = {"ds": "http://www.w3.org/2000/09/xmldsig#"}
+
+
+class AssinadorTest(TestCase):
+    def setUp(self):
+        self.diretorio = TemporaryDirectory()
+        caminho_pfx = gerar_pfx_autoassinado(
+            Path(self.diretorio.name) / "certificado.pfx", "senha"
+        )
+        self.assinador = Assinador(caminho_pfx, "senha")
+
+    def tearDown(self):
+        self.diretorio.cleanup()
+
+    def verificar(self, xml):
+        assinatura = xml.find("ds:Signature", NS)
+        ctx = xmlsec.SignatureContext()
+        ctx.key = xmlsec.Key.from_memory(
+            self.assinador.cert_pem_bytes, xmlsec.constants.KeyDataFormatCertPem
+        )
+        ctx.verify(assinatura)
+
+    def test_assinaturas_sucessivas_validas(self):
+        for numero in range(3):
+            xml = self.assinador.assinar_xml(
+                fromstring(f"<Pedido><Numero>{numero}</Numero></Pedido>")
+            )
+            self.verificar(xml)
+            self.assertIsNotNone(xml.find(".//ds:X509Certificate", NS).text)
+
+    def test_assinar_sem_copiar(self):
+        xml = fromstring("<Pedido><Numero>1</Numero></Pedido>")
+        assinado = self.assinador.assinar_xml(xml, copiar=False)
+        self.assertIs(assinado, xml)
+        self.verificar(fromstring(tostring(assinado)))
+
+    def test_assinatura_xml(self):
+        documento = b'<Pedido xmlns="urn:pedido"><Numero xmlns="">1</Numero></Pedido>'
+        raiz = fromstring(b'<Pedido xmlns="urn:pedido"/>')
+        self.assinador.assinatura_xml(raiz, sha1(documento).digest())
+
+        xml = fromstring(documento)
+        xml.append(raiz[0])
+        self.verificar(fromstring(tostring(xml)))
+
+    def test_assinar_xml_em_varias_threads(self):
+        xmls = [fromstring(f"<Pedido><Numero>{n}</Numero></Pedido>") for n in range(20)]
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            assinados = list(executor.map(self.assinador.assinar_xml, xmls))
+        for xml in assinados:
+            self.verificar(xml)
+
+    def test_assinar_bytes_rsa_sh1(self):
+        certificado = load_pem_x509_certificate(self.assinador.cert_pem_bytes)
+        for dados in (b"primeiro", b"segundo"):
+            assinatura = self.assinador.assinar_bytes_rsa_sh1(dados)
+            certificado.public_key().verify(
+                assinatura, dados, padding.PKCS1v15(), hashes.SHA1()
+            )
+
+
+class RegistroAssinadoresTest(TestCase):
+    def setUp(self):
+        self.diretorio = TemporaryDirectory()
+        raiz = Path(self.diretorio.name)
+        self.pfx_a = gerar_pfx_autoassinado(raiz / "a.pfx", "senha")
+        self.pfx_b = gerar_pfx_autoassinado(raiz / "b.pfx", "senha")
+
+    def tearDown(self):
+        self.diretorio.cleanup()
+
+    def test_reaproveita_assinador(self):
+        registro = RegistroAssinadores()
+        with patch(
+            "abstra_notas.assinatura.Assinador", wraps=Assinador
+        ) as construtor:
+            primeiro = registro.obter(self.pfx_a, "senha")
+            segundo = registro.obter(str(self.pfx_a), "senha")
+        self.assertIs(primeiro, segundo)
+        self.assertEqual(construtor.call_count, 1)
+
+    def test_recarrega_pfx_modificado(self):
+        registro = RegistroAssinadores()
+        primeiro = registro.obter(self.pfx_a, "senha")
+        modificado = self.pfx_a.stat().st_mtime_ns + 1_000_000_000
+        utime(self.pfx_a, ns=(modificado, modificado))
+        self.assertIsNot(registro.obter(self.pfx_a, "senha"), primeiro)
+        self.assertEqual(len(registro), 1)
+
+    def test_senha_incorreta_nao_reaproveita(self):
+        registro = RegistroAssinadores()
+        registro.obter(self.pfx_a, "senha")
+        with self.assertRaises(ValueError):
+            registro.obter(self.pfx_a, "outra")
+
+    def test_descarta_menos_usado(self):
+        registro = RegistroAssinadores(tamanho_maximo=1)
+        primeiro = registro.obter(self.pfx_a, "senha")
+        registro.obter(self.pfx_b, "senha")
+        self.assertEqual(len(registro), 1)
+        self.assertIsNot(registro.obter(self.pfx_a, "senha"), primeiro)
+
+    def test_invalidar(self):
+        registro = RegistroAssinadores()
+        primeiro = registro.obter(self.pfx_a, "senha")
+        registro.obter(self.pfx_b, "senha")
+        registro.invalidar(self.pfx_a)
+        self.assertEqual(len(registro), 1)
+        self.assertIsNot(registro.obter(self.pfx_a, "senha"), primeiro)
+        registro.invalidar()
+        self.assertEqual(len(registro), 0)
@@ -1,6 +1,19 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, replace
 from datetime import datetime
-from .base import Envio
+from .base import (
+    Envio,
+    AsyncCliente,
+    avisar_homologacao,
+    carregar_wsdl_paginacao,
+    cliente_sincrono,
+)
+from .templates import load_template
+from abstra_notas.nfse.lotes import dividir_em_lotes
+from abstra_notas.nfse.construtor import filho
+from abstra_notas.nfse.construtor import Construtor, validar_construtor
+from abstra_notas.nfse.transporte import Depuracao
+from abstra_notas.assinatura import obter_assinador
+import asyncio
 from abstra_notas.validacoes.cnpj import normalizar_cnpj
 from abstra_notas.validacoes.data import normalizar_data
 from abstra_notas.validacoes.cpf import normalizar_cpf
@@ -8,68 +21,27 @@ from abstra_notas.validacoes.cidades import normalizar_uf
 from abstra_notas.validacoes.cep import normalizar_cep
 from abstra_notas.validacoes.telefone import normalizar_validar_telefone
 from abstra_notas.validacoes.email import validar_email
-from typing import List, Optional
-from lxml.etree import ElementBase
+from typing import AsyncIterator, BinaryIO, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+from lxml.etree import Element, ElementBase, QName
+from abstra_notas.nfse.leitura import (
+    find_all_elements,
+    find_element,
+    find_text,
+    iterar_elementos,
+)
+from pathlib import Path
 from logging import warning
 from enum import Enum
 
-def find_element(parent: ElementBase, tag_name: str):
-    """
-    Busca um elemento ignorando namespace.
-    """
-    element = parent.find(tag_name)
-    if element is not None:
-        return element
-    
-    # Se não encontrou, busca com qualquer namespace usando xpath
-    try:
-        xpath = f".//*[local-name()='{tag_name}']"
-        elements = parent.xpath(xpath)
-        if elements:
-            return elements[0]
-        else:
-            pass
-    except Exception as e:
-        print(f"Erro no XPath para '{tag_name}': {e}")
-        
-    # Fallback: busca por todos os filhos e verifica o nome local
-    for elem in parent.iter():
-        if elem.tag.split('}')[-1] == tag_name: 
-            return elem
-    return None
+NAMESPACE_ENVIAR_LOTE_RPS = "http://www.ginfes.com.br/servico_enviar_lote_rps_envio_v03.xsd"
+NAMESPACE_TIPOS = "http://www.ginfes.com.br/tipos_v03.xsd"
 
 
-def find_text(parent: ElementBase, tag_name: str, default: str = ''):
+def tipos(tag: str) -> QName:
     """
-    Busca o texto de um elemento ignorando namespace.
+    Nome de um elemento do namespace de tipos (prefixo `ns3` nos templates).
     """
-    element = find_element(parent, tag_name)
-    return element.text if element is not None else default
-
-
-def find_all_elements(parent: ElementBase, tag_name: str):
-    """
-    Busca todos os elementos com o nome especificado ignorando namespace.
-    """
-    # Busca primeiro sem namespace
-    elements = parent.findall(f".//{tag_name}")
-    if elements:
-        return elements
-    
-    # Se não encontrou, busca com qualquer namespace
-    try:
-        xpath = f".//*[local-name()='{tag_name}']"
-        return parent.xpath(xpath)
-    except Exception as e:
-        print(f"Erro no XPath para '{tag_name}': {e}")
-        print(f"XPath usado: .//*[local-name()='{tag_name}']")
-        # Fallback: busca por todos os elementos e filtra pelo nome local
-        result = []
-        for elem in parent.iter():
-            if elem.tag.split('}')[-1] == tag_name: 
-                result.append(elem)
-        return result
-
+    return QName(NAMESPACE_TIPOS, tag)
 
 
 class TipoRps(Enum):
@@ -228,6 +200,37 @@ class Valores:
         return None
 
 
+    def construir_xml(self, servico: ElementBase) -> ElementBase:
+        """
+        Adiciona os valores ao elemento `Servico`.
+        """
+        valores = filho(servico, tipos('Valores'))
+        filho(valores, tipos('ValorServicos'), self.valor_servico)
+        for tag, valor in (
+            ('ValorDeducoes', self.valor_deducoes),
+            ('ValorPis', self.valor_pis),
+            ('ValorCofins', self.valor_cofins),
+            ('ValorInss', self.valor_inss),
+            ('ValorIr', self.valor_ir),
+            ('ValorCsll', self.valor_csll),
+        ):
+            if valor is not None:
+                filho(valores, tipos(tag), valor)
+        filho(valores, tipos('IssRetido'), self.iss_retido_str)
+        for tag, valor in (
+            ('ValorIss', self.valor_iss),
+            ('ValorIssRetido', self.valor_iss_retido),
+            ('OutrasRetencoes', self.outras_retencoes),
+            ('BaseCalculo', self.base_calculo),
+            ('Aliquota', self.aliquota_iss_value),
+            ('ValorLiquidoNfse', self.valor_liquido_nfse),
+            ('DescontoIncondicionado', self.valor_desconto_incondicionado),
+            ('DescontoCondicionado', self.valor_desconto_condicionado),
+        ):
+            if valor is not None:
+                filho(valores, tipos(tag), valor)
+        return valores
+
     @classmethod
     def from_xml(cls, xml: ElementBase):
         """
@@ -286,6 +289,20 @@ class DadosServico:
     """
 
 
+    def construir_xml(self, inf_rps: ElementBase) -> ElementBase:
+        """
+        Adiciona o serviço ao elemento `InfRps`.
+        """
+        servico = filho(inf_rps, tipos('Servico'))
+        self.valores.construir_xml(servico)
+        filho(servico, tipos('ItemListaServico'), self.item_lista_servico)
+        if self.codigo_tributacao_municipio is not None:
+            filho(servico, tipos('CodigoCnae'), self.codigo_tributacao_municipio[:-2])
+            filho(servico, tipos('CodigoTributacaoMunicipio'), self.codigo_tributacao_municipio)
+        filho(servico, tipos('Discriminacao'), self.discriminacao)
+        filho(servico, tipos('CodigoMunicipio'), self.codigo_municipio)
+        return servico
+
     @classmethod
     def from_xml(cls, xml: ElementBase):
         """
@@ -420,6 +437,21 @@ class Endereco:
         assert self.uf, "UF deve ser fornecida."
         assert self.codigo_municipio, "Código do município deve ser fornecido."
 
+    def construir_xml(self, tomador: ElementBase) -> ElementBase:
+        """
+        Adiciona o endereço ao elemento `Tomador`.
+        """
+        endereco = filho(tomador, tipos('Endereco'))
+        filho(endereco, tipos('Endereco'), self.logradouro)
+        filho(endereco, tipos('Numero'), self.numero)
+        if self.complemento:
+            filho(endereco, tipos('Complemento'), self.complemento)
+        filho(endereco, tipos('Bairro'), self.bairro)
+        filho(endereco, tipos('CodigoMunicipio'), self.codigo_municipio)
+        filho(endereco, tipos('Uf'), self.uf)
+        filho(endereco, tipos('Cep'), self.cep)
+        return endereco
+
     @classmethod
     def from_xml(cls, xml: ElementBase):
         """
@@ -454,6 +486,15 @@ class Contato:
 
         assert validar_email(self.email), f"Email '{self.email}' inválido. Verifique o formato do email."
 
+    def construir_xml(self, tomador: ElementBase) -> ElementBase:
+        """
+        Adiciona o contato ao elemento `Tomador`.
+        """
+        contato = filho(tomador, tipos('Contato'))
+        filho(contato, tipos('Telefone'), self.telefone)
+        filho(contato, tipos('Email'), self.email)
+        return contato
+
     @classmethod
     def from_xml(cls, xml: ElementBase):
         """
@@ -927,6 +968,46 @@ class Rps:
         assert self.tomador_cnpj is None or self.tomador_endereco is not None, "Se 'tomador_cnpj' for preenchido, 'tomador_endereco' também deve ser preenchido."
         assert self.tomador_cnpj is None or self.tomador_contato is not None, "Se 'tomador_cnpj' for preenchido, 'tomador_contato' também deve ser preenchido."
 
+    def construir_xml(self, lista_rps: ElementBase) -> ElementBase:
+        """
+        Adiciona o RPS ao elemento `ListaRps`.
+        """
+        rps = filho(lista_rps, tipos('Rps'))
+        inf_rps = filho(rps, tipos('InfRps'))
+        identificacao = filho(inf_rps, tipos('IdentificacaoRps'))
+        filho(identificacao, tipos('Numero'), self.numero)
+        filho(identificacao, tipos('Serie'), self.serie)
+        filho(identificacao, tipos('Tipo'), self.tipo.value)
+        filho(inf_rps, tipos('DataEmissao'), self.data_emissao_iso8601)
+        filho(inf_rps, tipos('NaturezaOperacao'), self.natureza_operacao.value)
+        if self.regime_especial_tributacao is not None:
+            filho(inf_rps, tipos('RegimeEspecialTributacao'), self.regime_especial_tributacao.value)
+        filho(inf_rps, tipos('OptanteSimplesNacional'), self.optante_simples_nacional_value)
+        filho(inf_rps, tipos('IncentivadorCultural'), self.incentivador_cultural_value)
+        filho(inf_rps, tipos('Status'), self.status.value)
+        self.servico.construir_xml(inf_rps)
+
+        prestador = filho(inf_rps, tipos('Prestador'))
+        filho(prestador, tipos('Cnpj'), self.prestador_cnpj)
+        filho(prestador, tipos('InscricaoMunicipal'), self.prestador_inscricao_municipal)
+
+        tomador = filho(inf_rps, tipos('Tomador'))
+        identificacao_tomador = filho(tomador, tipos('IdentificacaoTomador'))
+        cpf_cnpj = filho(identificacao_tomador, tipos('CpfCnpj'))
+        if self.tomador_cnpj:
+            filho(cpf_cnpj, tipos('Cnpj'), self.tomador_cnpj)
+        elif self.tomador_cpf:
+            filho(cpf_cnpj, tipos('Cpf'), self.tomador_cpf)
+        if self.tomador_inscricao_municipal:
+            filho(identificacao_tomador, tipos('InscricaoMunicipal'), self.tomador_inscricao_municipal)
+        if self.tomador_razao_social:
+            filho(tomador, tipos('RazaoSocial'), self.tomador_razao_social)
+        if self.tomador_endereco:
+            self.tomador_endereco.construir_xml(tomador)
+        if self.tomador_contato:
+            self.tomador_contato.construir_xml(tomador)
+        return rps
+
 
     @classmethod
     def from_xml(cls, xml: ElementBase):
@@ -1019,6 +1100,27 @@ class ConsultarNfseResposta:
         
 
 
+def ler_comp_nfse(
+    resposta: Union[str, bytes, BinaryIO],
+    mensagens: Optional[List[MensagemRetorno]] = None,
+) -> Iterator[CompNfse]:
+    """
+    Lê os `CompNfse` de uma `ConsultarNfseResposta` um a um, à medida que a
+    resposta é lida, sem montar a árvore nem a lista inteira. Aceita a
+    resposta sem processar de `Envio.chamar` ou `AsyncCliente.chamar`:
+
+        for comp_nfse in ler_comp_nfse(await cliente.chamar(consulta)):
+            ...
+
+    :param mensagens: Lista que recebe as mensagens de retorno, se houver.
+    """
+    for elemento in iterar_elementos(resposta, "CompNfse", "MensagemRetorno"):
+        if QName(elemento).localname == "CompNfse":
+            yield CompNfse.from_xml(elemento)
+        elif mensagens is not None:
+            mensagens.append(MensagemRetorno.from_xml(elemento))
+
+
 @dataclass
 class ConsultarNfseEnvio(Envio[ConsultarNfseResposta]):
     """
@@ -1049,6 +1151,174 @@ class ConsultarNfseEnvio(Envio[ConsultarNfseResposta]):
     def resposta(self, xml: ElementBase) -> ConsultarNfseResposta:
         return ConsultarNfseResposta.from_xml(xml)
 
+    def iter_comp_nfse(
+        self,
+        caminho_pfx: Path,
+        senha_pfx: str,
+        homologacao=False,
+        depuracao: Optional[Depuracao] = None,
+        construtor: Construtor = "template",
+        validar: bool = False,
+        mensagens: Optional[List[MensagemRetorno]] = None,
+    ) -> Iterator[CompNfse]:
+        """
+        Versão incremental de `executar`, que lê a resposta com `ler_comp_nfse`.
+        Para períodos longos, prefira `ConsultarNfsePorPeriodoComPaginacaoEnvio`.
+
+        :param mensagens: Lista que recebe as mensagens de retorno, se houver.
+        """
+        validar_construtor(construtor)
+        assinador = obter_assinador(caminho_pfx, senha_pfx)
+        if homologacao:
+            avisar_homologacao(stacklevel=2)
+
+        with cliente_sincrono(
+            assinador, homologacao, self.carregar_wsdl_servico
+        ) as client:
+            response = self.chamar(client, assinador, construtor, validar, depuracao)
+        yield from ler_comp_nfse(response, mensagens)
+
+
+NFSE_POR_PAGINA = 500
+"""
+Número máximo de NFS-e em cada página da consulta por período com paginação.
+Uma página com menos notas é a última.
+"""
+
+
+@dataclass
+class ConsultarNfsePorPeriodoComPaginacaoEnvio(Envio[ConsultarNfseResposta]):
+    """
+    Consulta de NFS-e por período em páginas de até `NFSE_POR_PAGINA` notas,
+    para prestadores cujo período inteiro não cabe em uma resposta de
+    `ConsultarNfseEnvio`. Para percorrer todas as páginas, use `iter_comp_nfse`.
+
+    A operação é exposta por um serviço próprio da prefeitura, fora do serviço
+    Ginfes das demais operações (veja `base.carregar_wsdl_paginacao`).
+    """
+
+    carregar_wsdl_servico = staticmethod(carregar_wsdl_paginacao)
+
+    prestador_cnpj: str
+    prestador_inscricao_municipal: str
+    data_inicial: datetime
+    data_final: datetime
+    pagina: int = 1
+
+    def __post_init__(self):
+        self.prestador_cnpj = normalizar_cnpj(self.prestador_cnpj)
+        self.data_inicial = normalizar_data(self.data_inicial)
+        self.data_final = normalizar_data(self.data_final)
+        self.pagina = int(self.pagina)
+
+    def nome_operacao(self):
+        return "consultarNfse"
+
+    def argumentos(self, requisicao: str) -> tuple:
+        return (requisicao, self.pagina)
+
+    def resposta(self, xml: ElementBase) -> ConsultarNfseResposta:
+        return ConsultarNfseResposta.from_xml(xml)
+
+    def _ultima_pagina(
+        self,
+        quantidade: int,
+        mensagens_pagina: List[MensagemRetorno],
+        mensagens: Optional[List[MensagemRetorno]],
+    ) -> bool:
+        if mensagens_pagina:
+            if mensagens is not None:
+                mensagens.extend(mensagens_pagina)
+            return True
+        return quantidade < NFSE_POR_PAGINA
+
+    def _ler_pagina(
+        self, response: str, mensagens: Optional[List[MensagemRetorno]]
+    ) -> Iterator[CompNfse]:
+        """
+        Lê uma página e, se ela não for a última, retorna a consulta da próxima
+        como valor de retorno do gerador.
+        """
+        mensagens_pagina: List[MensagemRetorno] = []
+        quantidade = 0
+        for comp_nfse in ler_comp_nfse(response, mensagens_pagina):
+            quantidade += 1
+            yield comp_nfse
+
+        if self._ultima_pagina(quantidade, mensagens_pagina, mensagens):
+            return None
+        return replace(self, pagina=self.pagina + 1)
+
+    def _ler_pagina_inteira(
+        self, response: str, mensagens: Optional[List[MensagemRetorno]]
+    ) -> Tuple[List[CompNfse], bool]:
+        """
+        Lê uma página de uma vez e retorna as notas e se ela é a última.
+        """
+        mensagens_pagina: List[MensagemRetorno] = []
+        notas = list(ler_comp_nfse(response, mensagens_pagina))
+        return notas, self._ultima_pagina(len(notas), mensagens_pagina, mensagens)
+
+    def iter_comp_nfse(
+        self,
+        caminho_pfx: Path,
+        senha_pfx: str,
+        homologacao=False,
+        depuracao: Optional[Depuracao] = None,
+        construtor: Construtor = "template",
+        validar: bool = False,
+        mensagens: Optional[List[MensagemRetorno]] = None,
+    ) -> Iterator[CompNfse]:
+        """
+        Percorre todas as páginas a partir de `pagina`, com uma única conexão,
+        lendo cada página incrementalmente (veja `ler_comp_nfse`). Apenas uma
+        página fica em memória por vez.
+
+        A consulta termina na primeira página com menos de `NFSE_POR_PAGINA`
+        notas ou com mensagens de retorno.
+
+        :param mensagens: Lista que recebe as mensagens de retorno da página
+            que encerrou a consulta, se houver.
+        """
+        validar_construtor(construtor)
+        assinador = obter_assinador(caminho_pfx, senha_pfx)
+        if homologacao:
+            avisar_homologacao(stacklevel=2)
+
+        with cliente_sincrono(
+            assinador, homologacao, self.carregar_wsdl_servico
+        ) as client:
+            envio = self
+            while envio is not None:
+                response = envio.chamar(
+                    client, assinador, construtor, validar, depuracao
+                )
+                envio = yield from envio._ler_pagina(response, mensagens)
+
+    async def iter_comp_nfse_async(
+        self,
+        cliente: AsyncCliente,
+        mensagens: Optional[List[MensagemRetorno]] = None,
+    ) -> AsyncIterator[CompNfse]:
+        """
+        Versão assíncrona de `iter_comp_nfse`, usando as conexões do `cliente`.
+        Cada página é lida em uma thread, sem bloquear o loop, e fica inteira
+        em memória até suas notas serem percorridas.
+        """
+        loop = asyncio.get_running_loop()
+        envio = self
+        while True:
+            response = await cliente.chamar(envio)
+            notas, ultima_pagina = await loop.run_in_executor(
+                None, envio._ler_pagina_inteira, response, mensagens
+            )
+            for nota in notas:
+                yield nota
+            if ultima_pagina:
+                return
+            envio = replace(envio, pagina=envio.pagina + 1)
+
+
 @dataclass
 class EnviarLoteRpsResposta:
     """
@@ -1091,6 +1361,10 @@ class EnviarLoteRpsResposta:
             lista_mensagem_retorno=None
         )
     
+MAXIMO_RPS_LOTE = 50
+MAXIMO_BYTES_LOTE = 500 * 1024
+
+
 @dataclass
 class EnviarLoteRpsEnvio(Envio[EnviarLoteRpsResposta]):
     """
@@ -1205,6 +1479,87 @@ class EnviarLoteRpsEnvio(Envio[EnviarLoteRpsResposta]):
     def resposta(self, xml: ElementBase) -> EnviarLoteRpsResposta:
         return EnviarLoteRpsResposta.from_xml(xml)
 
+    def construir_xml(self) -> ElementBase:
+        envio = Element(
+            QName(NAMESPACE_ENVIAR_LOTE_RPS, "EnviarLoteRpsEnvio"),
+            nsmap={None: NAMESPACE_ENVIAR_LOTE_RPS, "ns3": NAMESPACE_TIPOS},
+        )
+        lote = filho(envio, QName(NAMESPACE_ENVIAR_LOTE_RPS, "LoteRps"), Id=self.lote_id)
+        filho(lote, tipos('NumeroLote'), self.numero_lote)
+        filho(lote, tipos('Cnpj'), self.prestador_cnpj)
+        filho(lote, tipos('InscricaoMunicipal'), self.prestador_inscricao_municipal)
+        filho(lote, tipos('QuantidadeRps'), self.quantidade_rps)
+        lista_rps = filho(lote, tipos('ListaRps'))
+        for rps in self.lista_rps:
+            rps.construir_xml(lista_rps)
+        return envio
+
+    @classmethod
+    def dividir_em_lotes(
+        cls,
+        lista_rps: Iterable[Rps],
+        numero_lote_inicial: int,
+        prestador_cnpj: str,
+        prestador_inscricao_municipal: str,
+        maximo_rps: int = MAXIMO_RPS_LOTE,
+        maximo_bytes: int = MAXIMO_BYTES_LOTE,
+    ) -> List["EnviarLoteRpsEnvio"]:
+        """
+        Divide os RPS, na ordem recebida, em lotes de 1 a 50 RPS que respeitam o
+        tamanho máximo da mensagem. Os lotes são numerados sequencialmente a
+        partir de `numero_lote_inicial`.
+        """
+        template = load_template(cls.__name__)
+
+        def lote(numero: int, rps: List[Rps]) -> "EnviarLoteRpsEnvio":
+            return cls(
+                lote_id=f"lote{numero}",
+                numero_lote=str(numero),
+                prestador_cnpj=prestador_cnpj,
+                prestador_inscricao_municipal=prestador_inscricao_municipal,
+                lista_rps=rps,
+            )
+
+        def tamanho(rps: Rps) -> int:
+            return len(template.render(lote(0, [rps]).__dict__).encode("utf-8")) - vazio
+
+        vazio = len(template.render(lote(0, []).__dict__).encode("utf-8"))
+        return [
+            lote(numero_lote_inicial + indice, rps)
+            for indice, rps in enumerate(
+                dividir_em_lotes(lista_rps, tamanho, maximo_rps, maximo_bytes)
+            )
+        ]
+
+
+async def enviar_rps(
+    cliente: AsyncCliente,
+    lista_rps: Iterable[Rps],
+    numero_lote_inicial: int,
+    prestador_cnpj: str,
+    prestador_inscricao_municipal: str,
+) -> Dict[Tuple[str, str], Union[EnviarLoteRpsResposta, Exception]]:
+    """
+    Envia qualquer quantidade de RPS, divididos em lotes (veja
+    `EnviarLoteRpsEnvio.dividir_em_lotes`) enviados concorrentemente,
+    respeitando a `concorrencia` do cliente.
+
+    :return: A resposta do lote (com o protocolo) ou o erro, por série e número
+        de RPS.
+    """
+    lotes = EnviarLoteRpsEnvio.dividir_em_lotes(
+        lista_rps, numero_lote_inicial, prestador_cnpj, prestador_inscricao_municipal
+    )
+    respostas = await asyncio.gather(
+        *(cliente.executar(lote) for lote in lotes), return_exceptions=True
+    )
+    return {
+        (rps.serie, rps.numero): resposta
+        for lote, resposta in zip(lotes, respostas)
+        for rps in lote.lista_rps
+    }
+
+
 @dataclass
 class CancelarNfseResposta:
     """
@@ -1,25 +1,122 @@
 from abc import abstractmethod, ABC
-from abstra_notas.assinatura import Assinador
+from abstra_notas.assinatura import Assinador, obter_assinador
+from abstra_notas.nfse.wsdl import carregar_wsdl, localizar_wsdl, obter_cache_wsdl
+from abstra_notas.nfse.construtor import Construtor, validar_construtor
+from abstra_notas.nfse.schemas import validar_xml
+from abstra_notas.nfse.transporte import (
+    AdaptadorSSL,
+    AsyncClienteBase,
+    CarregadorWsdl,
+    Depuracao,
+    contexto_ssl,
+)
 from .templates import load_template
 from zeep.plugins import HistoryPlugin
 from zeep import Client, Transport, Settings
+from zeep.wsdl import Document
 from requests import Session
 from lxml.etree import tostring, fromstring, ElementBase
 from pathlib import Path
-from typing import Generic, TypeVar
-from tempfile import mktemp
-# import xmlschema
-from xmlschema import XMLSchema
+from typing import Callable, Dict, Generic, Iterator, Optional, TypeVar
+from contextlib import contextmanager
+from functools import partial
 import warnings
 
 
 T = TypeVar('T', bound='Envio')
 
+URL_PRODUCAO = "https://iss.fortaleza.ce.gov.br/grpfor-iss/ServiceGinfesImplService?wsdl"
+URL_HOMOLOGACAO = "http://isshomo.sefin.fortaleza.ce.gov.br/grpfor-iss/ServiceGinfesImplService?wsdl"
+URL_PAGINACAO_PRODUCAO = "https://iss.fortaleza.ce.gov.br/grpfor-iss/ServiceConsultarNfseImplService?wsdl"
+URL_PAGINACAO_HOMOLOGACAO = "http://isshomo.sefin.fortaleza.ce.gov.br/grpfor-iss/ServiceConsultarNfseImplService?wsdl"
+CABECALHO = '<?xml version="1.0" encoding="UTF-8"?><cabecalho xmlns="http://www.ginfes.com.br/cabecalho_v03.xsd" versao="3"><versaoDados>3</versaoDados></cabecalho>'
+
+
+def avisar_homologacao(stacklevel: int):
+    warnings.warn(
+        "ATENÇÃO: Para usar o ambiente de homologação, você deve primeiro ativar "
+        "o ambiente de homologação no site da Prefeitura de Fortaleza "
+        "(https://iss.fortaleza.ce.gov.br/grpfor) na seção 'Controle de Acesso'.",
+        UserWarning,
+        stacklevel=stacklevel + 1
+    )
+
+
+def carregar_wsdl_fortaleza(homologacao: bool, transport: Transport, settings: Settings) -> Document:
+    return carregar_wsdl(
+        localizar_wsdl(
+            Path(__file__).parent,
+            "homologacao" if homologacao else "producao",
+            URL_HOMOLOGACAO if homologacao else URL_PRODUCAO,
+        ),
+        transport,
+        settings,
+    )
+
+
+def carregar_wsdl_paginacao(homologacao: bool, transport: Transport, settings: Settings) -> Document:
+    """
+    WSDL do serviço da consulta de NFS-e com paginação, que não faz parte do
+    serviço Ginfes das demais operações.
+
+    Este WSDL não é empacotado: ele é baixado de `URL_PAGINACAO_*` até que
+    `abstra_notas/scripts/atualizar_wsdls.py` gere `wsdl/paginacao_*.wsdl`.
+    """
+    return carregar_wsdl(
+        localizar_wsdl(
+            Path(__file__).parent,
+            "paginacao_homologacao" if homologacao else "paginacao_producao",
+            URL_PAGINACAO_HOMOLOGACAO if homologacao else URL_PAGINACAO_PRODUCAO,
+        ),
+        transport,
+        settings,
+    )
+
+
+CarregadorWsdlFortaleza = Callable[[bool, Transport, Settings], Document]
+
+
+@contextmanager
+def cliente_sincrono(
+    assinador: Assinador,
+    homologacao: bool,
+    carregar: CarregadorWsdlFortaleza = carregar_wsdl_fortaleza,
+) -> Iterator[Client]:
+    """
+    Cliente SOAP síncrono, com a sessão HTTP aberta até o fim do bloco `with`.
+
+    :param carregar: WSDL do serviço. Veja `Envio.carregar_wsdl_servico`.
+    """
+    with Session() as session:
+        session.verify = False
+        session.mount(
+            "https://", AdaptadorSSL(contexto_ssl(assinador, verificar=False))
+        )
+        settings = Settings(strict=True, xml_huge_tree=True)
+        transport = Transport(session=session, cache=obter_cache_wsdl())
+        yield Client(
+            carregar(homologacao, transport, settings),
+            transport=transport,
+            settings=settings,
+            plugins=[HistoryPlugin()],
+        )
+
+
 class Envio(ABC, Generic[T]):
+    # WSDL do serviço que expõe a operação.
+    carregar_wsdl_servico: CarregadorWsdlFortaleza = staticmethod(carregar_wsdl_fortaleza)
+
     def gerar_xml(self) -> ElementBase:
 
         xml = load_template(self.__class__.__name__).render(self.__dict__)
         return fromstring(xml.encode("utf-8"))
+
+    def construir_xml(self) -> ElementBase:
+        """
+        Monta o XML da operação diretamente com o lxml. As operações sem
+        construtor próprio usam o template.
+        """
+        return self.gerar_xml()
     
     @abstractmethod
     def nome_operacao(self):
@@ -37,60 +134,171 @@ class Envio(ABC, Generic[T]):
     def schema_path(self) -> Path:
         return Path(__file__).parent / "schemas" / f"{self.nome_operacao()}.xsd"
 
+    def requisicao(
+        self,
+        assinador: Assinador,
+        construtor: Construtor = "template",
+        validar: bool = False,
+    ) -> str:
+        """
+        Gera e assina o XML enviado ao webservice.
 
-    def executar(self, caminho_pfx: Path, senha_pfx: str, homologacao=False) -> T:
-        assinador = Assinador(caminho_pfx, senha_pfx)
-        try:
-            history = HistoryPlugin()
-            keyfile = Path(mktemp())
-            keyfile.write_bytes(assinador.private_key_pem_bytes)
-            certfile = Path(mktemp())
-            certfile.write_bytes(assinador.cert_pem_bytes)
-
-            xml = self.gerar_xml()
-            session = Session()
-            session.cert = (certfile, keyfile)
-            session.verify = False
-            settings = Settings(strict=True, xml_huge_tree=True)
-            transport = Transport(session=session, cache=None)
-
-            if homologacao:
-                warnings.warn(
-                "ATENÇÃO: Para usar o ambiente de homologação, você deve primeiro ativar "
-                "o ambiente de homologação no site da Prefeitura de Fortaleza "
-                "(https://iss.fortaleza.ce.gov.br/grpfor) na seção 'Controle de Acesso'.",
-                UserWarning,
-                stacklevel=2
-            )
-                url= "http://isshomo.sefin.fortaleza.ce.gov.br/grpfor-iss/ServiceGinfesImplService?wsdl"
-            else:
-                url = "https://iss.fortaleza.ce.gov.br/grpfor-iss/ServiceGinfesImplService?wsdl"
-            client = Client(
-                url, transport=transport, settings=settings, plugins=[history]
+        :param validar: Valida o XML assinado com o schema em `schemas/`,
+            lançando `lxml.etree.DocumentInvalid` se ele for inválido.
+        """
+        if construtor == "lxml":
+            xml = assinador.assinar_xml(self.construir_xml(), copiar=False)
+        else:
+            xml = assinador.assinar_xml(self.gerar_xml())
+        if validar:
+            validar_xml(Path(__file__).parent / "schemas", xml)
+        return tostring(xml, encoding=str)
+
+    def argumentos(self, requisicao: str) -> tuple:
+        """
+        Argumentos da operação SOAP. Apenas o cancelamento não recebe o cabeçalho.
+        """
+        if self.nome_operacao() == "CancelarNfse":
+            return (requisicao,)
+        return (CABECALHO, requisicao)
+
+    def executar(
+        self,
+        caminho_pfx: Path,
+        senha_pfx: str,
+        homologacao=False,
+        depuracao: Optional[Depuracao] = None,
+        construtor: Construtor = "template",
+        validar: bool = False,
+    ) -> T:
+        """
+        :param depuracao: Função chamada com a operação, a requisição e a resposta.
+            Veja `abstra_notas.nfse.transporte.depuracao_em_diretorio`.
+        :param construtor: Forma de gerar o XML. Veja
+            `abstra_notas.nfse.construtor.Construtor`.
+        :param validar: Valida a requisição com o schema da prefeitura antes de
+            enviá-la, para que requisições malformadas falhem sem chamar o
+            webservice.
+        """
+        validar_construtor(construtor)
+        assinador = obter_assinador(caminho_pfx, senha_pfx)
+
+        if homologacao:
+            avisar_homologacao(stacklevel=2)
+
+        with cliente_sincrono(
+            assinador, homologacao, self.carregar_wsdl_servico
+        ) as client:
+            response = self.chamar(client, assinador, construtor, validar, depuracao)
+        xml_resposta =  fromstring(response.encode("utf-8"))
+        return self.resposta(xml_resposta)
+
+    def chamar(
+        self,
+        client: Client,
+        assinador: Assinador,
+        construtor: Construtor = "template",
+        validar: bool = False,
+        depuracao: Optional[Depuracao] = None,
+    ) -> str:
+        """
+        Executa a operação com um cliente SOAP já criado (veja
+        `cliente_sincrono`) e retorna a resposta sem processá-la.
+        """
+        requisicao = self.requisicao(assinador, construtor, validar)
+        response: str = getattr(client.service, self.nome_operacao())(
+            *self.argumentos(requisicao)
+        )
+        if depuracao is not None:
+            depuracao(self.nome_operacao(), requisicao, response)
+        return response
+
+    async def executar_async(
+        self,
+        caminho_pfx: Path,
+        senha_pfx: str,
+        homologacao=False,
+        depuracao: Optional[Depuracao] = None,
+        construtor: Construtor = "template",
+        validar: bool = False,
+    ) -> T:
+        """
+        Versão assíncrona de `executar`. Para várias operações, prefira um
+        único `AsyncCliente`, que mantém as conexões abertas entre chamadas.
+        """
+        async with AsyncCliente(
+            caminho_pfx,
+            senha_pfx,
+            homologacao,
+            depuracao=depuracao,
+            construtor=construtor,
+            validar=validar,
+        ) as cliente:
+            return await cliente.executar(self)
+
+
+class AsyncCliente(AsyncClienteBase):
+    """
+    Cliente assíncrono do webservice de Fortaleza. O transporte, as conexões e
+    o cliente SOAP são criados uma vez e compartilhados por todas as operações:
+
+        async with AsyncCliente(caminho_pfx, senha_pfx) as cliente:
+            respostas = await asyncio.gather(
+                *(cliente.executar(consulta) for consulta in consultas)
             )
 
-            # Assina o XML
-            xml_assinado = assinador.assinar_xml(xml)
-
-            request_tmp_path = Path(mktemp())
-            request_tmp_path.write_text(tostring(xml_assinado, encoding=str), encoding="utf-8")
-
-            
-            if self.nome_operacao() == "CancelarNfse":
-                response: str = getattr(client.service, self.nome_operacao())(
-                    tostring(xml_assinado, encoding=str)
-                )
-            else:
-                cabecalho = cabecalho = '<?xml version="1.0" encoding="UTF-8"?><cabecalho xmlns="http://www.ginfes.com.br/cabecalho_v03.xsd" versao="3"><versaoDados>3</versaoDados></cabecalho>'
-                response: str = getattr(client.service, self.nome_operacao())(
-                    cabecalho, tostring(xml_assinado, encoding=str)
-                )
-
-            response_temp_path = Path(mktemp())
-            response_temp_path.write_text(response, encoding="utf-8")
-            #print(f"Response saved to: {response_temp_path}")
-            xml_resposta =  fromstring(response.encode("utf-8"))
-            return self.resposta(xml_resposta)
-        finally:
-            keyfile.unlink()
-            certfile.unlink()
\ No newline at end of file
+    Requer o httpx, instalado com `pip install abstra_notas[async]`.
+    """
+
+    def __init__(
+        self,
+        caminho_pfx: Path,
+        senha_pfx: str,
+        homologacao=False,
+        concorrencia: int = 10,
+        depuracao: Optional[Depuracao] = None,
+        construtor: Construtor = "template",
+        validar: bool = False,
+    ):
+        """
+        :param concorrencia: Número máximo de operações simultâneas.
+        :param depuracao: Função chamada com a operação, a requisição e a resposta.
+        :param construtor: Forma de gerar o XML. Veja
+            `abstra_notas.nfse.construtor.Construtor`.
+        :param validar: Valida a requisição com o schema da prefeitura antes de
+            enviá-la, para que requisições malformadas falhem sem chamar o
+            webservice.
+        """
+        validar_construtor(construtor)
+        self.assinador = obter_assinador(caminho_pfx, senha_pfx)
+        self.homologacao = homologacao
+        self.construtor = construtor
+        self.validar = validar
+        self._carregadores: Dict[CarregadorWsdlFortaleza, CarregadorWsdl] = {}
+        super().__init__(
+            self._carregador(carregar_wsdl_fortaleza),
+            contexto_ssl(self.assinador, verificar=False),
+            concorrencia=concorrencia,
+            depuracao=depuracao,
+        )
+        if homologacao:
+            avisar_homologacao(stacklevel=2)
+
+    def _carregador(self, carregar: CarregadorWsdlFortaleza) -> CarregadorWsdl:
+        if carregar not in self._carregadores:
+            self._carregadores[carregar] = partial(carregar, self.homologacao)
+        return self._carregadores[carregar]
+
+    async def executar(self, envio: Envio[T]) -> T:
+        return envio.resposta(fromstring((await self.chamar(envio)).encode("utf-8")))
+
+    async def chamar(self, envio: Envio) -> str:
+        """
+        Executa a operação e retorna a resposta sem processá-la.
+        """
+        return await self._chamar_operacao(
+            envio.nome_operacao(),
+            partial(envio.requisicao, self.assinador, self.construtor, self.validar),
+            envio.argumentos,
+            self._carregador(envio.carregar_wsdl_servico),
+        )
@@ -0,0 +1,46 @@
+from abstra_notas.nfse.ce.fortaleza import ConsultarNfsePorPeriodoComPaginacaoEnvio
+from pathlib import Path
+from dotenv import load_dotenv
+from os import getenv
+from datetime import date
+
+load_dotenv()
+
+# Configuração das credenciais
+caminho_certificado = Path(getenv("NFSE_PFX_PATH", "certificado.pfx"))
+senha_certificado = getenv("NFSE_PFX_PASSWORD", "senha_certificado")
+
+# Dados do prestador
+prestador_cnpj = getenv("NFSE_CNPJ_PRESTADOR", "12345678000123")
+prestador_inscricao = getenv("NFSE_INSCRICAO_PRESTADOR", "123456")
+
+# Consulta do ano inteiro, em páginas de até 500 notas
+consulta = ConsultarNfsePorPeriodoComPaginacaoEnvio(
+    prestador_cnpj=prestador_cnpj,
+    prestador_inscricao_municipal=prestador_inscricao,
+    data_inicial=date(date.today().year, 1, 1),
+    data_final=date.today(),
+)
+
+mensagens = []
+try:
+    total_centavos = 0
+    quantidade = 0
+    for comp_nfse in consulta.iter_comp_nfse(
+        caminho_pfx=caminho_certificado,
+        senha_pfx=senha_certificado,
+        mensagens=mensagens,
+    ):
+        nfse = comp_nfse.nfse
+        quantidade += 1
+        if nfse.servico is not None:
+            total_centavos += nfse.servico.valores.valor_servico_centavos
+        print(f"NFSe {nfse.numero} - {nfse.data_emissao.strftime('%d/%m/%Y')}")
+
+    print(f"\n{quantidade} NFSe(s), total de R$ {total_centavos / 100:.2f}")
+
+    for msg in mensagens:
+        print(f"   {msg.codigo}: {msg.mensagem}")
+
+except Exception as e:
+    print(f"Erro ao consultar NFSe: {str(e)}")
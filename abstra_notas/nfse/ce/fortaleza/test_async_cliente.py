@@ -0,0 +1,168 @@
+"""
+Testes do AsyncCliente de Fortaleza, com o cliente SOAP substituído por um mock.
+"""
+
+import asyncio
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest.mock import patch
+from abstra_notas.assinatura import gerar_pfx_autoassinado
+from abstra_notas.nfse.ce.fortaleza import (
+    AsyncCliente,
+    ConsultarSituacaoLoteRpsEnvio,
+    EnviarLoteRpsEnvio,
+    Rps,
+    TipoRps,
+    NaturezaOperacao,
+    StatusRps,
+    DadosServico,
+    Valores,
+    enviar_rps,
+)
+from abstra_notas.nfse.ce.fortaleza.base import CABECALHO
+
+RESPOSTA = """<?xml version="1.0" encoding="UTF-8"?>
+<ConsultarSituacaoLoteRpsResposta xmlns="http://www.ginfes.com.br/servico_consultar_situacao_lote_rps_resposta_v03.xsd">
+    <NumeroLote>123</NumeroLote>
+    <Situacao>4</Situacao>
+</ConsultarSituacaoLoteRpsResposta>"""
+
+RESPOSTA_LOTE = """<?xml version="1.0" encoding="UTF-8"?>
+<EnviarLoteRpsResposta xmlns="http://www.ginfes.com.br/servico_enviar_lote_rps_resposta_v03.xsd">
+    <NumeroLote>{}</NumeroLote>
+    <DataRecebimento>2024-01-15T14:30:25</DataRecebimento>
+    <Protocolo>P{}</Protocolo>
+</EnviarLoteRpsResposta>"""
+
+
+def criar_rps(numero: int) -> Rps:
+    return Rps(
+        id=f"R{numero}",
+        numero=str(numero),
+        tipo=TipoRps.rps,
+        serie="1",
+        data_emissao="2025-07-24T10:00:00",
+        natureza_operacao=NaturezaOperacao.tributacao_no_municipio,
+        optante_simples_nacional=False,
+        incentivador_cultural=False,
+        status=StatusRps.normal,
+        servico=DadosServico(
+            discriminacao="Serviços de desenvolvimento de software",
+            codigo_municipio=2304400,
+            valores=Valores(
+                valor_servico_centavos=100000,
+                valor_iss_centavos=3000,
+                aliquota_iss=0.03,
+            ),
+            codigo_tributacao_municipio="821130001",
+            item_lista_servico="01.01",
+        ),
+        prestador_cnpj="11.222.333/0001-81",
+        prestador_inscricao_municipal="123456",
+        tomador_cpf="529.982.247-25",
+    )
+
+
+class TestAsyncCliente(unittest.IsolatedAsyncioTestCase):
+    """Testes para a execução concorrente de consultas"""
+
+    def setUp(self):
+        for alvo in (
+            "abstra_notas.nfse.transporte.AsyncClient",
+            "abstra_notas.nfse.ce.fortaleza.base.carregar_wsdl",
+        ):
+            patcher = patch(alvo)
+            setattr(self, alvo.rpartition(".")[2], patcher.start())
+            self.addCleanup(patcher.stop)
+
+        self.diretorio = TemporaryDirectory()
+        self.addCleanup(self.diretorio.cleanup)
+        self.caminho_pfx = gerar_pfx_autoassinado(
+            Path(self.diretorio.name) / "certificado.pfx", "senha"
+        )
+        self.consultas = [
+            ConsultarSituacaoLoteRpsEnvio(
+                prestador_cnpj="11.222.333/0001-81",
+                prestador_inscricao_municipal="123456",
+                protocolo=str(protocolo),
+            )
+            for protocolo in range(5)
+        ]
+
+    async def test_consultas_concorrentes(self):
+        """Executa várias consultas com um único cliente SOAP e concorrência limitada"""
+        em_andamento = 0
+        maximo = 0
+        argumentos = []
+
+        async def consultar(*args):
+            nonlocal em_andamento, maximo
+            argumentos.append(args)
+            em_andamento += 1
+            maximo = max(maximo, em_andamento)
+            await asyncio.sleep(0.01)
+            em_andamento -= 1
+            return RESPOSTA
+
+        self.AsyncClient.return_value.service.ConsultarSituacaoLoteRpsV3 = consultar
+        async with AsyncCliente(self.caminho_pfx, "senha", concorrencia=2) as cliente:
+            respostas = await asyncio.gather(
+                *(cliente.executar(consulta) for consulta in self.consultas)
+            )
+
+        self.assertEqual(self.AsyncClient.call_count, 1)
+        self.assertEqual(maximo, 2)
+        self.assertEqual([r.numero_lote for r in respostas], ["123"] * 5)
+        cabecalho, requisicao = argumentos[0]
+        self.assertEqual(cabecalho, CABECALHO)
+        self.assertIn("Signature", requisicao)
+
+    async def test_executar_async(self):
+        """executar_async cria e encerra o próprio cliente"""
+
+        async def consultar(*args):
+            return RESPOSTA
+
+        self.AsyncClient.return_value.service.ConsultarSituacaoLoteRpsV3 = consultar
+        resposta = await self.consultas[0].executar_async(self.caminho_pfx, "senha")
+        self.assertEqual(resposta.numero_lote, "123")
+
+    async def test_enviar_rps_em_lotes(self):
+        """Divide os RPS em lotes de até 50 e associa cada RPS à resposta do seu lote"""
+
+        async def recepcionar(cabecalho, requisicao):
+            numero_lote = requisicao.split("NumeroLote>")[1].split("<")[0]
+            if numero_lote == "11":
+                raise ConnectionError("falha de rede")
+            return RESPOSTA_LOTE.format(numero_lote, numero_lote)
+
+        self.AsyncClient.return_value.service.RecepcionarLoteRpsV3 = recepcionar
+        async with AsyncCliente(self.caminho_pfx, "senha") as cliente:
+            resultado = await enviar_rps(
+                cliente,
+                (criar_rps(numero) for numero in range(1, 121)),
+                numero_lote_inicial=10,
+                prestador_cnpj="11.222.333/0001-81",
+                prestador_inscricao_municipal="123456",
+            )
+
+        self.assertEqual(len(resultado), 120)
+        self.assertEqual(resultado["1", "1"].protocolo, "P10")
+        self.assertIsInstance(resultado["1", "51"], ConnectionError)
+        self.assertEqual(resultado["1", "120"].protocolo, "P12")
+
+    def test_dividir_em_lotes(self):
+        """A quantidade de RPS do cabeçalho acompanha cada lote"""
+        lotes = EnviarLoteRpsEnvio.dividir_em_lotes(
+            [criar_rps(numero) for numero in range(1, 61)],
+            numero_lote_inicial=1,
+            prestador_cnpj="11.222.333/0001-81",
+            prestador_inscricao_municipal="123456",
+        )
+        self.assertEqual([lote.quantidade_rps for lote in lotes], [50, 10])
+        self.assertEqual([lote.numero_lote for lote in lotes], ["1", "2"])
+
+
+if __name__ == "__main__":
+    unittest.main()
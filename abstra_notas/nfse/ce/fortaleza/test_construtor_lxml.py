@@ -0,0 +1,143 @@
+"""
+Testes do construtor lxml do EnviarLoteRpsEnvio, comparado ao template.
+"""
+
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from lxml.etree import DocumentInvalid, fromstring
+from abstra_notas.assinatura import Assinador, AssinadorMock, gerar_pfx_autoassinado
+from abstra_notas.nfse.ce.fortaleza import (
+    EnviarLoteRpsEnvio,
+    Rps,
+    TipoRps,
+    NaturezaOperacao,
+    RegimeEspecialTributacao,
+    StatusRps,
+    DadosServico,
+    Valores,
+    Endereco,
+    Contato,
+)
+from abstra_notas.validacoes.xml_iguais import assert_c14n_iguais
+import xmlsec
+
+
+def criar_rps(numero: int, **kwargs) -> Rps:
+    return Rps(
+        **{
+            "id": f"R{numero}",
+            "numero": str(numero),
+            "tipo": TipoRps.rps,
+            "serie": "1",
+            "data_emissao": "2025-07-24T10:00:00",
+            "natureza_operacao": NaturezaOperacao.tributacao_no_municipio,
+            "optante_simples_nacional": False,
+            "incentivador_cultural": False,
+            "status": StatusRps.normal,
+            "servico": DadosServico(
+                discriminacao="Serviços de desenvolvimento de software",
+                codigo_municipio=2304400,
+                valores=Valores(
+                    valor_servico_centavos=100000,
+                    valor_iss_centavos=3000,
+                    aliquota_iss=0.03,
+                ),
+                codigo_tributacao_municipio="821130001",
+                item_lista_servico="01.01",
+            ),
+            "prestador_cnpj": "11.222.333/0001-81",
+            "prestador_inscricao_municipal": "123456",
+            "tomador_cpf": "529.982.247-25",
+            **kwargs,
+        }
+    )
+
+
+class TestConstrutorLxml(unittest.TestCase):
+    """Testes para a geração do XML sem o template"""
+
+    def setUp(self):
+        completo = criar_rps(
+            2,
+            regime_especial_tributacao=RegimeEspecialTributacao.estimativa,
+            tomador_cpf=None,
+            tomador_cnpj="11.222.333/0001-81",
+            tomador_inscricao_municipal="654321",
+            tomador_razao_social="EMPRESA TOMADORA",
+            tomador_endereco=Endereco(
+                logradouro="RUA TESTE",
+                numero="123",
+                complemento="SALA 2",
+                bairro="CENTRO",
+                codigo_municipio="2304400",
+                uf="CE",
+                cep="60000-000",
+            ),
+            tomador_contato=Contato(telefone="85999999999", email="contato@exemplo.com"),
+            servico=DadosServico(
+                discriminacao="Consultoria",
+                codigo_municipio=2304400,
+                valores=Valores(
+                    valor_servico_centavos=100000,
+                    valor_deducoes_centavos=100,
+                    valor_pis_centavos=200,
+                    valor_cofins_centavos=300,
+                    valor_inss_centavos=400,
+                    valor_ir_centavos=500,
+                    valor_csll_centavos=600,
+                    valor_iss_retido_centavos=3000,
+                    outras_retencoes_centavos=700,
+                    base_calculo_centavos=99900,
+                    aliquota_iss=0.03,
+                    valor_liquido_nfse_centavos=90000,
+                    desconto_incondicionado_centavos=800,
+                    desconto_condicionado_centavos=900,
+                ),
+                codigo_tributacao_municipio="821130001",
+                item_lista_servico="01.01",
+            ),
+        )
+        self.envio = EnviarLoteRpsEnvio(
+            lote_id="lote1",
+            numero_lote="1",
+            prestador_cnpj="11.222.333/0001-81",
+            prestador_inscricao_municipal="123456",
+            lista_rps=[criar_rps(1), completo],
+        )
+
+    def test_mesmo_xml_do_template(self):
+        assert_c14n_iguais(self.envio.construir_xml(), self.envio.gerar_xml())
+
+    def test_requisicao_assinada(self):
+        with TemporaryDirectory() as diretorio:
+            caminho_pfx = gerar_pfx_autoassinado(
+                Path(diretorio) / "certificado.pfx", "senha"
+            )
+            assinador = Assinador(caminho_pfx, "senha")
+
+        requisicao = fromstring(self.envio.requisicao(assinador, construtor="lxml"))
+        ctx = xmlsec.SignatureContext()
+        ctx.key = xmlsec.Key.from_memory(
+            assinador.cert_pem_bytes, xmlsec.constants.KeyDataFormatCertPem
+        )
+        ctx.verify(
+            requisicao.find("{http://www.w3.org/2000/09/xmldsig#}Signature")
+        )
+        self.assertEqual(
+            requisicao.findtext(".//{http://www.ginfes.com.br/tipos_v03.xsd}Cpf"),
+            "52998224725",
+        )
+
+    def test_requisicao_validada(self):
+        assinador = AssinadorMock()
+        for construtor in ("template", "lxml"):
+            self.envio.requisicao(assinador, construtor, validar=True)
+
+        self.envio.numero_lote = "um"
+        with self.assertRaises(DocumentInvalid):
+            self.envio.requisicao(assinador, "lxml", validar=True)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,232 @@
+"""
+Testes da consulta de NFS-e por período com paginação, com o cliente SOAP
+substituído por um mock.
+"""
+
+import threading
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest.mock import patch
+from lxml.etree import XMLParser, fromstring
+from abstra_notas.assinatura import gerar_pfx_autoassinado
+from abstra_notas.validacoes.xml_iguais import assert_xml_iguais
+from abstra_notas.nfse.ce.fortaleza import (
+    AsyncCliente,
+    ConsultarNfseEnvio,
+    ConsultarNfsePorPeriodoComPaginacaoEnvio,
+    NFSE_POR_PAGINA,
+    ler_comp_nfse,
+)
+from abstra_notas.nfse.ce.fortaleza.base import URL_PAGINACAO_PRODUCAO
+
+COMP_NFSE = """
+        <CompNfse>
+            <tipos:Nfse>
+                <tipos:InfNfse>
+                    <tipos:Numero>{}</tipos:Numero>
+                    <tipos:CodigoVerificacao>ABC123</tipos:CodigoVerificacao>
+                    <tipos:DataEmissao>2021-06-01T10:00:00</tipos:DataEmissao>
+                </tipos:InfNfse>
+            </tipos:Nfse>
+        </CompNfse>"""
+
+RESPOSTA = """<?xml version="1.0" encoding="UTF-8"?>
+<ConsultarNfseResposta xmlns="http://www.ginfes.com.br/servico_consultar_nfse_resposta_v03.xsd" xmlns:tipos="http://www.ginfes.com.br/tipos_v03.xsd">
+    <ListaNfse>{}
+    </ListaNfse>
+</ConsultarNfseResposta>"""
+
+RESPOSTA_ERRO = """<?xml version="1.0" encoding="UTF-8"?>
+<ConsultarNfseResposta xmlns="http://www.ginfes.com.br/servico_consultar_nfse_resposta_v03.xsd" xmlns:tipos="http://www.ginfes.com.br/tipos_v03.xsd">
+    <tipos:ListaMensagemRetorno>
+        <tipos:MensagemRetorno>
+            <tipos:Codigo>E160</tipos:Codigo>
+            <tipos:Mensagem>Nenhuma NFS-e encontrada</tipos:Mensagem>
+        </tipos:MensagemRetorno>
+    </tipos:ListaMensagemRetorno>
+</ConsultarNfseResposta>"""
+
+
+def resposta(inicio: int, quantidade: int) -> str:
+    return RESPOSTA.format(
+        "".join(
+            COMP_NFSE.format(numero) for numero in range(inicio, inicio + quantidade)
+        )
+    )
+
+
+def criar_consulta(**kwargs) -> ConsultarNfsePorPeriodoComPaginacaoEnvio:
+    return ConsultarNfsePorPeriodoComPaginacaoEnvio(
+        prestador_cnpj="11.222.333/0001-81",
+        prestador_inscricao_municipal="12345",
+        data_inicial="2021-06-01",
+        data_final="2021-06-30",
+        **kwargs,
+    )
+
+
+class TestConsultarNfsePorPeriodoComPaginacao(unittest.TestCase):
+    """Testes da consulta paginada e da leitura incremental das páginas"""
+
+    def setUp(self):
+        for alvo in ("Client", "carregar_wsdl"):
+            patcher = patch(f"abstra_notas.nfse.ce.fortaleza.base.{alvo}")
+            setattr(self, alvo, patcher.start())
+            self.addCleanup(patcher.stop)
+
+        self.diretorio = TemporaryDirectory()
+        self.addCleanup(self.diretorio.cleanup)
+        self.caminho_pfx = gerar_pfx_autoassinado(
+            Path(self.diretorio.name) / "certificado.pfx", "senha"
+        )
+
+    def test_xml_do_exemplo(self):
+        """O XML gerado é o do exemplo, que vai no envelope junto com a página"""
+        exemplo = (
+            Path(__file__).parent
+            / "exemplos"
+            / "exemplo_ConsultarNfsePorPeriodoComPaginacaoEnvio.xml"
+        ).read_text(encoding="iso-8859-1")
+        parser = XMLParser(remove_comments=True)
+        envelope = fromstring(exemplo, parser)
+        [requisicao] = envelope.xpath("//consultarNfseEnvio")
+        [numero_pagina] = envelope.xpath("//numeroPagina")
+        # O CNPJ do exemplo não tem dígitos verificadores válidos.
+        requisicao = requisicao.text.replace("12345678901234", "11222333000181")
+
+        consulta = criar_consulta(pagina=int(numero_pagina.text))
+        assert_xml_iguais(
+            consulta.gerar_xml(),
+            fromstring(requisicao.encode("iso-8859-1"), parser),
+            ignorar_tags=["{http://www.w3.org/2000/09/xmldsig#}Signature"],
+        )
+        self.assertEqual(consulta.argumentos("<xml/>"), ("<xml/>", 1))
+
+    def test_ler_comp_nfse(self):
+        """Lê as notas e as mensagens de retorno de uma página"""
+        notas = list(ler_comp_nfse(resposta(1, 3)))
+        self.assertEqual([nota.nfse.numero for nota in notas], ["1", "2", "3"])
+        self.assertEqual(notas[0].nfse.codigo_verificacao, "ABC123")
+
+        mensagens = []
+        notas = list(ler_comp_nfse(RESPOSTA_ERRO.encode("utf-8"), mensagens))
+        self.assertEqual(notas, [])
+        self.assertEqual([mensagem.codigo for mensagem in mensagens], ["E160"])
+
+    def test_iter_comp_nfse(self):
+        """Percorre as páginas até a primeira incompleta, com um único cliente SOAP"""
+        paginas = []
+
+        def consultar(requisicao, pagina):
+            paginas.append(pagina)
+            quantidade = NFSE_POR_PAGINA if pagina < 3 else 7
+            return resposta((pagina - 1) * NFSE_POR_PAGINA + 1, quantidade)
+
+        self.Client.return_value.service.consultarNfse = consultar
+        notas = criar_consulta().iter_comp_nfse(self.caminho_pfx, "senha")
+
+        self.assertEqual(next(notas).nfse.numero, "1")
+        self.assertEqual(paginas, [1])
+        numeros = [nota.nfse.numero for nota in notas]
+
+        self.assertEqual(paginas, [1, 2, 3])
+        self.assertEqual(numeros, [str(n) for n in range(2, 2 * NFSE_POR_PAGINA + 8)])
+        self.assertEqual(self.Client.call_count, 1)
+        self.assertEqual(self.carregar_wsdl.call_args.args[0], URL_PAGINACAO_PRODUCAO)
+
+    def test_iter_comp_nfse_mensagens(self):
+        """Uma página com mensagens de retorno encerra a consulta"""
+        self.Client.return_value.service.consultarNfse = (
+            lambda requisicao, pagina: RESPOSTA_ERRO
+        )
+        mensagens = []
+        notas = list(
+            criar_consulta(pagina=4).iter_comp_nfse(
+                self.caminho_pfx, "senha", mensagens=mensagens
+            )
+        )
+        self.assertEqual(notas, [])
+        self.assertEqual([mensagem.codigo for mensagem in mensagens], ["E160"])
+
+    def test_consultar_nfse_iter_comp_nfse(self):
+        """A consulta sem paginação também pode ser lida incrementalmente"""
+        self.Client.return_value.service.ConsultarNfseV3 = (
+            lambda cabecalho, requisicao: resposta(1, 3)
+        )
+        consulta = ConsultarNfseEnvio(
+            prestador_cnpj="11.222.333/0001-81",
+            prestador_inscricao_municipal="12345",
+            data_inicial="2021-06-01",
+            data_final="2021-06-30",
+        )
+        notas = consulta.iter_comp_nfse(self.caminho_pfx, "senha")
+        self.assertEqual([nota.nfse.numero for nota in notas], ["1", "2", "3"])
+
+
+class TestConsultarNfsePorPeriodoComPaginacaoAsync(unittest.IsolatedAsyncioTestCase):
+    """Testes da versão assíncrona da consulta paginada"""
+
+    def setUp(self):
+        for alvo in (
+            "abstra_notas.nfse.transporte.AsyncClient",
+            "abstra_notas.nfse.ce.fortaleza.base.carregar_wsdl",
+        ):
+            patcher = patch(alvo)
+            setattr(self, alvo.rpartition(".")[2], patcher.start())
+            self.addCleanup(patcher.stop)
+
+        self.diretorio = TemporaryDirectory()
+        self.addCleanup(self.diretorio.cleanup)
+        self.caminho_pfx = gerar_pfx_autoassinado(
+            Path(self.diretorio.name) / "certificado.pfx", "senha"
+        )
+
+    async def test_iter_comp_nfse_async(self):
+        """Percorre as páginas com as conexões do AsyncCliente"""
+
+        async def consultar(requisicao, pagina):
+            return resposta(1, NFSE_POR_PAGINA) if pagina == 1 else resposta(1, 0)
+
+        self.AsyncClient.return_value.service.consultarNfse = consultar
+        async with AsyncCliente(self.caminho_pfx, "senha") as cliente:
+            notas = [
+                nota async for nota in criar_consulta().iter_comp_nfse_async(cliente)
+            ]
+
+        self.assertEqual(len(notas), NFSE_POR_PAGINA)
+        wsdl = self.carregar_wsdl.call_args.args[0]
+        self.assertEqual(wsdl, URL_PAGINACAO_PRODUCAO)
+
+    async def test_iter_comp_nfse_async_mensagens(self):
+        """As páginas são lidas fora do loop e as mensagens encerram a consulta"""
+        paginas = []
+        threads = []
+
+        async def consultar(requisicao, pagina):
+            paginas.append(pagina)
+            return resposta(1, NFSE_POR_PAGINA) if pagina == 1 else RESPOSTA_ERRO
+
+        def ler_em_thread(*args):
+            threads.append(threading.current_thread())
+            return ler_comp_nfse(*args)
+
+        self.AsyncClient.return_value.service.consultarNfse = consultar
+        mensagens = []
+        with patch("abstra_notas.nfse.ce.fortaleza.ler_comp_nfse", ler_em_thread):
+            async with AsyncCliente(self.caminho_pfx, "senha") as cliente:
+                notas = [
+                    nota
+                    async for nota in criar_consulta().iter_comp_nfse_async(
+                        cliente, mensagens
+                    )
+                ]
+
+        self.assertEqual(len(notas), NFSE_POR_PAGINA)
+        self.assertEqual(paginas, [1, 2])
+        self.assertEqual([mensagem.codigo for mensagem in mensagens], ["E160"])
+        self.assertNotIn(threading.current_thread(), threads)
+
+
+if __name__ == "__main__":
+    unittest.main()
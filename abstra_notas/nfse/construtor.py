@@ -0,0 +1,38 @@
+from lxml.etree import ElementBase, QName, SubElement
+from typing import Any, Literal, Optional, Union
+
+Construtor = Literal["template", "lxml"]
+"""
+Forma de gerar o XML das requisições:
+
+- `"template"`: renderiza o template Jinja e interpreta o texto gerado.
+- `"lxml"`: monta os elementos diretamente com o lxml e assina o próprio
+  documento, sem passar por texto. Os pedidos sem construtor próprio usam o
+  template.
+
+Os dois geram o mesmo XML canônico, a menos da indentação dos templates.
+"""
+
+SEM_NAMESPACE = {None: ""}
+"""
+`nsmap` de elementos sem namespace dentro de um elemento com namespace padrão.
+Sem a declaração explícita de `xmlns=""`, o lxml serializa esses elementos no
+namespace do pai.
+"""
+
+
+def validar_construtor(construtor: Construtor):
+    assert construtor in ("template", "lxml"), f"Construtor inválido: {construtor}"
+
+
+def filho(
+    pai: ElementBase, tag: Union[str, QName], texto: Optional[Any] = None, **kwargs
+) -> ElementBase:
+    """
+    Adiciona um elemento a `pai`, com `str(texto)` como conteúdo, assim como os
+    templates renderizam os valores.
+    """
+    elemento = SubElement(pai, tag, **kwargs)
+    if texto is not None:
+        elemento.text = str(texto)
+    return elemento
@@ -0,0 +1,85 @@
+from lxml.etree import ElementBase, XMLPullParser
+from typing import BinaryIO, Iterator, List, Optional, Union
+
+TAMANHO_BLOCO = 64 * 1024
+"""
+Tamanho dos blocos, em caracteres ou bytes, entregues ao parser.
+"""
+
+
+def _blocos(resposta: Union[str, bytes, BinaryIO]) -> Iterator[Union[str, bytes]]:
+    if isinstance(resposta, (str, bytes)):
+        for inicio in range(0, len(resposta), TAMANHO_BLOCO):
+            yield resposta[inicio : inicio + TAMANHO_BLOCO]
+        return
+    bloco = resposta.read(TAMANHO_BLOCO)
+    while bloco:
+        yield bloco
+        bloco = resposta.read(TAMANHO_BLOCO)
+
+
+def _lidos(parser: XMLPullParser) -> Iterator[ElementBase]:
+    for _, elemento in parser.read_events():
+        yield elemento
+        elemento.clear()
+        while elemento.getprevious() is not None:
+            del elemento.getparent()[0]
+
+
+def iterar_elementos(
+    resposta: Union[str, bytes, BinaryIO], *tags: str
+) -> Iterator[ElementBase]:
+    """
+    Percorre os elementos com os nomes `tags`, em qualquer namespace, à medida
+    que a resposta é lida, sem montar a árvore inteira: cada elemento é
+    descartado, junto com os irmãos anteriores, quando o próximo é pedido.
+
+    Respostas em `str`, como as devolvidas pelo zeep, são entregues ao parser
+    em blocos, sem copiar o texto inteiro com `encode`.
+    """
+    parser = XMLPullParser(
+        events=("end",), tag=[f"{{*}}{tag}" for tag in tags], huge_tree=True
+    )
+    for bloco in _blocos(resposta):
+        parser.feed(bloco)
+        yield from _lidos(parser)
+    parser.close()
+    yield from _lidos(parser)
+
+
+def find_element(parent: ElementBase, tag_name: str) -> Optional[ElementBase]:
+    """
+    Busca um elemento ignorando namespace: um filho sem namespace chamado
+    `tag_name` ou, se não houver, o primeiro descendente com esse nome local.
+
+    A busca usa o filtro de tags do lxml (`{*}tag_name`), que percorre a árvore
+    em C e para no primeiro elemento encontrado, sem compilar uma expressão
+    XPath a cada chamada.
+    """
+    element = parent.find(tag_name)
+    if element is not None:
+        return element
+    element = next(parent.iterdescendants(f"{{*}}{tag_name}"), None)
+    if element is not None:
+        return element
+    # Como a busca antiga por `parent.iter()`, o próprio `parent` também vale.
+    if parent.tag.rpartition("}")[2] == tag_name:
+        return parent
+    return None
+
+
+def find_text(parent: ElementBase, tag_name: str, default: str = ""):
+    """
+    Busca o texto de um elemento ignorando namespace.
+    """
+    element = find_element(parent, tag_name)
+    return element.text if element is not None else default
+
+
+def find_all_elements(parent: ElementBase, tag_name: str) -> List[ElementBase]:
+    """
+    Busca todos os descendentes com o nome especificado ignorando namespace.
+    Se algum deles não tiver namespace, apenas esses são retornados.
+    """
+    elements = list(parent.iterdescendants(f"{{*}}{tag_name}"))
+    return [element for element in elements if element.tag == tag_name] or elements
@@ -0,0 +1,76 @@
+from unittest import TestCase
+from unittest.mock import patch
+from io import BytesIO
+from . import leitura
+from lxml.etree import fromstring
+from .leitura import find_all_elements, find_element, find_text, iterar_elementos
+
+RESPOSTA = """<?xml version="1.0" encoding="ISO-8859-1"?>
+<Resposta xmlns="urn:resposta">
+    <Cabecalho xmlns=""><Sucesso>true</Sucesso></Cabecalho>
+    <Lista>{}</Lista>
+</Resposta>"""
+
+
+class LeituraTest(TestCase):
+    def setUp(self):
+        patcher = patch.object(leitura, "TAMANHO_BLOCO", 100)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.resposta = RESPOSTA.format(
+            "".join(
+                f"<Nota><Numero>{i}</Numero><Nome>João</Nome></Nota>" for i in range(50)
+            )
+        )
+
+    def test_iterar_elementos(self):
+        for resposta in (
+            self.resposta,
+            self.resposta.encode("iso-8859-1"),
+            BytesIO(self.resposta.encode("iso-8859-1")),
+        ):
+            lidos = [
+                (elemento.tag, elemento.findtext("{*}Nome") or elemento.text)
+                for elemento in iterar_elementos(resposta, "Sucesso", "Nota")
+            ]
+            self.assertEqual(
+                lidos, [("Sucesso", "true")] + [("{urn:resposta}Nota", "João")] * 50
+            )
+
+    def test_descarta_elementos_lidos(self):
+        for elemento in iterar_elementos(self.resposta, "Nota"):
+            self.assertEqual(len(elemento), 2)
+            # Só o elemento anterior, já limpo, continua na árvore.
+            anteriores = list(elemento.itersiblings(preceding=True))
+            self.assertLessEqual(len(anteriores), 1)
+            self.assertTrue(all(len(anterior) == 0 for anterior in anteriores))
+
+
+class BuscaSemNamespaceTest(TestCase):
+    def setUp(self):
+        self.xml = fromstring(
+            """<Resposta xmlns="urn:resposta" xmlns:tipos="urn:tipos">
+                <tipos:Nota><tipos:Numero>1</tipos:Numero></tipos:Nota>
+                <tipos:Nota><tipos:Numero>2</tipos:Numero></tipos:Nota>
+                <Numero xmlns="">3</Numero>
+            </Resposta>"""
+        )
+
+    def test_find_element(self):
+        # Um filho sem namespace tem prioridade sobre descendentes anteriores.
+        self.assertEqual(find_text(self.xml, "Numero"), "3")
+        nota = find_element(self.xml, "Nota")
+        self.assertEqual(nota.tag, "{urn:tipos}Nota")
+        self.assertEqual(find_text(nota, "Numero"), "1")
+        self.assertIs(find_element(nota, "Nota"), nota)
+        self.assertIsNone(find_element(nota, "Serie"))
+        self.assertEqual(find_text(nota, "Serie", "padrão"), "padrão")
+
+    def test_find_all_elements(self):
+        notas = find_all_elements(self.xml, "Nota")
+        self.assertEqual([find_text(nota, "Numero") for nota in notas], ["1", "2"])
+        # Havendo elementos sem namespace, apenas eles são retornados.
+        self.assertEqual(
+            [numero.text for numero in find_all_elements(self.xml, "Numero")], ["3"]
+        )
+        self.assertEqual(find_all_elements(self.xml, "Serie"), [])
@@ -0,0 +1,41 @@
+from typing import Callable, Iterable, Iterator, List, TypeVar
+
+T = TypeVar("T")
+
+RESERVA_LOTE = 8 * 1024
+"""
+Bytes reservados em cada lote para o cabeçalho e a assinatura XMLDSig, que
+inclui o certificado em base64.
+"""
+
+
+def dividir_em_lotes(
+    itens: Iterable[T],
+    tamanho: Callable[[T], int],
+    maximo_itens: int,
+    maximo_bytes: int,
+) -> Iterator[List[T]]:
+    """
+    Divide os itens, na ordem em que aparecem, em lotes com no máximo
+    `maximo_itens` itens e `maximo_bytes` bytes.
+
+    :param tamanho: Função que estima o tamanho, em bytes, de um item no XML.
+    :param maximo_bytes: Tamanho máximo do lote, incluindo `RESERVA_LOTE`.
+    """
+    disponivel = maximo_bytes - RESERVA_LOTE
+    lote: List[T] = []
+    ocupado = 0
+    for item in itens:
+        tamanho_item = tamanho(item)
+        if tamanho_item > disponivel:
+            raise ValueError(
+                f"O item ocupa {tamanho_item} bytes e não cabe em um lote "
+                f"de {maximo_bytes} bytes"
+            )
+        if lote and (len(lote) == maximo_itens or ocupado + tamanho_item > disponivel):
+            yield lote
+            lote, ocupado = [], 0
+        lote.append(item)
+        ocupado += tamanho_item
+    if lote:
+        yield lote
@@ -0,0 +1,22 @@
+from unittest import TestCase
+from .lotes import RESERVA_LOTE, dividir_em_lotes
+
+
+class DividirEmLotesTest(TestCase):
+    def test_limite_de_itens(self):
+        lotes = list(dividir_em_lotes(range(120), lambda _: 1, 50, 100 * 1024))
+        self.assertEqual([len(lote) for lote in lotes], [50, 50, 20])
+        self.assertEqual([item for lote in lotes for item in lote], list(range(120)))
+
+    def test_limite_de_bytes(self):
+        lotes = list(
+            dividir_em_lotes(range(10), lambda _: 1000, 50, RESERVA_LOTE + 3000)
+        )
+        self.assertEqual([len(lote) for lote in lotes], [3, 3, 3, 1])
+
+    def test_item_maior_que_o_lote(self):
+        with self.assertRaises(ValueError):
+            list(dividir_em_lotes([1], lambda _: 10_000, 50, RESERVA_LOTE + 100))
+
+    def test_sem_itens(self):
+        self.assertEqual(list(dividir_em_lotes([], len, 50, 100 * 1024)), [])
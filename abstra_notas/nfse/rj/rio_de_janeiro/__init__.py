@@ -1,6 +1,14 @@
 from dataclasses import dataclass
 from datetime import datetime
-from .base import Envio
+from .base import Envio, AsyncCliente, cliente_sincrono
+from abstra_notas.assinatura import obter_assinador
+from abstra_notas.nfse.leitura import (
+    find_all_elements,
+    find_element,
+    find_text,
+    iterar_elementos,
+)
+from abstra_notas.nfse.transporte import Depuracao
 from abstra_notas.validacoes.cnpj import normalizar_cnpj
 from abstra_notas.validacoes.data import normalizar_data
 from abstra_notas.validacoes.cpf import normalizar_cpf
@@ -9,66 +17,11 @@ from abstra_notas.validacoes.cep import normalizar_cep
 from abstra_notas.validacoes.email import validar_email
 from abstra_notas.validacoes.telefone import normalizar_validar_telefone
 from abstra_notas.validacoes.inscricao_municipal import normalizar_inscricao_municipal
-from typing import List, Optional
-from lxml.etree import ElementBase
+from typing import BinaryIO, Iterator, List, Optional, Union
+from lxml.etree import ElementBase, QName
+from pathlib import Path
 from enum import Enum
 
-def find_element(parent: ElementBase, tag_name: str):
-    """
-    Busca um elemento ignorando namespace.
-    """
-    element = parent.find(tag_name)
-    if element is not None:
-        return element
-    
-    # Se não encontrou, busca com qualquer namespace usando xpath
-    try:
-        xpath = f".//*[local-name()='{tag_name}']"
-        elements = parent.xpath(xpath)
-        if elements:
-            return elements[0]
-        else:
-            pass
-    except Exception as e:
-        print(f"Erro no XPath para '{tag_name}': {e}")
-        
-    # Fallback: busca por todos os filhos e verifica o nome local
-    for elem in parent.iter():
-        if elem.tag.split('}')[-1] == tag_name: 
-            return elem
-    return None
-
-
-def find_text(parent: ElementBase, tag_name: str, default: str = ''):
-    """
-    Busca o texto de um elemento ignorando namespace.
-    """
-    element = find_element(parent, tag_name)
-    return element.text if element is not None else default
-
-
-def find_all_elements(parent: ElementBase, tag_name: str):
-    """
-    Busca todos os elementos com o nome especificado ignorando namespace.
-    """
-    # Busca primeiro sem namespace
-    elements = parent.findall(f".//{tag_name}")
-    if elements:
-        return elements
-    
-    # Se não encontrou, busca com qualquer namespace
-    try:
-        xpath = f".//*[local-name()='{tag_name}']"
-        return parent.xpath(xpath)
-    except Exception as e:
-        print(f"Erro no XPath para '{tag_name}': {e}")
-        print(f"XPath usado: .//*[local-name()='{tag_name}']")
-        # Fallback: busca por todos os elementos e filtra pelo nome local
-        result = []
-        for elem in parent.iter():
-            if elem.tag.split('}')[-1] == tag_name: 
-                result.append(elem)
-        return result
 
 class TipoRps(Enum):
     """
@@ -1160,6 +1113,27 @@ class ConsultarNfseResposta:
                 lista_mensagem_retorno=None
             )
         
+def ler_comp_nfse(
+    resposta: Union[str, bytes, BinaryIO],
+    mensagens: Optional[List[MensagemRetorno]] = None,
+) -> Iterator[CompNfse]:
+    """
+    Lê os `CompNfse` de uma `ConsultarNfseResposta` um a um, à medida que a
+    resposta é lida, sem montar a árvore nem a lista inteira. Aceita a
+    resposta sem processar de `Envio.chamar` ou `AsyncCliente.chamar`:
+
+        for comp_nfse in ler_comp_nfse(await cliente.chamar(consulta)):
+            ...
+
+    :param mensagens: Lista que recebe as mensagens de retorno, se houver.
+    """
+    for elemento in iterar_elementos(resposta, "CompNfse", "MensagemRetorno"):
+        if QName(elemento).localname == "CompNfse":
+            yield CompNfse.from_xml(elemento)
+        elif mensagens is not None:
+            mensagens.append(MensagemRetorno.from_xml(elemento))
+
+
 @dataclass
 class ConsultarNfseEnvio(Envio[ConsultarNfseResposta]):
     """
@@ -1200,6 +1174,25 @@ class ConsultarNfseEnvio(Envio[ConsultarNfseResposta]):
     
     def resposta(self, xml):
         return ConsultarNfseResposta.from_xml(xml)
+
+    def iter_comp_nfse(
+        self,
+        caminho_pfx: Path,
+        senha_pfx: str,
+        homologacao=False,
+        depuracao: Optional[Depuracao] = None,
+        validar: bool = False,
+        mensagens: Optional[List[MensagemRetorno]] = None,
+    ) -> Iterator[CompNfse]:
+        """
+        Versão incremental de `executar`, que lê a resposta com `ler_comp_nfse`.
+
+        :param mensagens: Lista que recebe as mensagens de retorno, se houver.
+        """
+        assinador = obter_assinador(caminho_pfx, senha_pfx)
+        with cliente_sincrono(assinador, homologacao) as client:
+            response = self.chamar(client, assinador, validar, depuracao)
+        yield from ler_comp_nfse(response, mensagens)
     
 
 @dataclass
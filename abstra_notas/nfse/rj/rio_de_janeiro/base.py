@@ -1,44 +1,79 @@
 from abc import abstractmethod, ABC
-from abstra_notas.assinatura import Assinador
+from abstra_notas.assinatura import Assinador, obter_assinador
+from abstra_notas.nfse.wsdl import carregar_wsdl, localizar_wsdl, obter_cache_wsdl
+from abstra_notas.nfse.schemas import validar_xml
+from abstra_notas.nfse.transporte import (
+    AdaptadorSSL,
+    AsyncClienteBase,
+    Depuracao,
+    contexto_ssl,
+)
 from .templates import load_template
 from zeep.plugins import HistoryPlugin
 from zeep import Client, Transport, Settings
+from zeep.wsdl import Document
 from requests import Session
-from requests.adapters import HTTPAdapter
-from urllib3.poolmanager import PoolManager
 from lxml.etree import tostring, fromstring, ElementBase
 from pathlib import Path
-from typing import Generic, TypeVar
-from tempfile import mktemp
-import ssl
+from typing import Generic, Iterator, Optional, TypeVar
+from contextlib import contextmanager
+from functools import partial
 
 
 
 T = TypeVar('T', bound='Envio')
 
+URL_PRODUCAO = "https://notacarioca.rio.gov.br/WSNacional/nfse.asmx?wsdl"
+URL_HOMOLOGACAO = "https://notacariocahom.rio.gov.br/WSNacional/nfse.asmx?wsdl"
+TIMEOUT = 500
+
 # Adapta para o TLS antigo de forma a ser compatível com o servidor da prefeitura do Rio de Janeiro
-class TLSAdapterCorrigido(HTTPAdapter):
-    """Adaptador TLS corrigido para resolver problemas de SSL"""
-    def init_poolmanager(self, connections, maxsize, block=False, **pool_kwargs):
-        ctx = ssl.create_default_context()
-        ctx.set_ciphers("HIGH:!DH:!aNULL")
-        ctx.check_hostname = False
-        ctx.verify_mode = ssl.CERT_NONE
-        ctx.minimum_version = ssl.TLSVersion.TLSv1_2
-        ctx.maximum_version = ssl.TLSVersion.TLSv1_3
-        
-        try:
-            ctx.options |= ssl.OP_NO_COMPRESSION
-        except AttributeError:
-            pass
-        
-        self.poolmanager = PoolManager(
-            num_pools=connections, 
-            maxsize=maxsize, 
-            block=block, 
-            ssl_context=ctx
+CIFRAS = "HIGH:!DH:!aNULL"
+
+
+class TLSAdapterCorrigido(AdaptadorSSL):
+    """
+    Adaptador TLS corrigido para resolver problemas de SSL. Sem `assinador`,
+    as conexões são feitas sem certificado cliente.
+    """
+    def __init__(self, assinador: Optional[Assinador] = None, **kwargs):
+        super().__init__(
+            contexto_ssl(assinador, verificar=False, cifras=CIFRAS), **kwargs
+        )
+
+
+def carregar_wsdl_rio(homologacao: bool, transport: Transport, settings: Settings) -> Document:
+    return carregar_wsdl(
+        localizar_wsdl(
+            Path(__file__).parent,
+            "homologacao" if homologacao else "producao",
+            URL_HOMOLOGACAO if homologacao else URL_PRODUCAO,
+        ),
+        transport,
+        settings,
+    )
+
+
+@contextmanager
+def cliente_sincrono(assinador: Assinador, homologacao: bool) -> Iterator[Client]:
+    """
+    Cliente SOAP síncrono, com a sessão HTTP aberta até o fim do bloco `with`.
+    """
+    with Session() as session:
+        session.verify = False
+
+        session.mount('https://', TLSAdapterCorrigido(assinador))
+
+        settings = Settings(strict=True, xml_huge_tree=True)
+        transport = Transport(session=session, cache=obter_cache_wsdl(), timeout=TIMEOUT)
+        yield Client(
+            carregar_wsdl_rio(homologacao, transport, settings),
+            transport=transport,
+            settings=settings,
+            plugins=[HistoryPlugin()],
         )
 
+
 class Envio(ABC, Generic[T]):
     def gerar_xml(self) -> ElementBase:
 
@@ -61,52 +96,126 @@ class Envio(ABC, Generic[T]):
     def schema_path(self) -> Path:
         return Path(__file__).parent / "schemas" / f"{self.nome_operacao()}.xsd"
 
+    def requisicao(self, assinador: Assinador, validar: bool = False) -> str:
+        """
+        Gera o XML enviado ao webservice.
 
-    def executar(self, caminho_pfx: Path, senha_pfx: str, homologacao=False) -> T:
-        assinador = Assinador(caminho_pfx, senha_pfx)
-        try:
-            history = HistoryPlugin()
-            keyfile = Path(mktemp())
-            keyfile.write_bytes(assinador.private_key_pem_bytes)
-            certfile = Path(mktemp())
-            certfile.write_bytes(assinador.cert_pem_bytes)
-
-            xml = self.gerar_xml()
-            session = Session()
-            session.cert = (certfile, keyfile)
-            session.verify = False
+        :param validar: Valida o XML com o schema em `schemas/`, lançando
+            `lxml.etree.DocumentInvalid` se ele for inválido.
+        """
+        xml_assinado = self.gerar_xml()
+        #xml_assinado = assinador.assinar_xml(xml)
+        if validar:
+            validar_xml(Path(__file__).parent / "schemas", xml_assinado)
+        return tostring(xml_assinado, encoding=str)
+
+    def executar(
+        self,
+        caminho_pfx: Path,
+        senha_pfx: str,
+        homologacao=False,
+        depuracao: Optional[Depuracao] = None,
+        validar: bool = False,
+    ) -> T:
+        """
+        :param depuracao: Função chamada com a operação, a requisição e a resposta.
+            Veja `abstra_notas.nfse.transporte.depuracao_em_diretorio`.
+        :param validar: Valida a requisição com o schema da prefeitura antes de
+            enviá-la, para que requisições malformadas falhem sem chamar o
+            webservice.
+        """
+        assinador = obter_assinador(caminho_pfx, senha_pfx)
+
+        with cliente_sincrono(assinador, homologacao) as client:
+            response = self.chamar(client, assinador, validar, depuracao)
+        xml_resposta =  fromstring(response.encode("utf-8"))
+        return self.resposta(xml_resposta)
+
+    def chamar(
+        self,
+        client: Client,
+        assinador: Assinador,
+        validar: bool = False,
+        depuracao: Optional[Depuracao] = None,
+    ) -> str:
+        """
+        Executa a operação com um cliente SOAP já criado (veja
+        `cliente_sincrono`) e retorna a resposta sem processá-la.
+        """
+        requisicao = self.requisicao(assinador, validar)
+        response: str = getattr(client.service, self.nome_operacao())(requisicao)
+        if depuracao is not None:
+            depuracao(self.nome_operacao(), requisicao, response)
+        return response
+
+    async def executar_async(
+        self,
+        caminho_pfx: Path,
+        senha_pfx: str,
+        homologacao=False,
+        depuracao: Optional[Depuracao] = None,
+        validar: bool = False,
+    ) -> T:
+        """
+        Versão assíncrona de `executar`. Para várias operações, prefira um
+        único `AsyncCliente`, que mantém as conexões abertas entre chamadas.
+        """
+        async with AsyncCliente(
+            caminho_pfx, senha_pfx, homologacao, depuracao=depuracao, validar=validar
+        ) as cliente:
+            return await cliente.executar(self)
 
-            session.mount('https://', TLSAdapterCorrigido())
 
-            settings = Settings(strict=True, xml_huge_tree=True)
-            transport = Transport(session=session, cache=None, timeout=500)
+class AsyncCliente(AsyncClienteBase):
+    """
+    Cliente assíncrono do webservice do Rio de Janeiro, com as mesmas cifras
+    TLS do `TLSAdapterCorrigido`. O transporte, as conexões e o cliente SOAP
+    são criados uma vez e compartilhados por todas as operações:
 
-            if homologacao:
-                url = "https://notacariocahom.rio.gov.br/WSNacional/nfse.asmx?wsdl"
-            else:
-                url= "https://notacarioca.rio.gov.br/WSNacional/nfse.asmx?wsdl"
-            client = Client(
-                url, transport=transport, settings=settings, plugins=[history]
+        async with AsyncCliente(caminho_pfx, senha_pfx) as cliente:
+            respostas = await asyncio.gather(
+                *(cliente.executar(consulta) for consulta in consultas)
             )
 
-            # Assina o XML
-            xml_assinado = xml
-            #xml_assinado = assinador.assinar_xml(xml)
-
-            request_tmp_path = Path(mktemp())
-            request_tmp_path.write_text(tostring(xml_assinado, encoding=str), encoding="utf-8")
-            #print(f"Request saved to: {request_tmp_path}")
-
+    Requer o httpx, instalado com `pip install abstra_notas[async]`.
+    """
+
+    def __init__(
+        self,
+        caminho_pfx: Path,
+        senha_pfx: str,
+        homologacao=False,
+        concorrencia: int = 10,
+        depuracao: Optional[Depuracao] = None,
+        validar: bool = False,
+    ):
+        """
+        :param concorrencia: Número máximo de operações simultâneas.
+        :param depuracao: Função chamada com a operação, a requisição e a resposta.
+        :param validar: Valida a requisição com o schema da prefeitura antes de
+            enviá-la, para que requisições malformadas falhem sem chamar o
+            webservice.
+        """
+        self.assinador = obter_assinador(caminho_pfx, senha_pfx)
+        self.homologacao = homologacao
+        self.validar = validar
+        super().__init__(
+            partial(carregar_wsdl_rio, homologacao),
+            contexto_ssl(self.assinador, verificar=False, cifras=CIFRAS),
+            concorrencia=concorrencia,
+            depuracao=depuracao,
+            timeout=TIMEOUT,
+        )
 
-            response: str = getattr(client.service, self.nome_operacao())( tostring(xml_assinado, encoding=str))
+    async def executar(self, envio: Envio[T]) -> T:
+        return envio.resposta(fromstring((await self.chamar(envio)).encode("utf-8")))
 
-            response_temp_path = Path(mktemp())
-            response_temp_path.write_text(response, encoding="utf-8")
-            #print(f"Response saved to: {response_temp_path}")
-            xml_resposta =  fromstring(response.encode("utf-8"))
-            return self.resposta(xml_resposta)
-        finally:
-            if keyfile.exists():
-                keyfile.unlink()
-            if certfile.exists():
-                certfile.unlink()
\ No newline at end of file
+    async def chamar(self, envio: Envio) -> str:
+        """
+        Executa a operação e retorna a resposta sem processá-la.
+        """
+        return await self._chamar_operacao(
+            envio.nome_operacao(),
+            partial(envio.requisicao, self.assinador, self.validar),
+            lambda requisicao: (requisicao,),
+        )
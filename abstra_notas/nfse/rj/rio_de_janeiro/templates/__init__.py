@@ -1,12 +1,15 @@
 from jinja2 import Template
 from pathlib import Path
+from abstra_notas.nfse.templates import carregar_template
 
 def load_template(template_name: str) -> Template:
     """
     Load a Jinja2 template by its name.
 
+    The compiled template is cached and shared across calls.
+
     :param template_name: The name of the template to load.
     :return: A Jinja2 Template object.
     """
 
-    return Template((Path(__file__).parent / f"{template_name}.xml").read_text(encoding="utf-8"))
+    return carregar_template(Path(__file__).parent, template_name)
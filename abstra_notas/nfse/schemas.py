@@ -0,0 +1,63 @@
+from lxml.etree import ElementBase, QName, XMLSchema, XMLSchemaParseError, parse
+from pathlib import Path
+from threading import Lock
+from typing import Dict, Union
+
+XSD = "http://www.w3.org/2001/XMLSchema"
+
+_schemas: Dict[Path, XMLSchema] = {}
+_indices: Dict[Path, Dict[str, XMLSchema]] = {}
+_lock = Lock()
+
+
+def carregar_schema(caminho: Union[str, Path]) -> XMLSchema:
+    """
+    Retorna o schema em `caminho`, compilado uma única vez por processo e
+    compartilhado por todas as chamadas.
+    """
+    caminho = Path(caminho)
+    schema = _schemas.get(caminho)
+    if schema is not None:
+        return schema
+
+    with _lock:
+        schema = _schemas.get(caminho)
+        if schema is None:
+            schema = XMLSchema(file=str(caminho))
+            _schemas[caminho] = schema
+        return schema
+
+
+def _indice(diretorio: Path) -> Dict[str, XMLSchema]:
+    indice = _indices.get(diretorio)
+    if indice is not None:
+        return indice
+
+    indice = {}
+    for caminho in sorted(diretorio.glob("*.xsd")):
+        raiz = parse(str(caminho)).getroot()
+        namespace = raiz.get("targetNamespace")
+        try:
+            schema = carregar_schema(caminho)
+        except XMLSchemaParseError:
+            # Schemas que dependem de arquivos não distribuídos.
+            continue
+        for elemento in raiz.iterfind(f"{{{XSD}}}element"):
+            indice.setdefault(QName(namespace, elemento.get("name")).text, schema)
+
+    with _lock:
+        return _indices.setdefault(diretorio, indice)
+
+
+def validar_xml(diretorio: Union[str, Path], xml: ElementBase):
+    """
+    Valida `xml` com o schema de `diretorio` que declara o seu elemento raiz,
+    lançando `lxml.etree.DocumentInvalid` se ele for inválido. Os schemas do
+    diretório são compilados na primeira validação.
+
+    Documentos sem schema no diretório, ou cujo schema não compila, não são
+    validados.
+    """
+    schema = _indice(Path(diretorio)).get(xml.tag)
+    if schema is not None:
+        schema.assertValid(xml)
@@ -0,0 +1,23 @@
+from unittest import TestCase
+from pathlib import Path
+from lxml.etree import DocumentInvalid, Element, parse
+from abstra_notas.assinatura import AssinadorMock
+from .schemas import carregar_schema, validar_xml
+
+SAO_PAULO = Path(__file__).parent / "sp" / "sao_paulo"
+
+
+class SchemasTest(TestCase):
+    def test_carregar_schema_uma_vez(self):
+        caminho = SAO_PAULO / "xsds" / "PedidoConsultaCNPJ_v01.xsd"
+        self.assertIs(carregar_schema(caminho), carregar_schema(str(caminho)))
+
+    def test_validar_xml(self):
+        xml = parse(str(SAO_PAULO / "exemplos" / "PedidoConsultaCNPJ.xml")).getroot()
+        with self.assertRaises(DocumentInvalid):
+            validar_xml(SAO_PAULO / "xsds", xml)
+
+        validar_xml(SAO_PAULO / "xsds", AssinadorMock().assinar_xml(xml))
+
+    def test_sem_schema(self):
+        validar_xml(SAO_PAULO / "xsds", Element("{urn:outro}Pedido"))
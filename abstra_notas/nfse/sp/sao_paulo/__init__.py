@@ -4,6 +4,9 @@ from .envio_rps import (
     RPS,
     EnvioLoteRPS,
     RetornoEnvioRpsLote,
+    LeituraTxt,
+    ErroLinhaTxt,
+    EscritorRPSTxt,
 )
 from .consulta_cnpj import ConsultaCNPJ, RetornoConsultaCNPJ
 from .cancelamento_nfe import (
@@ -13,6 +16,7 @@ from .cancelamento_nfe import (
 from .consulta import ConsultaNFe, RetornoConsulta
 from .erro import Erro
 from .cliente import Cliente
+from .cliente_async import AsyncCliente
 
 __all__ = [
     # EnvioRPS
@@ -26,6 +30,7 @@ __all__ = [
     "RetornoCancelamentoNFe",
     # Cliente
     "Cliente",
+    "AsyncCliente",
     # EnvioLoteRPS
     "EnvioLoteRPS",
     "RetornoEnvioRpsLote",
@@ -34,6 +39,9 @@ __all__ = [
     "RetornoConsulta",
     # RPS
     "RPS",
+    "LeituraTxt",
+    "ErroLinhaTxt",
+    "EscritorRPSTxt",
     # Erro
     "Erro",
 ]
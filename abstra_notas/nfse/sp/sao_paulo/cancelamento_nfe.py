@@ -1,9 +1,7 @@
 from .pedido import Pedido
 from .retorno import Retorno
 from dataclasses import dataclass
-from typing import Literal
 from lxml.etree import Element, fromstring
-from abstra_notas.validacoes.cpfcnpj import cpf_ou_cnpj, normalizar_cpf_ou_cnpj
 from abstra_notas.assinatura import Assinador
 import base64
 from .erro import Erro
@@ -36,13 +34,6 @@ class CancelamentoNFe(Pedido, Remessa):
     inscricao_prestador: str
     numero_nfe: int
 
-    def __post_init__(self):
-        self.remetente = normalizar_cpf_ou_cnpj(self.remetente)
-
-    @property
-    def remetente_tipo(self) -> Literal["CPF", "CNPJ"]:
-        return cpf_ou_cnpj(self.remetente)
-
     def gerar_xml(self, assinador: Assinador) -> Element:
         xml = self.template.render(
             remetente=self.remetente,
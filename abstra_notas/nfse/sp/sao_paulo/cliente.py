@@ -1,49 +1,150 @@
-from ....assinatura import Assinador, AssinadorMock
+from ....assinatura import Assinador, AssinadorMock, obter_assinador
+from ...wsdl import carregar_wsdl, localizar_wsdl, obter_cache_wsdl
+from ...construtor import Construtor, validar_construtor
+from ...schemas import carregar_schema
+from ...transporte import AdaptadorSSL, Depuracao, contexto_ssl
 from zeep.plugins import HistoryPlugin
 from zeep import Client, Transport, Settings
 from requests import Session
-from .pedido import Pedido
-from lxml.etree import tostring, fromstring, XMLSchema, ElementBase
+from .pedido import XSDS, Pedido
+from lxml.etree import tostring, fromstring, ElementBase
 from pathlib import Path
-from tempfile import mktemp
-from .envio_rps import EnvioRPS, RetornoEnvioRps, EnvioLoteRPS, RetornoEnvioRpsLote
+from threading import Lock
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from .envio_rps import (
+    RPS,
+    EnvioRPS,
+    RetornoEnvioRps,
+    EnvioLoteRPS,
+    RetornoEnvioRpsLote,
+    ERROS_LOTE,
+    ResultadoRPS,
+    resultados_por_rps,
+)
 from .consulta_cnpj import ConsultaCNPJ, RetornoConsultaCNPJ
 from .cancelamento_nfe import CancelamentoNFe, RetornoCancelamentoNFe
-from .consulta import ConsultaNFe, RetornoConsulta, ConsultaNFePeriodo
+from .consulta import (
+    ConsultaNFe,
+    RetornoConsulta,
+    ConsultaNFePeriodo,
+    PaginacaoPeriodo,
+    RetornoNFe,
+)
 
 
 class Cliente:
+    """
+    Cliente do webservice de NFS-e da Prefeitura de São Paulo.
+
+    O cliente SOAP, a sessão HTTP e o pool de conexões são criados na primeira
+    chamada e reutilizados até `close()`. Pode ser usado como gerenciador de
+    contexto:
+
+        with Cliente(caminho_pfx, senha_pfx) as cliente:
+            cliente.gerar_nota(pedido)
+    """
+
     assinador: Assinador
+    url = "https://nfe.prefeitura.sp.gov.br/ws/lotenfe.asmx?WSDL"
+
+    _client: Optional[Client] = None
+    _session: Optional[Session] = None
+    depuracao: Optional[Depuracao] = None
+
+    def __init__(
+        self,
+        caminho_pfx: Path,
+        senha_pfx: str,
+        conexoes: int = 10,
+        depuracao: Optional[Depuracao] = None,
+        construtor: Construtor = "template",
+        validar: bool = False,
+    ):
+        """
+        :param conexoes: Número máximo de conexões mantidas abertas no pool.
+        :param depuracao: Função chamada com a operação, a requisição e a resposta
+            de cada chamada. Veja `abstra_notas.nfse.transporte.depuracao_em_diretorio`.
+        :param construtor: Forma de gerar o XML dos pedidos. Veja
+            `abstra_notas.nfse.construtor.Construtor`.
+        :param validar: Valida cada pedido com o schema da prefeitura antes de
+            enviá-lo, para que pedidos malformados falhem sem chamar o webservice.
+        """
+        validar_construtor(construtor)
+        self.assinador = obter_assinador(caminho_pfx, senha_pfx)
+        self.conexoes = conexoes
+        self.depuracao = depuracao
+        self.construtor = construtor
+        self.validar = validar
+        self.history = HistoryPlugin()
+        self._lock = Lock()
+
+    def __enter__(self) -> "Cliente":
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    @property
+    def client(self) -> Client:
+        with self._lock:
+            if self._client is None:
+                self._client = self._criar_client()
+            return self._client
+
+    def _criar_client(self) -> Client:
+        session = Session()
+        session.mount(
+            "https://",
+            AdaptadorSSL(
+                contexto_ssl(self.assinador),
+                pool_connections=1,
+                pool_maxsize=self.conexoes,
+            ),
+        )
+        self._session = session
+
+        settings = Settings(strict=True, xml_huge_tree=True)
+        transport = Transport(session=session, cache=obter_cache_wsdl())
+        wsdl = carregar_wsdl(
+            localizar_wsdl(Path(__file__).parent, "lotenfe", self.url),
+            transport,
+            settings,
+        )
+        return Client(
+            wsdl, transport=transport, settings=settings, plugins=[self.history]
+        )
 
-    def __init__(self, caminho_pfx: Path, senha_pfx: str):
-        self.assinador = Assinador(caminho_pfx, senha_pfx)
+    def close(self):
+        """
+        Encerra as conexões abertas. O cliente pode ser usado novamente depois,
+        mas o cliente SOAP será recriado na próxima chamada.
+        """
+        if self._session is None:
+            return
+        with self._lock:
+            if self._session is not None:
+                self._session.close()
+            self._client = None
+            self._session = None
 
     def executar(self, pedido: Pedido) -> ElementBase:
-        try:
-            history = HistoryPlugin()
-            keyfile = Path(mktemp())
-            keyfile.write_bytes(self.assinador.private_key_pem_bytes)
-            certfile = Path(mktemp())
-            certfile.write_bytes(self.assinador.cert_pem_bytes)
-            url = "https://nfe.prefeitura.sp.gov.br/ws/lotenfe.asmx?WSDL"
-            xml = pedido.gerar_xml(self.assinador)
-            session = Session()
-            session.cert = (certfile, keyfile)
-            settings = Settings(strict=True, xml_huge_tree=True)
-            transport = Transport(session=session, cache=None)
-            client = Client(
-                url, transport=transport, settings=settings, plugins=[history]
-            )
-            signed_xml = self.assinador.assinar_xml(xml)
-
-            response: str = getattr(client.service, pedido.metodo)(
-                1, tostring(signed_xml, encoding=str)
-            )
-
-            return fromstring(response.encode("utf-8"))
-        finally:
-            keyfile.unlink()
-            certfile.unlink()
+        return fromstring(self.chamar(pedido).encode("utf-8"))
+
+    def chamar(self, pedido: Pedido) -> str:
+        """
+        Envia o pedido e retorna a resposta sem processá-la, para leituras
+        incrementais como `RetornoConsulta.iter_xml`.
+        """
+        signed_xml = pedido.gerar_xml_assinado(
+            self.assinador, self.construtor, self.validar
+        )
+
+        requisicao = tostring(signed_xml, encoding=str)
+        response: str = getattr(self.client.service, pedido.metodo)(1, requisicao)
+        if self.depuracao is not None:
+            self.depuracao(pedido.metodo, requisicao, response)
+        return response
 
     def gerar_nota(self, pedido: EnvioRPS) -> RetornoEnvioRps:
         return RetornoEnvioRps.ler_xml(self.executar(pedido))
@@ -51,6 +152,42 @@ class Cliente:
     def gerar_notas_em_lote(self, pedido: EnvioLoteRPS) -> RetornoEnvioRpsLote:
         return RetornoEnvioRpsLote.ler_xml(self.executar(pedido))
 
+    def gerar_notas(
+        self,
+        lista_rps: Iterable[RPS],
+        remetente: str,
+        transacao: bool = True,
+        teste: bool = False,
+        concorrencia: int = 4,
+    ) -> Dict[Tuple[str, int], ResultadoRPS]:
+        """
+        Emite qualquer quantidade de RPS, divididos em lotes (veja
+        `EnvioLoteRPS.dividir_em_lotes`) enviados em paralelo.
+
+        :param concorrencia: Número máximo de lotes enviados ao mesmo tempo.
+        :return: A chave da NFe ou o erro do lote, por série e número de RPS.
+        """
+
+        def enviar(lote: EnvioLoteRPS) -> Dict[Tuple[str, int], ResultadoRPS]:
+            try:
+                retorno = self.gerar_notas_em_lote(lote)
+            except ERROS_LOTE as erro:
+                return resultados_por_rps(lote, erro)
+            return resultados_por_rps(lote, retorno)
+
+        lotes = EnvioLoteRPS.dividir_em_lotes(
+            lista_rps,
+            remetente=remetente,
+            transacao=transacao,
+            teste=teste,
+            assinador=self.assinador,
+        )
+        resultados: Dict[Tuple[str, int], ResultadoRPS] = {}
+        with ThreadPoolExecutor(max_workers=concorrencia) as executor:
+            for resultado in executor.map(enviar, lotes):
+                resultados.update(resultado)
+        return resultados
+
     def consultar_cnpj(self, pedido: ConsultaCNPJ) -> RetornoConsultaCNPJ:
         return RetornoConsultaCNPJ.ler_xml(self.executar(pedido))
 
@@ -63,6 +200,47 @@ class Cliente:
     def consultar_notas_periodo(self, pedido: ConsultaNFePeriodo) -> RetornoConsulta:
         return RetornoConsulta.ler_xml(self.executar(pedido))
 
+    def iter_notas_periodo(
+        self,
+        pedido: ConsultaNFePeriodo,
+        concorrencia: int = 1,
+        dias_por_consulta: Optional[int] = None,
+    ) -> Iterator[RetornoNFe]:
+        """
+        Percorre todas as páginas da consulta por período, a partir de
+        `pedido.pagina`, devolvendo as notas conforme as páginas chegam.
+
+        :param concorrencia: Número máximo de páginas consultadas ao mesmo
+            tempo. Com mais de uma, as próximas páginas são pedidas antes que as
+            anteriores cheguem, e as notas saem na ordem de chegada. Até
+            `concorrencia - 1` páginas vazias podem ser pedidas além da última
+            de cada intervalo.
+        :param dias_por_consulta: Divide o período em intervalos desse número
+            de dias, consultados em paralelo. Veja
+            `ConsultaNFePeriodo.dividir_periodo`.
+        """
+        paginacao = PaginacaoPeriodo(pedido, dias_por_consulta)
+        em_andamento: Dict[Future, ConsultaNFePeriodo] = {}
+        with ThreadPoolExecutor(max_workers=concorrencia) as executor:
+            try:
+                while True:
+                    while len(em_andamento) < concorrencia:
+                        consulta = paginacao.proxima_consulta()
+                        if consulta is None:
+                            break
+                        futuro = executor.submit(self.consultar_notas_periodo, consulta)
+                        em_andamento[futuro] = consulta
+                    if not em_andamento:
+                        return
+
+                    prontos, _ = wait(em_andamento, return_when=FIRST_COMPLETED)
+                    for futuro in prontos:
+                        consulta = em_andamento.pop(futuro)
+                        yield from paginacao.receber(consulta, futuro.result())
+            finally:
+                for futuro in em_andamento:
+                    futuro.cancel()
+
 
 class ClienteMock(Cliente):
     erro: bool
@@ -70,20 +248,14 @@ class ClienteMock(Cliente):
     def __init__(self):
         self.assinador = AssinadorMock()
 
-    def executar(self, pedido: Pedido) -> ElementBase:
+    def chamar(self, pedido: Pedido) -> str:
         xml = self.assinador.assinar_xml(pedido.gerar_xml(self.assinador))
-        pedido_schema_path = (
-            Path(__file__).parent
-            / "xsds"
-            / f"Pedido{pedido.__class__.__name__}_v01.xsd"
+        pedido_schema = carregar_schema(
+            XSDS / f"Pedido{pedido.__class__.__name__}_v01.xsd"
         )
-        pedido_schema = XMLSchema(file=pedido_schema_path)
         pedido_schema.assertValid(xml)
 
         retorno_path = (
             Path(__file__).parent / "exemplos" / f"{pedido.classe_retorno}.xml"
         )
-        retorno = retorno_path.read_text()
-        retorno_xml = fromstring(retorno.encode("utf-8"))
-
-        return retorno_xml
+        return retorno_path.read_text()
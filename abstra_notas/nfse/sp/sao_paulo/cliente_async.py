@@ -0,0 +1,204 @@
+from ....assinatura import Assinador, obter_assinador
+from ...wsdl import carregar_wsdl, localizar_wsdl
+from ...construtor import Construtor, validar_construtor
+from ...transporte import AsyncClienteBase, Depuracao, contexto_ssl
+from zeep import Settings
+from zeep.transports import AsyncTransport
+from zeep.wsdl import Document
+from .pedido import Pedido
+from lxml.etree import tostring, fromstring, ElementBase
+from pathlib import Path
+from typing import AsyncIterator, Dict, Iterable, Optional, Tuple
+from functools import partial
+from .envio_rps import (
+    RPS,
+    EnvioRPS,
+    RetornoEnvioRps,
+    EnvioLoteRPS,
+    RetornoEnvioRpsLote,
+    ResultadoRPS,
+    resultados_por_rps,
+)
+from .consulta_cnpj import ConsultaCNPJ, RetornoConsultaCNPJ
+from .cancelamento_nfe import CancelamentoNFe, RetornoCancelamentoNFe
+from .consulta import (
+    ConsultaNFe,
+    RetornoConsulta,
+    ConsultaNFePeriodo,
+    PaginacaoPeriodo,
+    RetornoNFe,
+)
+import asyncio
+
+
+class AsyncCliente(AsyncClienteBase):
+    """
+    Versão assíncrona do `Cliente`, para uso em aplicações asyncio.
+
+    As chamadas usam o transporte assíncrono do zeep, baseado em httpx, que
+    deve ser instalado com `pip install abstra_notas[async]`. No máximo
+    `concorrencia` chamadas ficam em andamento ao mesmo tempo:
+
+        async with AsyncCliente(caminho_pfx, senha_pfx) as cliente:
+            retornos = await asyncio.gather(
+                *(cliente.consultar_nota(pedido) for pedido in pedidos)
+            )
+
+    Em Python 3.8 e 3.9, crie o cliente dentro do loop em que ele será usado.
+    """
+
+    assinador: Assinador
+    url = "https://nfe.prefeitura.sp.gov.br/ws/lotenfe.asmx?WSDL"
+
+    def __init__(
+        self,
+        caminho_pfx: Path,
+        senha_pfx: str,
+        concorrencia: int = 10,
+        depuracao: Optional[Depuracao] = None,
+        construtor: Construtor = "template",
+        validar: bool = False,
+    ):
+        """
+        :param concorrencia: Número máximo de chamadas simultâneas ao webservice.
+            É também o tamanho do pool de conexões.
+        :param depuracao: Função chamada com a operação, a requisição e a resposta
+            de cada chamada. Veja `abstra_notas.nfse.transporte.depuracao_em_diretorio`.
+        :param construtor: Forma de gerar o XML dos pedidos. Veja
+            `abstra_notas.nfse.construtor.Construtor`.
+        :param validar: Valida cada pedido com o schema da prefeitura antes de
+            enviá-lo, para que pedidos malformados falhem sem chamar o webservice.
+        """
+        validar_construtor(construtor)
+        self.assinador = obter_assinador(caminho_pfx, senha_pfx)
+        self.construtor = construtor
+        self.validar = validar
+        super().__init__(
+            self._carregar_wsdl_lotenfe,
+            contexto_ssl(self.assinador),
+            concorrencia=concorrencia,
+            depuracao=depuracao,
+        )
+
+    def _carregar_wsdl_lotenfe(
+        self, transport: AsyncTransport, settings: Settings
+    ) -> Document:
+        return carregar_wsdl(
+            localizar_wsdl(Path(__file__).parent, "lotenfe", self.url),
+            transport,
+            settings,
+        )
+
+    def _preparar(self, pedido: Pedido) -> str:
+        xml = pedido.gerar_xml_assinado(
+            self.assinador, self.construtor, self.validar
+        )
+        return tostring(xml, encoding=str)
+
+    async def executar(self, pedido: Pedido) -> ElementBase:
+        return fromstring((await self.chamar(pedido)).encode("utf-8"))
+
+    async def chamar(self, pedido: Pedido) -> str:
+        """
+        Envia o pedido e retorna a resposta sem processá-la, para leituras
+        incrementais como `RetornoConsulta.iter_xml`.
+        """
+        return await self._chamar_operacao(
+            pedido.metodo,
+            partial(self._preparar, pedido),
+            lambda requisicao: (1, requisicao),
+        )
+
+    async def gerar_nota(self, pedido: EnvioRPS) -> RetornoEnvioRps:
+        return RetornoEnvioRps.ler_xml(await self.executar(pedido))
+
+    async def gerar_notas_em_lote(self, pedido: EnvioLoteRPS) -> RetornoEnvioRpsLote:
+        return RetornoEnvioRpsLote.ler_xml(await self.executar(pedido))
+
+    async def gerar_notas(
+        self,
+        lista_rps: Iterable[RPS],
+        remetente: str,
+        transacao: bool = True,
+        teste: bool = False,
+    ) -> Dict[Tuple[str, int], ResultadoRPS]:
+        """
+        Emite qualquer quantidade de RPS, divididos em lotes (veja
+        `EnvioLoteRPS.dividir_em_lotes`) enviados concorrentemente, respeitando
+        a `concorrencia` do cliente.
+
+        :return: A chave da NFe ou o erro do lote, por série e número de RPS.
+        """
+        lotes = EnvioLoteRPS.dividir_em_lotes(
+            lista_rps,
+            remetente=remetente,
+            transacao=transacao,
+            teste=teste,
+            assinador=self.assinador,
+        )
+        retornos = await asyncio.gather(
+            *(self.gerar_notas_em_lote(lote) for lote in lotes),
+            return_exceptions=True,
+        )
+        resultados: Dict[Tuple[str, int], ResultadoRPS] = {}
+        for lote, retorno in zip(lotes, retornos):
+            resultados.update(resultados_por_rps(lote, retorno))
+        return resultados
+
+    async def consultar_cnpj(self, pedido: ConsultaCNPJ) -> RetornoConsultaCNPJ:
+        return RetornoConsultaCNPJ.ler_xml(await self.executar(pedido))
+
+    async def cancelar_nota(self, pedido: CancelamentoNFe) -> RetornoCancelamentoNFe:
+        return RetornoCancelamentoNFe.ler_xml(await self.executar(pedido))
+
+    async def consultar_nota(self, pedido: ConsultaNFe) -> RetornoConsulta:
+        return RetornoConsulta.ler_xml(await self.executar(pedido))
+
+    async def consultar_notas_periodo(
+        self, pedido: ConsultaNFePeriodo
+    ) -> RetornoConsulta:
+        return RetornoConsulta.ler_xml(await self.executar(pedido))
+
+    async def iter_notas_periodo(
+        self,
+        pedido: ConsultaNFePeriodo,
+        concorrencia: int = 1,
+        dias_por_consulta: Optional[int] = None,
+    ) -> AsyncIterator[RetornoNFe]:
+        """
+        Percorre todas as páginas da consulta por período, a partir de
+        `pedido.pagina`, devolvendo as notas conforme as páginas chegam.
+
+        :param concorrencia: Número máximo de páginas consultadas ao mesmo
+            tempo, sempre dentro do limite de chamadas do cliente. Com mais de
+            uma, as próximas páginas são pedidas antes que as anteriores
+            cheguem, e as notas saem na ordem de chegada. Até
+            `concorrencia - 1` páginas vazias podem ser pedidas além da última
+            de cada intervalo.
+        :param dias_por_consulta: Divide o período em intervalos desse número
+            de dias, consultados em paralelo. Veja
+            `ConsultaNFePeriodo.dividir_periodo`.
+        """
+        paginacao = PaginacaoPeriodo(pedido, dias_por_consulta)
+        em_andamento: Dict[asyncio.Task, ConsultaNFePeriodo] = {}
+        try:
+            while True:
+                while len(em_andamento) < concorrencia:
+                    consulta = paginacao.proxima_consulta()
+                    if consulta is None:
+                        break
+                    tarefa = asyncio.ensure_future(self.consultar_notas_periodo(consulta))
+                    em_andamento[tarefa] = consulta
+                if not em_andamento:
+                    return
+
+                prontas, _ = await asyncio.wait(
+                    em_andamento, return_when=asyncio.FIRST_COMPLETED
+                )
+                for tarefa in prontas:
+                    consulta = em_andamento.pop(tarefa)
+                    for nfe in paginacao.receber(consulta, tarefa.result()):
+                        yield nfe
+        finally:
+            for tarefa in em_andamento:
+                tarefa.cancel()
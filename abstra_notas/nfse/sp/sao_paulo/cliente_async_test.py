@@ -0,0 +1,89 @@
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import patch
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from .cliente_async import AsyncCliente
+from .consulta_cnpj import ConsultaCNPJ, RetornoConsultaCNPJ
+from abstra_notas.assinatura import gerar_pfx_autoassinado
+import asyncio
+import threading
+
+
+class AsyncClienteTest(IsolatedAsyncioTestCase):
+    def setUp(self):
+        for alvo in (
+            "abstra_notas.nfse.transporte.AsyncClient",
+            "abstra_notas.nfse.sp.sao_paulo.cliente_async.carregar_wsdl",
+        ):
+            patcher = patch(alvo)
+            setattr(self, alvo.rpartition(".")[2], patcher.start())
+            self.addCleanup(patcher.stop)
+
+        self.diretorio = TemporaryDirectory()
+        self.addCleanup(self.diretorio.cleanup)
+        self.caminho_pfx = gerar_pfx_autoassinado(
+            Path(self.diretorio.name) / "certificado.pfx", "senha"
+        )
+        self.retorno = (
+            Path(__file__).parent / "exemplos" / "RetornoConsultaCNPJ.xml"
+        ).read_text(encoding="utf-8")
+        self.pedido = ConsultaCNPJ(
+            contribuinte="99-99/999.70-00//100",
+            remetente="99999997000100",
+        )
+
+    async def test_concorrencia_limitada(self):
+        em_andamento = 0
+        maximo = 0
+
+        async def consulta_cnpj(versao, requisicao):
+            nonlocal em_andamento, maximo
+            em_andamento += 1
+            maximo = max(maximo, em_andamento)
+            await asyncio.sleep(0.01)
+            em_andamento -= 1
+            return self.retorno
+
+        self.AsyncClient.return_value.service.ConsultaCNPJ = consulta_cnpj
+        async with AsyncCliente(self.caminho_pfx, "senha", concorrencia=2) as cliente:
+            retornos = await asyncio.gather(
+                *(cliente.consultar_cnpj(self.pedido) for _ in range(6))
+            )
+
+        self.assertEqual(maximo, 2)
+        self.assertEqual(len(retornos), 6)
+        self.assertIsInstance(retornos[0], RetornoConsultaCNPJ)
+        self.assertEqual(self.AsyncClient.call_count, 1)
+
+    async def test_wsdl_carregado_fora_do_loop(self):
+        threads = []
+        self.carregar_wsdl.side_effect = lambda *args: threads.append(
+            threading.get_ident()
+        )
+
+        async def consulta_cnpj(versao, requisicao):
+            return self.retorno
+
+        self.AsyncClient.return_value.service.ConsultaCNPJ = consulta_cnpj
+        async with AsyncCliente(self.caminho_pfx, "senha") as cliente:
+            await asyncio.gather(*(cliente.consultar_cnpj(self.pedido) for _ in range(3)))
+
+        self.assertEqual(len(threads), 1)
+        self.assertNotEqual(threads[0], threading.get_ident())
+        self.assertEqual(self.AsyncClient.call_count, 1)
+
+    async def test_depuracao(self):
+        async def consulta_cnpj(versao, requisicao):
+            return self.retorno
+
+        chamadas = []
+        self.AsyncClient.return_value.service.ConsultaCNPJ = consulta_cnpj
+        async with AsyncCliente(
+            self.caminho_pfx, "senha", depuracao=lambda *args: chamadas.append(args)
+        ) as cliente:
+            await cliente.consultar_cnpj(self.pedido)
+
+        [(operacao, requisicao, resposta)] = chamadas
+        self.assertEqual(operacao, "ConsultaCNPJ")
+        self.assertIn("PedidoConsultaCNPJ", requisicao)
+        self.assertEqual(resposta, self.retorno)
@@ -0,0 +1,68 @@
+from unittest import TestCase
+from unittest.mock import patch
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from .cliente import Cliente
+from .consulta_cnpj import ConsultaCNPJ
+from abstra_notas.assinatura import gerar_pfx_autoassinado
+
+
+class ClienteTest(TestCase):
+    def setUp(self):
+        carregar_wsdl = patch("abstra_notas.nfse.sp.sao_paulo.cliente.carregar_wsdl")
+        carregar_wsdl.start()
+        self.addCleanup(carregar_wsdl.stop)
+        self.diretorio = TemporaryDirectory()
+        self.caminho_pfx = gerar_pfx_autoassinado(
+            Path(self.diretorio.name) / "certificado.pfx", "senha"
+        )
+        self.retorno = (
+            Path(__file__).parent / "exemplos" / "RetornoConsultaCNPJ.xml"
+        ).read_text(encoding="utf-8")
+
+    def tearDown(self):
+        self.diretorio.cleanup()
+
+    def test_reutiliza_client_entre_chamadas(self):
+        pedido = ConsultaCNPJ(
+            contribuinte="99-99/999.70-00//100",
+            remetente="99999997000100",
+        )
+        with patch("abstra_notas.nfse.sp.sao_paulo.cliente.Client") as Client:
+            Client.return_value.service.ConsultaCNPJ.return_value = self.retorno
+            with Cliente(self.caminho_pfx, "senha") as cliente:
+                cliente.consultar_cnpj(pedido)
+                cliente.consultar_cnpj(pedido)
+
+        self.assertEqual(Client.call_count, 1)
+        self.assertEqual(Client.return_value.service.ConsultaCNPJ.call_count, 2)
+
+    def test_recria_client_depois_de_close(self):
+        with patch("abstra_notas.nfse.sp.sao_paulo.cliente.Client") as Client:
+            cliente = Cliente(self.caminho_pfx, "senha")
+            cliente.client
+            cliente.close()
+            cliente.client
+            cliente.close()
+
+        self.assertEqual(Client.call_count, 2)
+
+    def test_depuracao(self):
+        pedido = ConsultaCNPJ(
+            contribuinte="99-99/999.70-00//100",
+            remetente="99999997000100",
+        )
+        chamadas = []
+        with patch("abstra_notas.nfse.sp.sao_paulo.cliente.Client") as Client:
+            Client.return_value.service.ConsultaCNPJ.return_value = self.retorno
+            with Cliente(
+                self.caminho_pfx,
+                "senha",
+                depuracao=lambda *args: chamadas.append(args),
+            ) as cliente:
+                cliente.consultar_cnpj(pedido)
+
+        [(operacao, requisicao, resposta)] = chamadas
+        self.assertEqual(operacao, "ConsultaCNPJ")
+        self.assertIn("PedidoConsultaCNPJ", requisicao)
+        self.assertEqual(resposta, self.retorno)
@@ -3,14 +3,21 @@ from .erro import Erro
 from .retorno import Retorno
 from .remessa import Remessa
 from abstra_notas.assinatura import Assinador
-from dataclasses import dataclass
-from typing import Optional, List
-from lxml.etree import ElementBase, fromstring
-from datetime import date
+from dataclasses import dataclass, field, replace
+from typing import BinaryIO, Dict, Iterator, Literal, Optional, List, Set, Union
+from lxml.etree import ElementBase, QName, fromstring
+from datetime import date, timedelta
 from dateutil.parser import parse
 from .validacoes import normalizar_inscricao_municipal, normalizar_codigo_verificacao
 from abstra_notas.validacoes.data import normalizar_data
 from abstra_notas.validacoes.cpfcnpj import normalizar_cpf_ou_cnpj, cpf_ou_cnpj
+from abstra_notas.nfse.leitura import iterar_elementos
+
+NOTAS_POR_PAGINA = 50
+"""
+Número máximo de notas em cada página da consulta por período. Uma página com
+menos notas é a última.
+"""
 
 
 def find_text(xml: ElementBase, xpath: str) -> Optional[str]:
@@ -40,7 +47,29 @@ def optional_centavos(arg: Optional[str]) -> Optional[int]:
 
 
 def optional_date(arg: Optional[str]) -> Optional[date]:
-    return parse(arg).date() if arg is not None else None
+    if arg is None:
+        return None
+    try:
+        # As datas do webservice são ISO 8601, com ou sem o horário.
+        return date.fromisoformat(arg[:10])
+    except ValueError:
+        return parse(arg).date()
+
+
+def _textos(xml: ElementBase) -> Dict[str, Optional[str]]:
+    """
+    Textos de todos os descendentes de `xml`, lidos em uma única passada e
+    indexados por `Nome` e por `Pai/Nome`. Como em `find_text(xml, ".//Nome")`
+    e `find_text(xml, ".//Pai/Nome")`, vale o primeiro elemento de cada caminho.
+    """
+    textos: Dict[str, Optional[str]] = {}
+    for elemento in xml.iterdescendants("*"):
+        texto = elemento.text.strip() if elemento.text else None
+        textos.setdefault(elemento.tag, texto)
+        pai = elemento.getparent()
+        if pai is not xml:
+            textos.setdefault(f"{pai.tag}/{elemento.tag}", texto)
+    return textos
 
 
 @dataclass
@@ -113,71 +142,58 @@ class RetornoNFe:
 
     @staticmethod
     def ler_xml(xml: ElementBase):
+        texto = _textos(xml).get
         return RetornoNFe(
-            assinatura=find_text(xml, ".//Assinatura"),
-            chave_nfe_inscricao_prestador=find_text(
-                xml, ".//ChaveNFe/InscricaoPrestador"
-            ),
-            chave_nfe_numero_nfe=optional_int(find_text(xml, ".//ChaveNFe/NumeroNFe")),
-            chave_nfe_codigo_verificacao=find_text(
-                xml, ".//ChaveNFe/CodigoVerificacao"
-            ),
-            data_emissao_nfe=optional_date(find_text(xml, ".//DataEmissaoNFe")),
-            chave_rps_inscricao_prestador=find_text(
-                xml, ".//ChaveRPS/InscricaoPrestador"
-            ),
-            chave_rps_serie_rps=find_text(xml, ".//ChaveRPS/SerieRPS"),
-            chave_rps_numero_rps=optional_int(find_text(xml, ".//ChaveRPS/NumeroRPS")),
-            tipo_rps=find_text(xml, ".//TipoRPS"),
-            data_emissao_rps=optional_date(find_text(xml, ".//DataEmissaoRPS")),
-            cpf_cnpj_prestador=find_text(xml, ".//CPFCNPJPrestador/CNPJ"),
-            razao_social_prestador=find_text(xml, ".//RazaoSocialPrestador"),
-            tipo_logradouro_prestador=find_text(
-                xml, ".//EnderecoPrestador/TipoLogradouro"
-            ),
-            logradouro_prestador=find_text(xml, ".//EnderecoPrestador/Logradouro"),
-            numero_endereco_prestador=find_text(
-                xml, ".//EnderecoPrestador/NumeroEndereco"
-            ),
-            complemento_endereco_prestador=find_text(
-                xml, ".//EnderecoPrestador/ComplementoEndereco"
-            ),
-            bairro_prestador=find_text(xml, ".//EnderecoPrestador/Bairro"),
-            cidade_prestador=find_text(xml, ".//EnderecoPrestador/Cidade"),
-            uf_prestador=find_text(xml, ".//EnderecoPrestador/UF"),
-            cep_prestador=find_text(xml, ".//EnderecoPrestador/CEP"),
-            status_nfe=find_text(xml, ".//StatusNFe"),
-            tributacao_nfe=find_text(xml, ".//TributacaoNFe"),
-            opcao_simples=optional_int(find_text(xml, ".//OpcaoSimples")),
-            valor_servicos_centavos=optional_centavos(
-                find_text(xml, ".//ValorServicos")
+            assinatura=texto("Assinatura"),
+            chave_nfe_inscricao_prestador=texto("ChaveNFe/InscricaoPrestador"),
+            chave_nfe_numero_nfe=optional_int(texto("ChaveNFe/NumeroNFe")),
+            chave_nfe_codigo_verificacao=texto("ChaveNFe/CodigoVerificacao"),
+            data_emissao_nfe=optional_date(texto("DataEmissaoNFe")),
+            chave_rps_inscricao_prestador=texto("ChaveRPS/InscricaoPrestador"),
+            chave_rps_serie_rps=texto("ChaveRPS/SerieRPS"),
+            chave_rps_numero_rps=optional_int(texto("ChaveRPS/NumeroRPS")),
+            tipo_rps=texto("TipoRPS"),
+            data_emissao_rps=optional_date(texto("DataEmissaoRPS")),
+            cpf_cnpj_prestador=texto("CPFCNPJPrestador/CNPJ"),
+            razao_social_prestador=texto("RazaoSocialPrestador"),
+            tipo_logradouro_prestador=texto("EnderecoPrestador/TipoLogradouro"),
+            logradouro_prestador=texto("EnderecoPrestador/Logradouro"),
+            numero_endereco_prestador=texto("EnderecoPrestador/NumeroEndereco"),
+            complemento_endereco_prestador=texto(
+                "EnderecoPrestador/ComplementoEndereco"
             ),
-            valor_deducoes_centavos=optional_centavos(
-                find_text(xml, ".//ValorDeducoes")
-            ),
-            valor_pis_centavos=optional_centavos(find_text(xml, ".//ValorPIS")),
-            valor_cofins_centavos=optional_centavos(find_text(xml, ".//ValorCOFINS")),
-            valor_inss_centavos=optional_centavos(find_text(xml, ".//ValorINSS")),
-            valor_ir_centavos=optional_centavos(find_text(xml, ".//ValorIR")),
-            valor_csll_centavos=optional_centavos(find_text(xml, ".//ValorCSLL")),
-            valor_iss_centavos=optional_centavos(find_text(xml, ".//ValorISS")),
-            valor_credito_centavos=optional_centavos(find_text(xml, ".//ValorCredito")),
-            codigo_servico=optional_int(find_text(xml, ".//CodigoServico")),
-            aliquota_servicos=optional_float(find_text(xml, ".//AliquotaServicos")),
-            iss_retido=optional_bool(find_text(xml, ".//ISSRetido")),
-            cpf_cnpj_tomador=find_text(xml, ".//CPFCNPJTomador/CPF")
-            or find_text(xml, ".//CPFCNPJTomador/CNPJ"),
-            razao_social_tomador=find_text(xml, ".//RazaoSocialTomador"),
-            tipo_logradouro_tomador=find_text(xml, ".//EnderecoTomador/TipoLogradouro"),
-            logradouro_tomador=find_text(xml, ".//EnderecoTomador/Logradouro"),
-            numero_endereco_tomador=find_text(xml, ".//EnderecoTomador/NumeroEndereco"),
-            bairro_tomador=find_text(xml, ".//EnderecoTomador/Bairro"),
-            cidade_tomador=find_text(xml, ".//EnderecoTomador/Cidade"),
-            uf_tomador=find_text(xml, ".//EnderecoTomador/UF"),
-            cep_tomador=find_text(xml, ".//EnderecoTomador/CEP"),
-            email_tomador=find_text(xml, ".//EmailTomador"),
-            discriminacao=find_text(xml, ".//Discriminacao"),
-            fonte_carga_tributaria=find_text(xml, ".//FonteCargaTributaria"),
+            bairro_prestador=texto("EnderecoPrestador/Bairro"),
+            cidade_prestador=texto("EnderecoPrestador/Cidade"),
+            uf_prestador=texto("EnderecoPrestador/UF"),
+            cep_prestador=texto("EnderecoPrestador/CEP"),
+            status_nfe=texto("StatusNFe"),
+            tributacao_nfe=texto("TributacaoNFe"),
+            opcao_simples=optional_int(texto("OpcaoSimples")),
+            valor_servicos_centavos=optional_centavos(texto("ValorServicos")),
+            valor_deducoes_centavos=optional_centavos(texto("ValorDeducoes")),
+            valor_pis_centavos=optional_centavos(texto("ValorPIS")),
+            valor_cofins_centavos=optional_centavos(texto("ValorCOFINS")),
+            valor_inss_centavos=optional_centavos(texto("ValorINSS")),
+            valor_ir_centavos=optional_centavos(texto("ValorIR")),
+            valor_csll_centavos=optional_centavos(texto("ValorCSLL")),
+            valor_iss_centavos=optional_centavos(texto("ValorISS")),
+            valor_credito_centavos=optional_centavos(texto("ValorCredito")),
+            codigo_servico=optional_int(texto("CodigoServico")),
+            aliquota_servicos=optional_float(texto("AliquotaServicos")),
+            iss_retido=optional_bool(texto("ISSRetido")),
+            cpf_cnpj_tomador=texto("CPFCNPJTomador/CPF")
+            or texto("CPFCNPJTomador/CNPJ"),
+            razao_social_tomador=texto("RazaoSocialTomador"),
+            tipo_logradouro_tomador=texto("EnderecoTomador/TipoLogradouro"),
+            logradouro_tomador=texto("EnderecoTomador/Logradouro"),
+            numero_endereco_tomador=texto("EnderecoTomador/NumeroEndereco"),
+            bairro_tomador=texto("EnderecoTomador/Bairro"),
+            cidade_tomador=texto("EnderecoTomador/Cidade"),
+            uf_tomador=texto("EnderecoTomador/UF"),
+            cep_tomador=texto("EnderecoTomador/CEP"),
+            email_tomador=texto("EmailTomador"),
+            discriminacao=texto("Discriminacao"),
+            fonte_carga_tributaria=texto("FonteCargaTributaria"),
         )
 
 
@@ -200,6 +216,28 @@ class RetornoConsulta(Retorno):
                 descricao=xml.find(".//Descricao").text,
             )
 
+    @staticmethod
+    def iter_xml(resposta: Union[str, bytes, BinaryIO]) -> Iterator[RetornoNFe]:
+        """
+        Versão incremental de `ler_xml` para respostas com muitas notas: lê a
+        resposta do webservice (veja `Cliente.chamar`) e devolve as notas uma
+        a uma, sem montar a árvore nem a lista inteira.
+
+        Lança `Erro` se a consulta não teve sucesso.
+        """
+        sucesso = True
+        for elemento in iterar_elementos(resposta, "Sucesso", "Alerta", "Erro", "NFe"):
+            nome = QName(elemento).localname
+            if nome == "Sucesso":
+                sucesso = elemento.text == "true"
+            elif nome == "NFe":
+                yield RetornoNFe.ler_xml(elemento)
+            elif not sucesso:
+                raise Erro(
+                    codigo=int(elemento.find(".//Codigo").text),
+                    descricao=elemento.find(".//Descricao").text,
+                )
+
 
 @dataclass
 class ConsultaNFe(Pedido, Remessa):
@@ -214,6 +252,7 @@ class ConsultaNFe(Pedido, Remessa):
     """
 
     def __post_init__(self):
+        super().__post_init__()
         self.chave_nfe_inscricao_prestador = normalizar_inscricao_municipal(
             self.chave_nfe_inscricao_prestador
         )
@@ -272,13 +311,13 @@ class ConsultaNFePeriodo(Pedido, Remessa):
     pagina: int = 1
 
     def __post_init__(self):
+        super().__post_init__()
         self.inscricao_municipal = normalizar_inscricao_municipal(
             self.inscricao_municipal, optional=True
         )
         self.data_inicio = normalizar_data(self.data_inicio)
         self.data_fim = normalizar_data(self.data_fim)
         self.recebidas_por = normalizar_cpf_ou_cnpj(self.recebidas_por, optional=True)
-        self.remetente = normalizar_cpf_ou_cnpj(self.remetente)
         self.pagina = int(self.pagina)
 
         if self.inscricao_municipal is None and self.recebidas_por is None:
@@ -307,6 +346,88 @@ class ConsultaNFePeriodo(Pedido, Remessa):
         )
         return fromstring(xml.encode("utf-8"))
 
+    def dividir_periodo(self, dias: int) -> List["ConsultaNFePeriodo"]:
+        """
+        Divide o período em consultas de até `dias` dias cada, todas a partir
+        da primeira página.
+        """
+        assert dias > 0, "O intervalo deve ter pelo menos um dia"
+        consultas = []
+        inicio = self.data_inicio
+        while inicio <= self.data_fim:
+            fim = min(inicio + timedelta(days=dias - 1), self.data_fim)
+            consultas.append(replace(self, data_inicio=inicio, data_fim=fim, pagina=1))
+            inicio = fim + timedelta(days=1)
+        return consultas
+
     @property
     def classe_retorno(self):
         return RetornoConsulta.__name__
+
+
+@dataclass
+class _Intervalo:
+    consulta: ConsultaNFePeriodo
+    proxima_pagina: int
+    em_andamento: Set[int] = field(default_factory=set)
+    ultima_pagina: Optional[int] = None
+
+
+class PaginacaoPeriodo:
+    """
+    Decide quais páginas de uma consulta por período devem ser pedidas,
+    possivelmente dividida em intervalos, até que cada intervalo retorne uma
+    página com menos de `NOTAS_POR_PAGINA` notas. Usada por
+    `Cliente.iter_notas_periodo` e `AsyncCliente.iter_notas_periodo`, que fazem
+    as chamadas.
+
+    Várias páginas de um mesmo intervalo podem estar em andamento ao mesmo
+    tempo: como a última só é conhecida quando chega, as páginas pedidas além
+    dela voltam vazias e são descartadas.
+    """
+
+    def __init__(
+        self, pedido: ConsultaNFePeriodo, dias_por_consulta: Optional[int] = None
+    ):
+        consultas = (
+            pedido.dividir_periodo(dias_por_consulta)
+            if dias_por_consulta is not None
+            else [pedido]
+        )
+        self._intervalos: Dict[date, _Intervalo] = {
+            consulta.data_inicio: _Intervalo(consulta, consulta.pagina)
+            for consulta in consultas
+        }
+
+    def proxima_consulta(self) -> Optional[ConsultaNFePeriodo]:
+        """
+        Próxima página a ser pedida, do intervalo com menos páginas em
+        andamento, ou `None` se todos os intervalos já chegaram à última página.
+        """
+        abertos = [
+            intervalo
+            for intervalo in self._intervalos.values()
+            if intervalo.ultima_pagina is None
+        ]
+        if not abertos:
+            return None
+        intervalo = min(abertos, key=lambda intervalo: len(intervalo.em_andamento))
+        pagina = intervalo.proxima_pagina
+        intervalo.proxima_pagina += 1
+        intervalo.em_andamento.add(pagina)
+        return replace(intervalo.consulta, pagina=pagina)
+
+    def receber(
+        self, consulta: ConsultaNFePeriodo, retorno: RetornoConsulta
+    ) -> List[RetornoNFe]:
+        """
+        Registra o retorno de uma página pedida em `proxima_consulta` e
+        devolve as suas notas.
+        """
+        intervalo = self._intervalos[consulta.data_inicio]
+        intervalo.em_andamento.discard(consulta.pagina)
+        if intervalo.ultima_pagina is not None and consulta.pagina > intervalo.ultima_pagina:
+            return []
+        if len(retorno.lista_nfe) < NOTAS_POR_PAGINA:
+            intervalo.ultima_pagina = consulta.pagina
+        return retorno.lista_nfe
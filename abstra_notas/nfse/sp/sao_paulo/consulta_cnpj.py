@@ -54,6 +54,7 @@ class ConsultaCNPJ(Pedido, Remessa):
     contribuinte: str
 
     def __post_init__(self):
+        super().__post_init__()
         self.contribuinte = normalizar_cpf_ou_cnpj(self.contribuinte)
 
     def gerar_xml(self, assinador: Assinador) -> Element:
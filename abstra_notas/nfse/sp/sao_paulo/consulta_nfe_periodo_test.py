@@ -1,6 +1,8 @@
-from unittest import TestCase
-from .consulta import ConsultaNFePeriodo
+from unittest import IsolatedAsyncioTestCase, TestCase
+from .consulta import NOTAS_POR_PAGINA, ConsultaNFePeriodo, RetornoConsulta
 from .cliente import ClienteMock
+from .cliente_async import AsyncCliente
+from .erro import Erro
 from abstra_notas.assinatura import AssinadorMock
 from datetime import date
 
@@ -39,3 +41,130 @@ class ConsultaTest(TestCase):
 
         cliente = ClienteMock()
         cliente.consultar_notas_periodo(pedido)
+
+    def test_iter_xml(self):
+        pedido = ConsultaNFePeriodo(
+            remetente="75.551.583/0001-48",
+            data_fim=date(2015, 1, 28),
+            data_inicio=date(2015, 1, 28),
+            inscricao_municipal="12345678",
+        )
+        cliente = ClienteMock()
+        self.assertEqual(
+            list(RetornoConsulta.iter_xml(cliente.chamar(pedido))),
+            cliente.consultar_notas_periodo(pedido).lista_nfe,
+        )
+
+        erro = (
+            '<RetornoConsulta xmlns="http://www.prefeitura.sp.gov.br/nfe">'
+            '<Cabecalho Versao="1" xmlns=""><Sucesso>false</Sucesso></Cabecalho>'
+            '<Erro xmlns=""><Codigo>1305</Codigo><Descricao>Falha</Descricao></Erro>'
+            "</RetornoConsulta>"
+        )
+        with self.assertRaises(Erro) as contexto:
+            list(RetornoConsulta.iter_xml(erro))
+        self.assertEqual(contexto.exception.codigo, 1305)
+
+    def test_dividir_periodo(self):
+        pedido = ConsultaNFePeriodo(
+            remetente="75.551.583/0001-48",
+            data_inicio=date(2015, 1, 1),
+            data_fim=date(2015, 1, 31),
+            pagina=3,
+            inscricao_municipal="12345678",
+        )
+        consultas = pedido.dividir_periodo(10)
+        self.assertEqual(
+            [(c.data_inicio, c.data_fim, c.pagina) for c in consultas],
+            [
+                (date(2015, 1, 1), date(2015, 1, 10), 1),
+                (date(2015, 1, 11), date(2015, 1, 20), 1),
+                (date(2015, 1, 21), date(2015, 1, 30), 1),
+                (date(2015, 1, 31), date(2015, 1, 31), 1),
+            ],
+        )
+        self.assertEqual(consultas[0].inscricao_municipal, "12345678")
+
+    def test_iter_notas_periodo(self):
+        for concorrencia in (1, 4):
+            for dias_por_consulta in (None, 7):
+                cliente = ClientePaginado()
+                notas = list(
+                    cliente.iter_notas_periodo(
+                        pedido_paginado(), concorrencia, dias_por_consulta
+                    )
+                )
+                self.assertEqual(sorted(notas), sorted(todas_as_notas(dias_por_consulta)))
+                if concorrencia == 1:
+                    self.assertEqual(notas, todas_as_notas(dias_por_consulta))
+                    self.assertEqual(
+                        len(cliente.paginas), 3 if dias_por_consulta is None else 7
+                    )
+
+
+class AsyncConsultaTest(IsolatedAsyncioTestCase):
+    async def test_iter_notas_periodo(self):
+        for concorrencia in (1, 4):
+            cliente = AsyncClientePaginado()
+            notas = [
+                nota
+                async for nota in cliente.iter_notas_periodo(
+                    pedido_paginado(), concorrencia, dias_por_consulta=7
+                )
+            ]
+            self.assertEqual(sorted(notas), sorted(todas_as_notas(7)))
+
+
+def pedido_paginado() -> ConsultaNFePeriodo:
+    return ConsultaNFePeriodo(
+        remetente="75.551.583/0001-48",
+        data_inicio=date(2015, 1, 1),
+        data_fim=date(2015, 1, 31),
+        inscricao_municipal="12345678",
+    )
+
+
+def quantidade_de_notas(consulta: ConsultaNFePeriodo) -> int:
+    # Três páginas a partir de 1º de janeiro e uma a partir do dia 8.
+    return {date(2015, 1, 1): 120, date(2015, 1, 8): 7}.get(consulta.data_inicio, 0)
+
+
+def pagina(consulta: ConsultaNFePeriodo) -> RetornoConsulta:
+    notas = [
+        (consulta.data_inicio, i) for i in range(quantidade_de_notas(consulta))
+    ]
+    inicio = (consulta.pagina - 1) * NOTAS_POR_PAGINA
+    return RetornoConsulta(lista_nfe=notas[inicio : inicio + NOTAS_POR_PAGINA])
+
+
+def todas_as_notas(dias_por_consulta):
+    consultas = (
+        pedido_paginado().dividir_periodo(dias_por_consulta)
+        if dias_por_consulta
+        else [pedido_paginado()]
+    )
+    return [
+        (consulta.data_inicio, i)
+        for consulta in consultas
+        for i in range(quantidade_de_notas(consulta))
+    ]
+
+
+class ClientePaginado(ClienteMock):
+    def __init__(self):
+        super().__init__()
+        self.paginas = []
+
+    def consultar_notas_periodo(self, pedido: ConsultaNFePeriodo) -> RetornoConsulta:
+        self.paginas.append((pedido.data_inicio, pedido.pagina))
+        return pagina(pedido)
+
+
+class AsyncClientePaginado(AsyncCliente):
+    def __init__(self):
+        pass
+
+    async def consultar_notas_periodo(
+        self, pedido: ConsultaNFePeriodo
+    ) -> RetornoConsulta:
+        return pagina(pedido)
@@ -1,5 +1,12 @@
 from unittest import TestCase
-from .consulta import ConsultaNFe, RetornoConsulta, RetornoNFe
+from .consulta import (
+    ConsultaNFe,
+    RetornoConsulta,
+    RetornoNFe,
+    _textos,
+    find_text,
+    optional_date,
+)
 from pathlib import Path
 from lxml.etree import fromstring
 from .cliente import ClienteMock
@@ -137,3 +144,16 @@ class ConsultaTest(TestCase):
                 ]
             ),
         )
+
+    def test_textos_iguais_a_find_text(self):
+        exemplo_path = Path(__file__).parent / "exemplos" / "RetornoConsulta.xml"
+        for nfe in fromstring(exemplo_path.read_bytes()).iterfind("NFe"):
+            textos = _textos(nfe)
+            self.assertIn("ChaveRPS/InscricaoPrestador", textos)
+            for caminho, texto in textos.items():
+                self.assertEqual(texto, find_text(nfe, f".//{caminho}"), caminho)
+
+    def test_optional_date(self):
+        for valor in ("2015-01-28", "2015-01-28T13:03:57", "28 Jan 2015"):
+            self.assertEqual(optional_date(valor), date(2015, 1, 28))
+        self.assertIsNone(optional_date(None))
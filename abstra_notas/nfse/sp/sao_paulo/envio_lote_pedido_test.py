@@ -1,11 +1,18 @@
 from unittest import TestCase
 from .envio_rps import RPS, EnvioLoteRPS, RetornoEnvioRpsLote, ChaveNFeRPS
+from .erro import Erro
 from pathlib import Path
-from lxml.etree import fromstring
+from lxml.etree import fromstring, tostring
+from tempfile import TemporaryDirectory
 from datetime import date
+from dataclasses import replace
+from unittest.mock import patch
+from io import BytesIO
 from .cliente import ClienteMock
-from abstra_notas.assinatura import AssinadorMock
-from abstra_notas.validacoes.xml_iguais import assert_xml_iguais
+from abstra_notas.assinatura import Assinador, AssinadorMock, gerar_pfx_autoassinado
+from abstra_notas.nfse.lotes import RESERVA_LOTE
+from abstra_notas.validacoes.xml_iguais import assert_xml_iguais, assert_c14n_iguais
+import xmlsec
 
 input_exemplo = dict(
     remetente="99999998000228",
@@ -136,3 +143,156 @@ class EnvioLoteTest(TestCase):
                 ],
             ),
         )
+
+    def test_assinatura_em_threads_gera_mesmo_xml(self):
+        with TemporaryDirectory() as diretorio:
+            caminho_pfx = gerar_pfx_autoassinado(
+                Path(diretorio) / "certificado.pfx", "senha"
+            )
+            assinador = Assinador(caminho_pfx, "senha")
+
+        sequencial = EnvioLoteRPS(**input_exemplo)
+        paralelo = EnvioLoteRPS(**input_exemplo, threads_assinatura=4)
+        self.assertEqual(paralelo, sequencial)
+        self.assertNotIn("threads_assinatura", repr(paralelo))
+        self.assertEqual(
+            tostring(paralelo.gerar_xml(assinador)),
+            tostring(sequencial.gerar_xml(assinador)),
+        )
+
+    def test_construtor_lxml(self):
+        assinador = AssinadorMock()
+        pedido = EnvioLoteRPS(**input_exemplo)
+        assert_c14n_iguais(
+            pedido.construir_xml(assinador), pedido.gerar_xml(assinador)
+        )
+
+    def test_iter_xml(self):
+        with TemporaryDirectory() as diretorio:
+            caminho_pfx = gerar_pfx_autoassinado(
+                Path(diretorio) / "certificado.pfx", "senha"
+            )
+            assinador = Assinador(caminho_pfx, "senha")
+
+        pedido = EnvioLoteRPS(**input_exemplo)
+        partes = list(pedido.iter_xml(assinador))
+        self.assertEqual(len(partes), 3 + pedido.quantidade_rps + 1)
+
+        destino = BytesIO()
+        pedido.escrever_xml(assinador, destino)
+        self.assertEqual(destino.getvalue(), b"".join(partes))
+
+        xml = fromstring(destino.getvalue())
+        assinatura = xml.find("{http://www.w3.org/2000/09/xmldsig#}Signature")
+        ctx = xmlsec.SignatureContext()
+        ctx.key = xmlsec.Key.from_memory(
+            assinador.cert_pem_bytes, xmlsec.constants.KeyDataFormatCertPem
+        )
+        ctx.verify(assinatura)
+
+        xml.remove(assinatura)
+        assert_c14n_iguais(xml, pedido.construir_xml(assinador))
+
+    def lista_rps(self):
+        return [
+            rps if isinstance(rps, RPS) else RPS(**rps)
+            for rps in input_exemplo["lista_rps"]
+        ]
+
+    def test_dividir_em_lotes(self):
+        modelo = self.lista_rps()[0]
+        lista_rps = [
+            replace(modelo, numero_rps=numero, data_emissao=date(2015, 1, 1 + numero % 28))
+            for numero in range(120)
+        ]
+        lotes = EnvioLoteRPS.dividir_em_lotes(
+            lista_rps, remetente="99999998000228", transacao=True
+        )
+        self.assertEqual([lote.quantidade_rps for lote in lotes], [50, 50, 20])
+        self.assertEqual(lotes[2].valor_total_servicos, 20 * 100)
+        self.assertEqual(lotes[0].data_inicio_periodo_transmitido, date(2015, 1, 1))
+        self.assertEqual(lotes[0].data_fim_periodo_transmitido, date(2015, 1, 28))
+
+        tamanho = len(tostring(lotes[2].gerar_xml(AssinadorMock())))
+        lotes = EnvioLoteRPS.dividir_em_lotes(
+            lista_rps,
+            remetente="99999998000228",
+            transacao=True,
+            maximo_bytes=tamanho * 2,
+        )
+        self.assertTrue(all(lote.quantidade_rps < 50 for lote in lotes))
+        self.assertEqual(sum(lote.quantidade_rps for lote in lotes), 120)
+
+    def test_dividir_em_lotes_com_assinador(self):
+        with TemporaryDirectory() as diretorio:
+            caminho_pfx = gerar_pfx_autoassinado(
+                Path(diretorio) / "certificado.pfx", "senha"
+            )
+            assinador = Assinador(caminho_pfx, "senha")
+
+        modelo = self.lista_rps()[0]
+        lista_rps = [replace(modelo, numero_rps=numero) for numero in range(120)]
+        tamanho_rps = len(modelo.gerar_string_xml(assinador).encode("utf-8"))
+        maximo_bytes = RESERVA_LOTE + 30 * tamanho_rps
+
+        # Sem o assinador, é reservado o espaço de uma chave de 4096 bits.
+        reservados = EnvioLoteRPS.dividir_em_lotes(
+            lista_rps,
+            remetente="99999998000228",
+            transacao=True,
+            maximo_bytes=maximo_bytes,
+        )
+        medidos = EnvioLoteRPS.dividir_em_lotes(
+            lista_rps,
+            remetente="99999998000228",
+            transacao=True,
+            maximo_bytes=maximo_bytes,
+            assinador=assinador,
+        )
+        self.assertEqual(medidos[0].quantidade_rps, 30)
+        self.assertLess(reservados[0].quantidade_rps, 30)
+        for lote in medidos:
+            self.assertLessEqual(len(tostring(lote.gerar_xml(assinador))), maximo_bytes)
+
+    def test_gerar_notas(self):
+        resultado = ClienteMock().gerar_notas(
+            self.lista_rps(), remetente="99999998000228", transacao=False
+        )
+        self.assertEqual(resultado["BB", 4102].chave_nfe_numero_nfe, 3)
+        self.assertEqual(resultado["BC", 4103].chave_nfe_numero_nfe, 4)
+
+    def test_gerar_notas_com_erro_no_lote(self):
+        erro = Erro(codigo=1, descricao="Lote rejeitado")
+        with patch.object(ClienteMock, "gerar_notas_em_lote", side_effect=erro):
+            resultado = ClienteMock().gerar_notas(
+                self.lista_rps(), remetente="99999998000228"
+            )
+        self.assertEqual(resultado, {("BB", 4102): erro, ("BC", 4103): erro})
+
+    def test_gerar_notas_mesmo_numero_em_outra_serie(self):
+        modelo = self.lista_rps()[0]
+        resultado = ClienteMock().gerar_notas(
+            [modelo, replace(modelo, serie_rps="ZZ")],
+            remetente="99999998000228",
+            transacao=False,
+        )
+        self.assertEqual(resultado["BB", 4102].chave_nfe_numero_nfe, 3)
+        self.assertIsNone(resultado["ZZ", 4102])
+
+    def test_gerar_notas_propaga_erros_de_programacao(self):
+        with patch.object(
+            ClienteMock, "gerar_notas_em_lote", side_effect=AttributeError
+        ):
+            with self.assertRaises(AttributeError):
+                ClienteMock().gerar_notas(self.lista_rps(), remetente="99999998000228")
+
+    def test_gerar_xml_reaproveita_rps_da_divisao(self):
+        assinador = AssinadorMock()
+        [lote] = EnvioLoteRPS.dividir_em_lotes(
+            self.lista_rps(), remetente="99999998000228", transacao=False
+        )
+        novo = replace(lote)
+        with patch.object(RPS, "gerar_string_xml") as gerar_string_xml:
+            xml = lote.gerar_xml(assinador)
+        gerar_string_xml.assert_not_called()
+        assert_c14n_iguais(xml, novo.gerar_xml(assinador))
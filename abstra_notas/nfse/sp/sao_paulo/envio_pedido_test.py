@@ -3,9 +3,10 @@ from .envio_rps import EnvioRPS, RetornoEnvioRps
 from pathlib import Path
 from lxml.etree import fromstring
 from datetime import date
+from dataclasses import asdict
 from .cliente import ClienteMock
 from abstra_notas.assinatura import AssinadorMock
-from abstra_notas.validacoes.xml_iguais import assert_xml_iguais
+from abstra_notas.validacoes.xml_iguais import assert_xml_iguais, assert_c14n_iguais
 
 parametros_opcionais = [
     f
@@ -155,3 +156,47 @@ class EnvioTest(TestCase):
                 chave_rps_serie_rps="BB",
             ),
         )
+
+    def test_construtor_lxml(self):
+        assinador = AssinadorMock()
+        pedido = EnvioRPS(
+            **input_exemplo,
+            inscricao_municipal_tomador="12345678",
+            intermediario="99999997000100",
+            iss_retido_intermediario=True,
+            email_intermediario="intermediario@teste.com.br",
+            valor_carga_tributaria_centavos=100,
+            percentual_carga_tributaria=0.15,
+            fonte_carga_tributaria="IBPT",
+            codigo_cei=123,
+            matricula_obra=456,
+            municipio_prestacao=3550308,
+            numero_encapsulamento=789,
+            valor_total_recebido_centavos=2050000,
+        )
+        assert_c14n_iguais(
+            pedido.construir_xml(assinador), pedido.gerar_xml(assinador)
+        )
+
+    def test_tipos_dos_documentos(self):
+        pedido = EnvioRPS(
+            **{
+                **input_exemplo,
+                "remetente": "99.999.999/9999-62",
+                "tomador": "999.999.997-27",
+            }
+        )
+        self.assertEqual(pedido.remetente, "99999999999962")
+        self.assertEqual(pedido.remetente_tipo, "CNPJ")
+        self.assertEqual(pedido.tomador, "99999999727")
+        self.assertEqual(pedido.tomador_tipo, "CPF")
+        self.assertIsNone(pedido.intermediario_tipo)
+
+        pedido.tomador = "99999999999962"
+        self.assertEqual(pedido.tomador_tipo, "CNPJ")
+        self.assertEqual(EnvioRPS(**asdict(pedido)), pedido)
+
+    def test_validar(self):
+        pedido = EnvioRPS(**input_exemplo)
+        for construtor in ("template", "lxml"):
+            pedido.gerar_xml_assinado(AssinadorMock(), construtor, validar=True)
@@ -1,23 +1,59 @@
-from dataclasses import dataclass
-from typing import Literal, List, Optional
-from lxml.etree import Element, fromstring, ElementBase
+from dataclasses import dataclass, field
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import (
+    Any,
+    BinaryIO,
+    Deque,
+    Dict,
+    Iterable,
+    Iterator,
+    Literal,
+    List,
+    Optional,
+    TextIO,
+    Tuple,
+    Union,
+)
+from lxml.etree import Element, QName, fromstring, tostring, ElementBase
+from hashlib import sha1
 import base64
 from dateutil.parser import parse
 from abstra_notas.validacoes.email import validar_email
 from abstra_notas.validacoes.cidades import validar_codigo_cidade, normalizar_uf, UF
-from abstra_notas.validacoes.cpfcnpj import normalizar_cpf_ou_cnpj, cpf_ou_cnpj
+from abstra_notas.validacoes.cpfcnpj import (
+    cpf_ou_cnpj,
+    normalizar_cpf_ou_cnpj,
+)
 from abstra_notas.validacoes.cep import normalizar_cep
 from abstra_notas.validacoes.tipo_logradouro import TipoLogradouro
 from datetime import date
+from io import TextIOBase, TextIOWrapper
+from os import PathLike
+from pathlib import Path
 from .remessa import Remessa
 from .pedido import Pedido
 from .retorno import Retorno
 from .templates import load_template
 from abstra_notas.assinatura import Assinador
+from abstra_notas.nfse.lotes import dividir_em_lotes
+from abstra_notas.nfse.construtor import SEM_NAMESPACE, filho
+from abstra_notas.nfse.transporte import ERROS_TRANSPORTE
 from .erro import Erro
+import os
 import re
 import re
 
+NAMESPACE = "http://www.prefeitura.sp.gov.br/nfe"
+NSMAP = {
+    None: NAMESPACE,
+    "xsi": "http://www.w3.org/2001/XMLSchema-instance",
+    "xsd": "http://www.w3.org/2001/XMLSchema",
+}
+"""
+Namespaces declarados nos pedidos de envio, como nos templates.
+"""
+
 
 @dataclass
 class ChaveNFeRPS(Retorno):
@@ -254,8 +290,8 @@ class RPS:
                 uf_str = self.endereco_uf.value
             self.endereco_uf = UF(normalizar_uf(uf_str))
 
-        if self.tomador is not None:
-            self.tomador = normalizar_cpf_ou_cnpj(self.tomador)
+        self.tomador = normalizar_cpf_ou_cnpj(self.tomador, optional=True)
+        self.intermediario = normalizar_cpf_ou_cnpj(self.intermediario, optional=True)
 
         if self.endereco_cidade is not None:
             if str(self.endereco_cidade).isdigit():
@@ -384,9 +420,16 @@ class RPS:
             and len(self.fonte_carga_tributaria) <= 10
         ), "A fonte da carga tributária deve ter no máximo 10 caracteres"
 
-    def gerar_string_xml(self, assinador: Assinador) -> str:
-        template = load_template("RPS")
-        return template.render(
+    def campos_xml(
+        self, assinador: Assinador, assinatura: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Valores do RPS já formatados para o XML.
+
+        :param assinatura: Assinatura do RPS já calculada. Quando omitida, é
+            calculada com o assinador.
+        """
+        return dict(
             inscricao_prestador=str(self.inscricao_prestador).zfill(8),
             serie_rps=self.serie_rps,
             numero_rps=self.numero_rps,
@@ -434,7 +477,9 @@ class RPS:
             endereco_cep=self.endereco_cep,
             email_tomador=self.email_tomador,
             discriminacao=self.discriminacao,
-            assinatura=self.assinatura(assinador),
+            assinatura=assinatura
+            if assinatura is not None
+            else self.assinatura(assinador),
             intermediario=self.intermediario,
             intermediario_tipo=self.intermediario_tipo,
             inscricao_municipal_intermediario=self.inscricao_municipal_intermediario,
@@ -455,215 +500,419 @@ class RPS:
             else None,
         )
 
+    def gerar_string_xml(
+        self, assinador: Assinador, assinatura: Optional[str] = None
+    ) -> str:
+        """
+        :param assinatura: Assinatura do RPS já calculada. Quando omitida, é
+            calculada com o assinador.
+        """
+        template = load_template("RPS")
+        return template.render(**self.campos_xml(assinador, assinatura))
+
+    def gerar_elemento_xml(
+        self, assinador: Assinador, assinatura: Optional[str] = None
+    ) -> ElementBase:
+        """
+        Monta o mesmo XML de `gerar_string_xml` diretamente com o lxml.
+        """
+        campos = self.campos_xml(assinador, assinatura)
+        rps = Element("RPS", nsmap=SEM_NAMESPACE)
+        filho(rps, "Assinatura", campos["assinatura"])
+        chave = filho(rps, "ChaveRPS")
+        filho(chave, "InscricaoPrestador", campos["inscricao_prestador"])
+        filho(chave, "SerieRPS", campos["serie_rps"])
+        filho(chave, "NumeroRPS", campos["numero_rps"])
+        filho(rps, "TipoRPS", campos["tipo_rps"])
+        filho(rps, "DataEmissao", campos["data_emissao"])
+        filho(rps, "StatusRPS", campos["status_rps"])
+        filho(rps, "TributacaoRPS", campos["tributacao_rps"])
+        filho(rps, "ValorServicos", campos["valor_servicos"])
+        for tag, campo in (
+            ("ValorDeducoes", "valor_deducoes"),
+            ("ValorPIS", "valor_pis"),
+            ("ValorCOFINS", "valor_cofins"),
+            ("ValorINSS", "valor_inss"),
+            ("ValorIR", "valor_ir"),
+            ("ValorCSLL", "valor_csll"),
+        ):
+            if campos[campo]:
+                filho(rps, tag, campos[campo])
+        filho(rps, "CodigoServico", campos["codigo_servico"])
+        filho(rps, "AliquotaServicos", campos["aliquota_servicos"])
+        filho(rps, "ISSRetido", campos["iss_retido"])
+        if campos["tomador"]:
+            filho(
+                filho(rps, "CPFCNPJTomador"), campos["tomador_tipo"], campos["tomador"]
+            )
+        for tag, campo in (
+            ("InscricaoMunicipalTomador", "inscricao_municipal_tomador"),
+            ("InscricaoEstadualTomador", "inscricao_estadual_tomador"),
+            ("RazaoSocialTomador", "razao_social_tomador"),
+        ):
+            if campos[campo]:
+                filho(rps, tag, campos[campo])
+        endereco = filho(rps, "EnderecoTomador")
+        for tag, campo in (
+            ("TipoLogradouro", "endereco_tipo_logradouro"),
+            ("Logradouro", "endereco_logradouro"),
+            ("NumeroEndereco", "endereco_numero"),
+            ("ComplementoEndereco", "endereco_complemento"),
+            ("Bairro", "endereco_bairro"),
+            ("Cidade", "endereco_cidade"),
+            ("UF", "endereco_uf"),
+            ("CEP", "endereco_cep"),
+        ):
+            if campos[campo]:
+                filho(endereco, tag, campos[campo])
+        if campos["email_tomador"]:
+            filho(rps, "EmailTomador", campos["email_tomador"])
+        if campos["intermediario"]:
+            filho(
+                filho(rps, "CPFCNPJIntermediario"),
+                campos["intermediario_tipo"],
+                campos["intermediario"],
+            )
+        for tag, campo in (
+            ("InscricaoMunicipalIntermediario", "inscricao_municipal_intermediario"),
+            ("ISSRetidoIntermediario", "iss_retido_intermediario"),
+            ("EmailIntermediario", "email_intermediario"),
+        ):
+            if campos[campo]:
+                filho(rps, tag, campos[campo])
+        filho(rps, "Discriminacao", campos["discriminacao"])
+        for tag, campo in (
+            ("ValorCargaTributaria", "valor_carga_tributaria"),
+            ("PercentualCargaTributaria", "percentual_carga_tributaria"),
+            ("FonteCargaTributaria", "fonte_carga_tributaria"),
+            ("CodigoCEI", "codigo_cei"),
+            ("MatriculaObra", "matricula_obra"),
+            ("MunicipioPrestacao", "municipio_prestacao"),
+            ("NumeroEncapsulamento", "numero_encapsulamento"),
+            ("ValorTotalRecebido", "valor_total_recebido"),
+        ):
+            if campos[campo]:
+                filho(rps, tag, campos[campo])
+        return rps
+
     @staticmethod
     def ler_txt(conteudo: str) -> List["RPS"]:
-        lista_rps = []
-        lines = conteudo.splitlines()
-        inscricao_prestador = None
+        return list(RPS._ler_linhas_txt(conteudo.splitlines()))
+
+    @staticmethod
+    def iter_txt(
+        origem: Union[str, Path, TextIO, BinaryIO], encoding: str = "latin-1"
+    ) -> Iterator["RPS"]:
+        """
+        Versão de `ler_txt` que lê o arquivo linha a linha e gera os RPS sob
+        demanda, sem carregar o arquivo inteiro na memória.
+
+        :param origem: Caminho do arquivo ou arquivo já aberto, em modo texto
+            ou binário.
+        :param encoding: Codificação do arquivo, usada quando `origem` é um
+            caminho ou um arquivo binário.
+        """
+        yield from RPS._ler_linhas_txt(_abrir_txt(origem, encoding))
+
+    @staticmethod
+    def ler_txt_paralelo(
+        origem: Union[str, Path, TextIO, BinaryIO],
+        encoding: str = "latin-1",
+        processos: Optional[int] = None,
+        linhas_por_bloco: int = 5_000,
+    ) -> "LeituraTxt":
+        """
+        Lê o arquivo em blocos de linhas interpretados em paralelo por
+        `processos` processos (por padrão, um por CPU). Os RPS são retornados
+        na ordem do arquivo.
+
+        Diferente de `ler_txt`, uma linha inválida não interrompe a leitura: o
+        erro é registrado em `LeituraTxt.erros`, com o número da linha.
+        """
+        processos = processos or os.cpu_count() or 1
+        leitura = LeituraTxt(lista_rps=[], erros=[])
+        with ProcessPoolExecutor(max_workers=processos) as executor:
+            pendentes: Deque[Future] = deque()
+            for bloco in _dividir_txt(_abrir_txt(origem, encoding), linhas_por_bloco):
+                pendentes.append(executor.submit(_ler_bloco_txt, bloco))
+                # Limita os blocos em memória enquanto o arquivo é lido.
+                if len(pendentes) >= 2 * processos:
+                    leitura.juntar(pendentes.popleft().result())
+            while pendentes:
+                leitura.juntar(pendentes.popleft().result())
+        return leitura
+
+    @staticmethod
+    def escrever_txt(
+        lista_rps: Iterable["RPS"],
+        destino: Union[str, Path, TextIO, BinaryIO],
+        encoding: str = "latin-1",
+    ):
+        """
+        Escreve os RPS no layout de importação lido por `ler_txt`. Todos devem
+        ter o mesmo prestador; o período do cabeçalho vai da primeira à última
+        data de emissão. Para arquivos maiores que a memória, use
+        `EscritorRPSTxt`.
+        """
+        lista_rps = list(lista_rps)
+        assert len(lista_rps) > 0, "Deve haver pelo menos um RPS no arquivo"
+        datas = [rps.data_emissao for rps in lista_rps]
+        with EscritorRPSTxt(
+            destino,
+            inscricao_prestador=lista_rps[0].inscricao_prestador,
+            data_inicio=min(datas),
+            data_fim=max(datas),
+            encoding=encoding,
+        ) as escritor:
+            for rps in lista_rps:
+                escritor.escrever(rps)
 
-        for line in lines:
+    @staticmethod
+    def _ler_linhas_txt(linhas: Iterable[str]) -> Iterator["RPS"]:
+        """
+        Lê os registros do layout de importação de RPS: o cabeçalho (tipo 1)
+        informa a inscrição do prestador dos RPS (tipo 6) seguintes. Os demais
+        registros, como o rodapé (tipo 9), são ignorados.
+        """
+        inscricao_prestador = None
+        for line in linhas:
+            line = line.rstrip("\r\n")
             if line.startswith("1"):
-                inscricao_prestador = int(line[4:12])
-            elif line.startswith("6"):
-                if inscricao_prestador is None:
-                    continue
-
-                tipo_rps = line[1:6].strip()
-                serie_rps = line[6:11].strip()
-                numero_rps = int(line[11:23])
-                data_emissao = parse(line[23:31]).date()
-                status_rps = line[31:32]
-
-                valor_servicos_centavos = int(line[32:47])
-                valor_deducoes_centavos = int(line[47:62])
-
-                codigo_servico = line[62:67].strip()
-
-                aliquota_servicos = int(line[67:71]) / 10000
-
-                iss_retido = line[71:72] == "1"
-                tipo_tomador = line[72:73]
-
-                tomador_cpf_cnpj = line[73:87].strip()
-
-                # If Type 1 (CPF), ensure it is treated as 11 digits by stripping leading zeros/padding
-                if tipo_tomador == "1":
-                    # Taking the last 11 digits is safer if it was left-padded with zeros
-                    if len(tomador_cpf_cnpj) > 11:
-                        tomador_cpf_cnpj = tomador_cpf_cnpj[-11:]
-
-                try:
-                    tomador_cpf_cnpj = normalizar_cpf_ou_cnpj(tomador_cpf_cnpj)
-                except ValueError:
-                    tomador_cpf_cnpj = None
-
-                im_tomador = line[87:95].strip()
-                ie_tomador = line[95:107].strip()
-
-                razao_social_tomador = line[107:182].strip()
-
-                # Dynamic Offset Calculation Logic
-                # Search for UF+CEP anchor (2 uppercase letters + 8 digits) around expected position 355
-                # We search a wider window to catch significant shifts
-                match_uf_cep = re.search(r'([A-Z]{2}\d{8})', line[330:380])
-                offset = 0
-                if match_uf_cep:
-                    # Found relative to slice start (330), so actual pos is match.start() + 330
-                    actual_uf_pos = match_uf_cep.start() + 330
-                    expected_uf_pos = 355
-                    offset = actual_uf_pos - expected_uf_pos
-
-                endereco_tipo_logradouro_raw = line[182+offset:185+offset].strip().rstrip(".")
-                try:
-                    if (
-                        endereco_tipo_logradouro_raw.upper()
-                        in TipoLogradouro.__members__
-                    ):
-                        endereco_tipo_logradouro = TipoLogradouro[
-                            endereco_tipo_logradouro_raw.upper()
-                        ]
-                    else:
-                        endereco_tipo_logradouro = TipoLogradouro(
-                            endereco_tipo_logradouro_raw.upper()
-                        )
-                except ValueError:
-                    endereco_tipo_logradouro = None
-                
-                endereco_logradouro = line[185+offset:235+offset].strip()
-                endereco_numero = line[235+offset:245+offset].strip()
-                endereco_complemento = line[245+offset:275+offset].strip()
-                endereco_bairro = line[275+offset:305+offset].strip()
-
-                # Cidade (Nome) is at 306-355
-                endereco_cidade = line[305+offset:355+offset].strip()
-
-                endereco_uf = line[355+offset:357+offset].strip()
-                endereco_cep = line[357+offset:365+offset].strip()
-
-                email_tomador_raw = line[365+offset:440+offset].strip()
-                email_tomador = (
-                    email_tomador_raw if "@" in email_tomador_raw else None
+                inscricao_prestador = _inscricao_cabecalho_txt(line)
+            elif line.startswith("6") and inscricao_prestador is not None:
+                yield RPS._ler_linha_txt(line, inscricao_prestador)
+
+    @staticmethod
+    def _ler_linha_txt(line: str, inscricao_prestador: int) -> "RPS":
+        tipo_rps = line[1:6].strip()
+        serie_rps = line[6:11].strip()
+        numero_rps = int(line[11:23])
+        data_emissao = parse(line[23:31]).date()
+
+        # A situação do RPS (posição 32) é a tributação ou "C", de cancelado. O
+        # layout não registra a tributação dos RPS cancelados.
+        if line[31] == "C":
+            status_rps, tributacao_rps = "C", "T"
+        else:
+            status_rps, tributacao_rps = "N", line[31]
+
+        valor_servicos_centavos = int(line[32:47])
+        valor_deducoes_centavos = int(line[47:62])
+
+        codigo_servico = line[62:67].strip()
+
+        aliquota_servicos = int(line[67:71]) / 10000
+
+        iss_retido = line[71:72] == "1"
+        tipo_tomador = line[72:73]
+
+        tomador_cpf_cnpj = line[73:87].strip()
+
+        # If Type 1 (CPF), ensure it is treated as 11 digits by stripping leading zeros/padding
+        if tipo_tomador == "1":
+            # Taking the last 11 digits is safer if it was left-padded with zeros
+            if len(tomador_cpf_cnpj) > 11:
+                tomador_cpf_cnpj = tomador_cpf_cnpj[-11:]
+
+        try:
+            tomador_cpf_cnpj = normalizar_cpf_ou_cnpj(tomador_cpf_cnpj)
+        except ValueError:
+            tomador_cpf_cnpj = None
+
+        im_tomador = line[87:95].strip()
+        ie_tomador = line[95:107].strip()
+
+        razao_social_tomador = line[107:182].strip()
+
+        # Dynamic Offset Calculation Logic
+        # Search for UF+CEP anchor (2 uppercase letters + 8 digits) around expected position 355
+        # We search a wider window to catch significant shifts
+        match_uf_cep = re.search(r'([A-Z]{2}\d{8})', line[330:380])
+        offset = 0
+        if match_uf_cep:
+            # Found relative to slice start (330), so actual pos is match.start() + 330
+            actual_uf_pos = match_uf_cep.start() + 330
+            expected_uf_pos = 355
+            offset = actual_uf_pos - expected_uf_pos
+
+        endereco_tipo_logradouro_raw = line[182+offset:185+offset].strip().rstrip(".")
+        try:
+            if (
+                endereco_tipo_logradouro_raw.upper()
+                in TipoLogradouro.__members__
+            ):
+                endereco_tipo_logradouro = TipoLogradouro[
+                    endereco_tipo_logradouro_raw.upper()
+                ]
+            else:
+                endereco_tipo_logradouro = TipoLogradouro(
+                    endereco_tipo_logradouro_raw.upper()
                 )
+        except ValueError:
+            endereco_tipo_logradouro = None
+        
+        endereco_logradouro = line[185+offset:235+offset].strip()
+        endereco_numero = line[235+offset:245+offset].strip()
+        endereco_complemento = line[245+offset:275+offset].strip()
+        endereco_bairro = line[275+offset:305+offset].strip()
+
+        # Cidade (Nome) is at 306-355
+        endereco_cidade = line[305+offset:355+offset].strip()
+
+        endereco_uf = line[355+offset:357+offset].strip()
+        endereco_cep = line[357+offset:365+offset].strip()
+
+        email_tomador_raw = line[365+offset:440+offset].strip()
+        email_tomador = (
+            email_tomador_raw if "@" in email_tomador_raw else None
+        )
 
-                # Layout V.002 Fields (Positions 441+)
-                # Apply offset to subsequent fields as shift likely originated in text fields
-                valor_pis_centavos = int(line[440+offset:455+offset])
-                valor_cofins_centavos = int(line[455+offset:470+offset])
-                valor_inss_centavos = int(line[470+offset:485+offset])
-                valor_ir_centavos = int(line[485+offset:500+offset])
-                valor_csll_centavos = int(line[500+offset:515+offset])
-
-                valor_carga_tributaria_centavos = int(line[515+offset:530+offset])
-                percentual_carga_tributaria = int(line[530+offset:535+offset]) / 10000
-                fonte_carga_tributaria = line[535+offset:545+offset].strip()
-
-                codigo_cei = line[545+offset:557+offset].strip()
-                matricula_obra = line[557+offset:569+offset].strip()
-                municipio_prestacao = line[569+offset:576+offset].strip()
-                numero_encapsulamento = line[576+offset:586+offset].strip()
-                
-                # Reserved 587-596
-
-                valor_total_recebido_centavos = line[596+offset:611+offset].strip()
-
-                # Reserved 612-786
-
-                discriminacao = line[786+offset:].strip()
-
-                rps = RPS(
-                    inscricao_prestador=inscricao_prestador,
-                    numero_rps=numero_rps,
-                    tipo_rps=tipo_rps,
-                    data_emissao=data_emissao,
-                    status_rps=status_rps,
-                    tributacao_rps="T",  # Defaulting or needs extraction?
-                    # WARNING: 'tributacao_rps' was missing in V.002 extraction in previous code too?
-                    # In V.001/V.002 header logic:
-                    # Pos 32: Situação do RPS (T, F, A, B...) -> This maps to 'tributacao_rps' in RPS dataclass?
-                    # In RPS dataclass: status_rps is Literal["N", "C"] (Normal, Cancelado).
-                    # But in Manual: Pos 32 is "Situação do RPS" with values T, F, A, B...
-                    # Wait. Manual says:
-                    # 6) Situação do RPS (32-32): T, F, A, B... (Taxation Type).
-                    # BUT RPS Dataclass has `status_rps` AND `tributacao_rps`.
-                    # Let's check RPS Dataclass:
-                    # `status_rps`: Literal["N", "C"]
-                    # `tributacao_rps`: Literal["T", "F", ...]
-                    #
-                    # In Manual V.001/V.002:
-                    # Field 6 "Situação do RPS" contains T, F, A, B, C (Cancelado)...
-                    # So if it is 'C', it is Cancelled. If it is 'T', it is Normal & Taxed inside SP.
-                    # The `RPS` object separates Status (Normal/Cancelled) and Taxation.
-                    # Logic needed:
-                    # If line[31] == 'C': status='C', tributacao=? (Maybe previous valid one or None?)
-                    # If line[31] != 'C': status='N', tributacao=line[31]
-                    #
-                    # Re-reading Manual 2.3.1:
-                    # "Situação do RPS ... C – Cancelado"
-                    # "T – Tributado em São Paulo"
-                    #
-                    # So line[31] (pos 32) holds the Taxation info OR Cancelled status.
-                    #
-                    # I will implement logic to split this.
-                    #
-                    valor_servicos_centavos=valor_servicos_centavos,
-                    valor_deducoes_centavos=valor_deducoes_centavos,
-                    codigo_servico=codigo_servico,
-                    aliquota_servicos=aliquota_servicos,
-                    iss_retido=iss_retido,
-                    serie_rps=serie_rps,
-                    tomador=tomador_cpf_cnpj,
-                    razao_social_tomador=razao_social_tomador,
-                    endereco_tipo_logradouro=endereco_tipo_logradouro,
-                    endereco_logradouro=endereco_logradouro,
-                    endereco_numero=endereco_numero,
-                    endereco_complemento=endereco_complemento,
-                    endereco_bairro=endereco_bairro,
-                    endereco_cidade=endereco_cidade,
-                    endereco_uf=endereco_uf,
-                    endereco_cep=endereco_cep,
-                    email_tomador=email_tomador,
-                    discriminacao=discriminacao,
-                    valor_pis_centavos=valor_pis_centavos,
-                    valor_cofins_centavos=valor_cofins_centavos,
-                    valor_inss_centavos=valor_inss_centavos,
-                    valor_ir_centavos=valor_ir_centavos,
-                    valor_csll_centavos=valor_csll_centavos,
-                    valor_carga_tributaria_centavos=valor_carga_tributaria_centavos,
-                    percentual_carga_tributaria=percentual_carga_tributaria,
-                    fonte_carga_tributaria=fonte_carga_tributaria,
-                    codigo_cei=int(codigo_cei) if codigo_cei else None,
-                    matricula_obra=int(matricula_obra) if matricula_obra else None,
-                    municipio_prestacao=int(municipio_prestacao)
-                    if municipio_prestacao
-                    else None,
-                    numero_encapsulamento=int(numero_encapsulamento)
-                    if numero_encapsulamento
-                    else None,
-                    valor_total_recebido_centavos=int(valor_total_recebido_centavos)
-                    if valor_total_recebido_centavos
-                    else None,
-                    inscricao_municipal_tomador=im_tomador
-                    if im_tomador and im_tomador != "00000000"
-                    else None,
-                    inscricao_estadual_tomador=ie_tomador
-                    if ie_tomador and ie_tomador != "000000000000"
+        # Layout V.002 Fields (Positions 441+)
+        # Apply offset to subsequent fields as shift likely originated in text fields
+        valor_pis_centavos = int(line[440+offset:455+offset])
+        valor_cofins_centavos = int(line[455+offset:470+offset])
+        valor_inss_centavos = int(line[470+offset:485+offset])
+        valor_ir_centavos = int(line[485+offset:500+offset])
+        valor_csll_centavos = int(line[500+offset:515+offset])
+
+        valor_carga_tributaria_centavos = int(line[515+offset:530+offset])
+        percentual_carga_tributaria = int(line[530+offset:535+offset]) / 10000
+        fonte_carga_tributaria = line[535+offset:545+offset].strip()
+
+        codigo_cei = line[545+offset:557+offset].strip()
+        matricula_obra = line[557+offset:569+offset].strip()
+        municipio_prestacao = line[569+offset:576+offset].strip()
+        numero_encapsulamento = line[576+offset:586+offset].strip()
+        
+        # Reserved 587-596
+
+        valor_total_recebido_centavos = line[596+offset:611+offset].strip()
+
+        # Reserved 612-786
+
+        # Quebras de linha da discriminação são representadas por "|".
+        discriminacao = line[786+offset:].strip().replace("|", "\n")
+
+        return RPS(
+            inscricao_prestador=inscricao_prestador,
+            numero_rps=numero_rps,
+            tipo_rps=tipo_rps,
+            data_emissao=data_emissao,
+            status_rps=status_rps,
+            tributacao_rps=tributacao_rps,
+            valor_servicos_centavos=valor_servicos_centavos,
+            valor_deducoes_centavos=valor_deducoes_centavos,
+            codigo_servico=codigo_servico,
+            aliquota_servicos=aliquota_servicos,
+            iss_retido=iss_retido,
+            serie_rps=serie_rps,
+            tomador=tomador_cpf_cnpj,
+            razao_social_tomador=razao_social_tomador,
+            endereco_tipo_logradouro=endereco_tipo_logradouro,
+            endereco_logradouro=endereco_logradouro,
+            endereco_numero=endereco_numero,
+            endereco_complemento=endereco_complemento,
+            endereco_bairro=endereco_bairro,
+            endereco_cidade=endereco_cidade,
+            endereco_uf=endereco_uf,
+            endereco_cep=endereco_cep,
+            email_tomador=email_tomador,
+            discriminacao=discriminacao,
+            valor_pis_centavos=valor_pis_centavos,
+            valor_cofins_centavos=valor_cofins_centavos,
+            valor_inss_centavos=valor_inss_centavos,
+            valor_ir_centavos=valor_ir_centavos,
+            valor_csll_centavos=valor_csll_centavos,
+            valor_carga_tributaria_centavos=valor_carga_tributaria_centavos,
+            percentual_carga_tributaria=percentual_carga_tributaria,
+            fonte_carga_tributaria=fonte_carga_tributaria,
+            codigo_cei=int(codigo_cei) if codigo_cei else None,
+            matricula_obra=int(matricula_obra) if matricula_obra else None,
+            municipio_prestacao=int(municipio_prestacao)
+            if municipio_prestacao
+            else None,
+            numero_encapsulamento=int(numero_encapsulamento)
+            if numero_encapsulamento
+            else None,
+            valor_total_recebido_centavos=int(valor_total_recebido_centavos)
+            if valor_total_recebido_centavos
+            else None,
+            inscricao_municipal_tomador=im_tomador
+            if im_tomador and im_tomador != "00000000"
+            else None,
+            inscricao_estadual_tomador=ie_tomador
+            if ie_tomador and ie_tomador != "000000000000"
+            else None,
+        )
+
+    def linha_txt(self) -> str:
+        """
+        Registro de detalhe (tipo 6) do RPS no layout de importação, versão 002,
+        o inverso de `ler_txt`. O layout não registra a tributação de RPS
+        cancelados: a situação é sempre "C".
+
+        :raises ValueError: Se algum valor não couber no seu campo, como uma
+            alíquota de 100%: o layout aceita alíquotas de até 99,99%.
+        """
+        aliquota = round(self.aliquota_servicos * 10000)
+        if aliquota > 9999:
+            raise ValueError(
+                f"A alíquota {self.aliquota_servicos} não cabe no layout de "
+                "importação, que aceita alíquotas de até 99,99%"
+            )
+        return "".join(
+            [
+                "6",
+                _texto_txt(self.tipo_rps, 5),
+                _texto_txt(self.serie_rps, 5),
+                _numero_txt(self.numero_rps, 12),
+                self.data_emissao.strftime("%Y%m%d"),
+                "C" if self.status_rps == "C" else self.tributacao_rps,
+                _numero_txt(self.valor_servicos_centavos, 15),
+                _numero_txt(self.valor_deducoes_centavos, 15),
+                _numero_txt(self.codigo_servico, 5),
+                _numero_txt(aliquota, 4),
+                "1" if self.iss_retido else "2",
+                {"CPF": "1", "CNPJ": "2", None: "3"}[self.tomador_tipo],
+                _numero_txt(self.tomador, 14, opcional=True),
+                _numero_txt(self.inscricao_municipal_tomador, 8),
+                _numero_txt(self.inscricao_estadual_tomador, 12),
+                _texto_txt(self.razao_social_tomador, 75),
+                _texto_txt(
+                    self.endereco_tipo_logradouro.value
+                    if self.endereco_tipo_logradouro is not None
                     else None,
-                )
-                
-                # Correction for status/tributacao logic inside the object construction above
-                if line[31] == 'C':
-                    rps.status_rps = 'C'
-                    # Tributacao is mandatory in RPS dataclass, but meaningless if cancelled?
-                    # We'll default to 'T' if cancelled, or leave it if it allows.
-                    # The dataclass definition says `tributacao_rps: Literal[...]`
-                    rps.tributacao_rps = 'T' 
-                else:
-                    rps.status_rps = 'N'
-                    rps.tributacao_rps = line[31]
-
-                lista_rps.append(rps)
-
-        return lista_rps
+                    3,
+                ),
+                _texto_txt(self.endereco_logradouro, 50),
+                _texto_txt(self.endereco_numero, 10),
+                _texto_txt(self.endereco_complemento, 30),
+                _texto_txt(self.endereco_bairro, 30),
+                _texto_txt(self.endereco_cidade, 50),
+                _texto_txt(
+                    self.endereco_uf.value if self.endereco_uf is not None else None, 2
+                ),
+                _numero_txt(self.endereco_cep, 8),
+                _texto_txt(self.email_tomador, 75),
+                _numero_txt(self.valor_pis_centavos, 15),
+                _numero_txt(self.valor_cofins_centavos, 15),
+                _numero_txt(self.valor_inss_centavos, 15),
+                _numero_txt(self.valor_ir_centavos, 15),
+                _numero_txt(self.valor_csll_centavos, 15),
+                _numero_txt(self.valor_carga_tributaria_centavos, 15),
+                _numero_txt(round((self.percentual_carga_tributaria or 0) * 10000), 5),
+                _texto_txt(self.fonte_carga_tributaria, 10),
+                _numero_txt(self.codigo_cei, 12, opcional=True),
+                _numero_txt(self.matricula_obra, 12, opcional=True),
+                _numero_txt(self.municipio_prestacao, 7, opcional=True),
+                _numero_txt(self.numero_encapsulamento, 10, opcional=True),
+                " " * 10,
+                _numero_txt(self.valor_total_recebido_centavos, 15, opcional=True),
+                " " * 175,
+                # Quebras de linha da discriminação são representadas por "|".
+                "|".join(self.discriminacao.splitlines()),
+            ]
+        )
 
     def assinatura(self, assinador: Assinador) -> str:
         template = ""
@@ -713,17 +962,19 @@ class RPS:
 
     @property
     def tomador_tipo(self) -> Optional[Literal["CPF", "CNPJ"]]:
-        return cpf_ou_cnpj(self.tomador) if self.tomador is not None else None
+        return cpf_ou_cnpj(self.tomador, optional=True)
 
     @property
     def intermediario_tipo(self) -> Optional[Literal["CPF", "CNPJ"]]:
-        return (
-            cpf_ou_cnpj(self.intermediario) if self.intermediario is not None else None
-        )
+        return cpf_ou_cnpj(self.intermediario, optional=True)
 
 
 @dataclass
 class EnvioRPS(RPS, Pedido, Remessa):
+    def __post_init__(self):
+        RPS.__post_init__(self)
+        Remessa.__post_init__(self)
+
     def gerar_xml(self, assinador: Assinador) -> Element:
         xml = self.template.render(
             remetente=self.remetente,
@@ -733,6 +984,13 @@ class EnvioRPS(RPS, Pedido, Remessa):
 
         return fromstring(xml)
 
+    def construir_xml(self, assinador: Assinador) -> Element:
+        pedido = Element(QName(NAMESPACE, "PedidoEnvioRPS"), nsmap=NSMAP)
+        cabecalho = filho(pedido, "Cabecalho", Versao="1", nsmap=SEM_NAMESPACE)
+        filho(filho(cabecalho, "CPFCNPJRemetente"), self.remetente_tipo, self.remetente)
+        pedido.append(self.gerar_elemento_xml(assinador))
+        return pedido
+
     @property
     def nome_metodo(self):
         return "EnvioRPS"
@@ -771,6 +1029,20 @@ class RetornoEnvioRpsLote(Retorno):
         )
 
 
+MAXIMO_RPS_LOTE = 50
+MAXIMO_BYTES_LOTE = 500 * 1024
+"""
+Tamanho máximo da mensagem XML aceito pelo webservice.
+"""
+
+TAMANHO_ASSINATURA_RPS = 684
+"""
+Tamanho, em base64, da assinatura de um RPS com uma chave RSA de 4096 bits, a
+maior usada nos certificados ICP-Brasil. É o espaço reservado para cada
+assinatura quando o assinador não é informado a `EnvioLoteRPS.dividir_em_lotes`.
+"""
+
+
 @dataclass
 class EnvioLoteRPS(Pedido, Remessa):
     transacao: bool
@@ -783,6 +1055,17 @@ class EnvioLoteRPS(Pedido, Remessa):
     Define se o lote é um teste ou produção.
     """
 
+    threads_assinatura: int = field(default=1, repr=False, compare=False)
+    """
+    Número de threads usadas para assinar os RPS do lote. O XML gerado é
+    idêntico ao da assinatura sequencial, e a configuração não faz parte do
+    lote: não aparece no `repr` nem nas comparações.
+    """
+
+    # RPS do lote já gerados por `dividir_em_lotes`, com o marcador que ocupa o
+    # lugar da assinatura: (rps, marcador, xml). Não é um campo do dataclass.
+    _xml_rps = None
+
     def __post_init__(self):
         if isinstance(self.data_fim_periodo_transmitido, str):
             self.data_fim_periodo_transmitido = parse(
@@ -798,11 +1081,81 @@ class EnvioLoteRPS(Pedido, Remessa):
             if isinstance(rps, dict):
                 self.lista_rps[idx] = RPS(**rps)
 
+        super().__post_init__()
         assert len(self.lista_rps) > 0, "Deve haver pelo menos um RPS no lote"
         assert len(self.lista_rps) <= 50, "O lote não pode ter mais de 50 RPS"
+        assert self.threads_assinatura >= 1, "Deve haver pelo menos uma thread"
+
+    @classmethod
+    def dividir_em_lotes(
+        cls,
+        lista_rps: Iterable[RPS],
+        remetente: str,
+        transacao: bool,
+        teste: bool = False,
+        maximo_rps: int = MAXIMO_RPS_LOTE,
+        maximo_bytes: int = MAXIMO_BYTES_LOTE,
+        threads_assinatura: int = 1,
+        assinador: Optional[Assinador] = None,
+    ) -> List["EnvioLoteRPS"]:
+        """
+        Divide os RPS, na ordem recebida, em lotes que respeitam o limite de RPS
+        por lote e o tamanho máximo da mensagem. O período transmitido de cada
+        lote vai da menor à maior data de emissão dos seus RPS.
+
+        O XML de cada RPS é gerado uma única vez: o usado para medi-lo é
+        reaproveitado por `gerar_xml`, apenas com a assinatura no lugar do
+        marcador. Por isso, os RPS não devem ser alterados depois da divisão.
+
+        :param assinador: Assinador que assinará os lotes. O tamanho das
+            assinaturas é medido com ele; sem ele, é reservado o espaço de
+            `TAMANHO_ASSINATURA_RPS`.
+        """
+        marcador = None if assinador is not None else "A" * TAMANHO_ASSINATURA_RPS
+
+        def gerar(rps: RPS) -> Tuple[RPS, str, str]:
+            nonlocal marcador
+            if marcador is None:
+                # Com a mesma chave, todas as assinaturas têm o mesmo tamanho.
+                marcador = "A" * len(rps.assinatura(assinador))
+            return rps, marcador, rps.gerar_string_xml(None, marcador)
+
+        lotes = dividir_em_lotes(
+            (gerar(rps) for rps in lista_rps),
+            lambda gerado: len(gerado[2].encode("utf-8")),
+            maximo_rps,
+            maximo_bytes,
+        )
+        envios = []
+        for lote in lotes:
+            lista = [rps for rps, _, _ in lote]
+            envio = cls(
+                remetente=remetente,
+                transacao=transacao,
+                data_inicio_periodo_transmitido=min(rps.data_emissao for rps in lista),
+                data_fim_periodo_transmitido=max(rps.data_emissao for rps in lista),
+                lista_rps=lista,
+                teste=teste,
+                threads_assinatura=threads_assinatura,
+            )
+            envio._xml_rps = lote
+            envios.append(envio)
+        return envios
+
+    def assinaturas(self, assinador: Assinador) -> List[str]:
+        """
+        Calcula a assinatura de cada RPS do lote, na ordem da lista.
+        """
+        if self.threads_assinatura == 1:
+            return [rps.assinatura(assinador) for rps in self.lista_rps]
+
+        with ThreadPoolExecutor(max_workers=self.threads_assinatura) as executor:
+            return list(
+                executor.map(lambda rps: rps.assinatura(assinador), self.lista_rps)
+            )
 
-    def gerar_xml(self, assinador: Assinador) -> Element:
-        xml = self.template.render(
+    def campos_cabecalho(self) -> Dict[str, Any]:
+        return dict(
             remetente=self.remetente,
             remetente_tipo=self.remetente_tipo,
             transacao=str(self.transacao).lower(),
@@ -811,11 +1164,116 @@ class EnvioLoteRPS(Pedido, Remessa):
             qtd_rps=self.quantidade_rps,
             valor_total_servicos=f"{self.valor_total_servicos:.2f}",
             valor_total_deducoes=f"{self.valor_total_deducoes:.2f}",
-            lista_rps=[rps.gerar_string_xml(assinador) for rps in self.lista_rps],
+        )
+
+    def _gerar_strings_xml_rps(self, assinador: Assinador) -> List[str]:
+        """
+        XML de cada RPS do lote, reaproveitando os gerados por `dividir_em_lotes`
+        enquanto a lista de RPS for a mesma.
+        """
+        assinaturas = self.assinaturas(assinador)
+        gerados = self._xml_rps
+        if (
+            gerados is None
+            or len(gerados) != len(self.lista_rps)
+            or any(
+                rps is not gerado
+                for rps, (gerado, _, _) in zip(self.lista_rps, gerados)
+            )
+        ):
+            return [
+                rps.gerar_string_xml(assinador, assinatura)
+                for rps, assinatura in zip(self.lista_rps, assinaturas)
+            ]
+        return [
+            xml.replace(
+                f"<Assinatura>{marcador}</Assinatura>",
+                f"<Assinatura>{assinatura}</Assinatura>",
+                1,
+            )
+            for (_, marcador, xml), assinatura in zip(gerados, assinaturas)
+        ]
+
+    def gerar_xml(self, assinador: Assinador) -> Element:
+        xml = self.template.render(
+            **self.campos_cabecalho(),
+            lista_rps=self._gerar_strings_xml_rps(assinador),
         )
 
         return fromstring(xml)
 
+    def construir_cabecalho(self, pedido: ElementBase) -> ElementBase:
+        campos = self.campos_cabecalho()
+        cabecalho = filho(pedido, "Cabecalho", Versao="1", nsmap=SEM_NAMESPACE)
+        filho(
+            filho(cabecalho, "CPFCNPJRemetente"),
+            campos["remetente_tipo"],
+            campos["remetente"],
+        )
+        filho(cabecalho, "transacao", campos["transacao"])
+        filho(cabecalho, "dtInicio", campos["dt_inicio"])
+        filho(cabecalho, "dtFim", campos["dt_fim"])
+        filho(cabecalho, "QtdRPS", campos["qtd_rps"])
+        filho(cabecalho, "ValorTotalServicos", campos["valor_total_servicos"])
+        filho(cabecalho, "ValorTotalDeducoes", campos["valor_total_deducoes"])
+        return cabecalho
+
+    def construir_xml(self, assinador: Assinador) -> Element:
+        pedido = Element(QName(NAMESPACE, "PedidoEnvioLoteRPS"), nsmap=NSMAP)
+        self.construir_cabecalho(pedido)
+        for rps, assinatura in zip(self.lista_rps, self.assinaturas(assinador)):
+            pedido.append(rps.gerar_elemento_xml(assinador, assinatura))
+        return pedido
+
+    def iter_xml(self, assinador: Assinador) -> Iterator[bytes]:
+        """
+        Gera o XML assinado do lote em partes, já na forma canônica (C14N): a
+        abertura do pedido, o cabeçalho, cada RPS, a assinatura do documento e
+        o fechamento. Apenas um RPS fica em memória de cada vez.
+
+        O documento gerado é equivalente ao de
+        `gerar_xml_assinado(assinador, construtor="lxml")`.
+        """
+        pedido = Element(QName(NAMESPACE, "PedidoEnvioLoteRPS"), nsmap=NSMAP)
+        fechamento = b"</PedidoEnvioLoteRPS>"
+        abertura = tostring(pedido, method="c14n")[: -len(fechamento)]
+
+        def recortar() -> bytes:
+            # A forma canônica de um elemento depende dos namespaces dos seus
+            # ancestrais, então ela é recortada da forma canônica do pedido
+            # contendo apenas esse elemento.
+            parte = tostring(pedido, method="c14n")[len(abertura) : -len(fechamento)]
+            for elemento in list(pedido):
+                pedido.remove(elemento)
+            return parte
+
+        digest = sha1(abertura)
+        yield abertura
+
+        self.construir_cabecalho(pedido)
+        parte = recortar()
+        digest.update(parte)
+        yield parte
+
+        for rps, assinatura in zip(self.lista_rps, self.assinaturas(assinador)):
+            pedido.append(rps.gerar_elemento_xml(assinador, assinatura))
+            parte = recortar()
+            digest.update(parte)
+            yield parte
+
+        digest.update(fechamento)
+        assinador.assinatura_xml(pedido, digest.digest())
+        yield recortar()
+        yield fechamento
+
+    def escrever_xml(self, assinador: Assinador, destino: BinaryIO):
+        """
+        Escreve o XML assinado do lote em `destino` (um arquivo aberto em modo
+        binário, por exemplo) à medida que é gerado. Veja `iter_xml`.
+        """
+        for parte in self.iter_xml(assinador):
+            destino.write(parte)
+
     @property
     def quantidade_rps(self):
         return len(self.lista_rps)
@@ -828,13 +1286,228 @@ class EnvioLoteRPS(Pedido, Remessa):
     def valor_total_deducoes(self):
         return sum(rps.valor_deducoes_centavos for rps in self.lista_rps) / 100
 
-    @property
-    def remetente_tipo(self) -> Literal["CPF", "CNPJ"]:
-        return cpf_ou_cnpj(self.remetente)
-
     @property
     def metodo(self) -> str:
         if self.teste:
             return "TesteEnvioLoteRPS"
         else:
             return "EnvioLoteRPS"
+
+
+def _inscricao_cabecalho_txt(line: str) -> int:
+    return int(line[4:12])
+
+
+def _abrir_txt(
+    origem: Union[str, Path, TextIO, BinaryIO], encoding: str
+) -> Iterator[str]:
+    if isinstance(origem, (str, PathLike)):
+        with open(origem, encoding=encoding, newline="") as arquivo:
+            yield from arquivo
+    elif isinstance(origem.read(0), bytes):
+        arquivo = TextIOWrapper(origem, encoding=encoding, newline="")
+        try:
+            yield from arquivo
+        finally:
+            # Não fecha o arquivo de quem chamou.
+            arquivo.detach()
+    else:
+        yield from origem
+
+
+@dataclass
+class ErroLinhaTxt:
+    linha: int
+    """
+    Número da linha no arquivo, a partir de 1.
+    """
+
+    erro: str
+
+
+@dataclass
+class LeituraTxt:
+    lista_rps: List[RPS]
+    erros: List[ErroLinhaTxt]
+
+    def juntar(self, outra: "LeituraTxt"):
+        self.lista_rps.extend(outra.lista_rps)
+        self.erros.extend(outra.erros)
+
+
+_BlocoTxt = Tuple[int, Optional[int], List[str]]
+"""
+Número da primeira linha, inscrição do prestador do último cabeçalho antes do
+bloco e linhas do bloco.
+"""
+
+
+def _dividir_txt(linhas: Iterable[str], linhas_por_bloco: int) -> Iterator[_BlocoTxt]:
+    inscricao_prestador = None
+    bloco: List[str] = []
+    for numero, line in enumerate(linhas, start=1):
+        if not bloco:
+            inicio, inscricao_inicio = numero, inscricao_prestador
+        bloco.append(line)
+        if line.startswith("1"):
+            try:
+                inscricao_prestador = _inscricao_cabecalho_txt(line)
+            except ValueError:
+                pass  # O erro é registrado por _ler_bloco_txt.
+        if len(bloco) == linhas_por_bloco:
+            yield inicio, inscricao_inicio, bloco
+            bloco = []
+    if bloco:
+        yield inicio, inscricao_inicio, bloco
+
+
+def _ler_bloco_txt(bloco: _BlocoTxt) -> LeituraTxt:
+    inicio, inscricao_prestador, linhas = bloco
+    leitura = LeituraTxt(lista_rps=[], erros=[])
+    for numero, line in enumerate(linhas, start=inicio):
+        line = line.rstrip("\r\n")
+        try:
+            if line.startswith("1"):
+                inscricao_prestador = _inscricao_cabecalho_txt(line)
+            elif line.startswith("6") and inscricao_prestador is not None:
+                leitura.lista_rps.append(RPS._ler_linha_txt(line, inscricao_prestador))
+        except Exception as erro:
+            leitura.erros.append(ErroLinhaTxt(linha=numero, erro=repr(erro)))
+    return leitura
+
+
+def _texto_txt(valor: Any, tamanho: int) -> str:
+    return ("" if valor is None else str(valor)).ljust(tamanho)[:tamanho]
+
+
+def _numero_txt(valor: Any, tamanho: int, opcional: bool = False) -> str:
+    if valor is None:
+        return (" " if opcional else "0") * tamanho
+    numero = str(valor).zfill(tamanho)
+    if len(numero) != tamanho:
+        raise ValueError(f"O valor {valor} não cabe em {tamanho} dígitos")
+    return numero
+
+
+class EscritorRPSTxt:
+    """
+    Escreve, um RPS por vez, arquivos no layout de importação de RPS (versão
+    002) lido por `RPS.ler_txt`, sem manter os RPS em memória:
+
+        with EscritorRPSTxt(caminho, inscricao_prestador, inicio, fim) as escritor:
+            for rps in lista_rps:
+                escritor.escrever(rps)
+
+    O rodapé, com a quantidade de RPS e os totais, é escrito em `fechar`, ou ao
+    sair do bloco `with` sem erros.
+    """
+
+    def __init__(
+        self,
+        destino: Union[str, Path, TextIO, BinaryIO],
+        inscricao_prestador: int,
+        data_inicio: date,
+        data_fim: date,
+        encoding: str = "latin-1",
+    ):
+        """
+        :param destino: Caminho do arquivo ou arquivo já aberto, em modo texto
+            ou binário. Arquivos abertos não são fechados.
+        :param encoding: Codificação do arquivo, usada quando `destino` é um
+            caminho ou um arquivo binário. Caracteres sem representação são
+            trocados por "?", mantendo a largura dos campos.
+        """
+        self.inscricao_prestador = int(inscricao_prestador)
+        self.quantidade_rps = 0
+        self.valor_total_servicos_centavos = 0
+        self.valor_total_deducoes_centavos = 0
+
+        if isinstance(destino, (str, PathLike)):
+            self._arquivo = open(
+                destino, "w", encoding=encoding, errors="replace", newline=""
+            )
+            self._liberar = self._arquivo.close
+        elif isinstance(destino, TextIOBase):
+            self._arquivo = destino
+            self._liberar = self._arquivo.flush
+        else:
+            self._arquivo = TextIOWrapper(
+                destino, encoding=encoding, errors="replace", newline=""
+            )
+            # Não fecha o arquivo de quem chamou.
+            self._liberar = self._arquivo.detach
+
+        self._escrever_linha(
+            "1002"
+            + _numero_txt(self.inscricao_prestador, 8)
+            + data_inicio.strftime("%Y%m%d")
+            + data_fim.strftime("%Y%m%d")
+        )
+
+    def __enter__(self) -> "EscritorRPSTxt":
+        return self
+
+    def __exit__(self, tipo, *args):
+        if tipo is None:
+            self.fechar()
+        else:
+            self._liberar()
+
+    def _escrever_linha(self, linha: str):
+        self._arquivo.write(linha + "\r\n")
+
+    def escrever(self, rps: RPS):
+        assert (
+            int(rps.inscricao_prestador) == self.inscricao_prestador
+        ), "Todos os RPS do arquivo devem ter a inscrição do prestador do cabeçalho"
+        self._escrever_linha(rps.linha_txt())
+        self.quantidade_rps += 1
+        self.valor_total_servicos_centavos += rps.valor_servicos_centavos
+        self.valor_total_deducoes_centavos += rps.valor_deducoes_centavos or 0
+
+    def fechar(self):
+        """
+        Escreve o rodapé e fecha o arquivo, se ele foi aberto pelo escritor.
+        """
+        self._escrever_linha(
+            "9"
+            + _numero_txt(self.quantidade_rps, 7)
+            + _numero_txt(self.valor_total_servicos_centavos, 15)
+            + _numero_txt(self.valor_total_deducoes_centavos, 15)
+        )
+        self._liberar()
+
+
+ResultadoRPS = Union[ChaveNFeRPS, Exception, None]
+"""
+Resultado da emissão de um RPS: a chave da NFe gerada, o erro do lote ou
+`None` quando o lote foi aceito sem gerar notas (lotes de teste).
+"""
+
+
+ERROS_LOTE = (Erro, *ERROS_TRANSPORTE)
+"""
+Erros que rejeitam apenas o lote em que ocorreram. Os demais são propagados.
+"""
+
+
+def resultados_por_rps(
+    lote: EnvioLoteRPS, retorno: Union[RetornoEnvioRpsLote, Exception]
+) -> Dict[Tuple[str, int], ResultadoRPS]:
+    """
+    Associa cada RPS do lote, pela série e pelo número, à sua chave de NFe ou
+    ao erro do lote. Erros que não estão em `ERROS_LOTE` são lançados.
+    """
+    if isinstance(retorno, Exception):
+        if not isinstance(retorno, ERROS_LOTE):
+            raise retorno
+        return {(rps.serie_rps, rps.numero_rps): retorno for rps in lote.lista_rps}
+
+    chaves = {
+        (chave.chave_rps_serie_rps, chave.chave_rps_numero_rps): chave
+        for chave in retorno.chaves_nfe_rps
+    }
+    return {
+        (rps.serie_rps, rps.numero_rps): chaves.get((rps.serie_rps, rps.numero_rps))
+        for rps in lote.lista_rps
+    }
@@ -92,4 +92,161 @@ def test_ler_rps_txt_com_cidade_deslocada():
     # Verificar se o Bairro foi lido (pode ter lixo no inicio se o offset for aplicado "demais")
     # Mas é melhor ter cidade e UF certos e bairro levemente sujo (espaços) do que tudo errado.
     print(f"Bairro lido: '{rps.endereco_bairro}'")
-    assert "BAIRRO CURTO" in rps.endereco_bairro
\ No newline at end of file
+    assert "BAIRRO CURTO" in rps.endereco_bairro
+
+def gerar_txt(numeros, razao_social="TOMADOR TESTE LTDA"):
+    header = "1000000001332025120220251203"
+    linhas = [header]
+    for numero in numeros:
+        line = "6" + "RPS  " + "Ak   " + str(numero).zfill(12) + "20251203" + "T" + "000000000080150" + "000000000000000" + "02800" + "0290" + "2" + "2" + "03010739000172" + "00000000" + "000000000000" + razao_social.ljust(75) + "RUA" + "TESTE".ljust(50) + "117".ljust(10) + "".ljust(30)
+        line += "BAIRRO TESTE".ljust(30) + "CIDADE TESTE".ljust(50) + "SP08010260"
+        line += "teste@teste.com".ljust(75) + "0" * 400
+        linhas.append(line)
+    linhas.append("9" + str(len(numeros)).zfill(7) + "0" * 30)
+    return "\r\n".join(linhas) + "\r\n"
+
+
+def test_iter_txt(tmp_path):
+    import io
+
+    raw_txt = gerar_txt([1, 2, 3], razao_social="JOSÉ DA CONCEIÇÃO")
+    caminho = tmp_path / "rps.txt"
+    caminho.write_bytes(raw_txt.encode("latin-1"))
+
+    esperado = RPS.ler_txt(raw_txt)
+    assert [rps.numero_rps for rps in esperado] == [1, 2, 3]
+    assert esperado[0].razao_social_tomador == "JOSÉ DA CONCEIÇÃO"
+
+    assert list(RPS.iter_txt(caminho)) == esperado
+    assert list(RPS.iter_txt(str(caminho))) == esperado
+    assert list(RPS.iter_txt(io.StringIO(raw_txt))) == esperado
+
+    with open(caminho, "rb") as arquivo:
+        assert list(RPS.iter_txt(arquivo)) == esperado
+        assert not arquivo.closed
+
+
+def test_iter_txt_sob_demanda():
+    import io
+
+    linhas = io.StringIO(gerar_txt(range(1, 1001)))
+    rps = RPS.iter_txt(linhas)
+    assert next(rps).numero_rps == 1
+    # Apenas o cabeçalho e o primeiro RPS foram lidos.
+    assert linhas.readline().startswith("6" + "RPS  " + "Ak   " + "000000000002")
+
+
+def test_ler_txt_paralelo(tmp_path):
+    linhas = gerar_txt(range(1, 11)).splitlines()
+    # Data de emissão inválida na linha 5 (RPS 4).
+    linhas[4] = linhas[4][:23] + "20251399" + linhas[4][31:]
+    caminho = tmp_path / "rps.txt"
+    caminho.write_text("\n".join(linhas), encoding="latin-1")
+
+    leitura = RPS.ler_txt_paralelo(caminho, processos=2, linhas_por_bloco=3)
+
+    assert [rps.numero_rps for rps in leitura.lista_rps] == [1, 2, 3, 5, 6, 7, 8, 9, 10]
+    assert leitura.lista_rps == RPS.ler_txt("\n".join(linhas[:4] + linhas[5:]))
+    assert [erro.linha for erro in leitura.erros] == [5]
+
+
+def criar_rps(numero, **kwargs):
+    from datetime import date
+
+    return RPS(
+        **{
+            "inscricao_prestador": 39617106,
+            "numero_rps": numero,
+            "tipo_rps": "RPS",
+            "serie_rps": "BB",
+            "data_emissao": date(2025, 12, numero % 28 + 1),
+            "status_rps": "N",
+            "tributacao_rps": "T",
+            "valor_servicos_centavos": 100_00 * numero,
+            "valor_deducoes_centavos": 1_00,
+            "valor_pis_centavos": 1_01,
+            "valor_cofins_centavos": 1_02,
+            "valor_inss_centavos": 1_03,
+            "valor_ir_centavos": 1_04,
+            "valor_csll_centavos": 1_05,
+            "valor_carga_tributaria_centavos": 10_00,
+            "percentual_carga_tributaria": 0.1234,
+            "fonte_carga_tributaria": "IBPT",
+            "codigo_servico": "02800",
+            "aliquota_servicos": 0.029,
+            "iss_retido": True,
+            "tomador": "999.999.997-27",
+            "inscricao_municipal_tomador": "12345678",
+            "razao_social_tomador": "JOSÉ DA CONCEIÇÃO",
+            "endereco_tipo_logradouro": "RUA",
+            "endereco_logradouro": "PEDRO AMERICO",
+            "endereco_numero": "1",
+            "endereco_complemento": "1 ANDAR",
+            "endereco_bairro": "CENTRO",
+            "endereco_cidade": "SAO PAULO",
+            "endereco_uf": "SP",
+            "endereco_cep": "01045-000",
+            "email_tomador": "teste@teste.com",
+            "municipio_prestacao": 3550308,
+            "valor_total_recebido_centavos": 150_00,
+            "discriminacao": "Desenvolvimento de software",
+            **kwargs,
+        }
+    )
+
+
+def test_escrever_txt(tmp_path):
+    lista_rps = [
+        criar_rps(1),
+        criar_rps(2, tomador="99.999.999/9999-62", status_rps="C"),
+        criar_rps(3, tomador=None, inscricao_municipal_tomador=None, iss_retido=False),
+    ]
+    caminho = tmp_path / "rps.txt"
+    RPS.escrever_txt(lista_rps, caminho)
+
+    linhas = caminho.read_bytes().decode("latin-1").split("\r\n")
+    assert linhas[0] == "1002396171062025120220251204"
+    assert linhas[-2] == "9" + "3".zfill(7) + "600".zfill(13) + "00" + "300".zfill(15)
+    assert linhas[-1] == ""
+    assert all(linha[355:365] == "SP01045000" for linha in linhas[1:4])
+
+    assert RPS.ler_txt(caminho.read_text(encoding="latin-1")) == lista_rps
+
+
+def test_escrever_txt_discriminacao_com_varias_linhas(tmp_path):
+    lista_rps = [
+        criar_rps(1, discriminacao="Desenvolvimento de software\nHoras: 10\nValor/hora: 10,00")
+    ]
+    caminho = tmp_path / "rps.txt"
+    RPS.escrever_txt(lista_rps, caminho)
+
+    linha = caminho.read_text(encoding="latin-1").splitlines()[1]
+    assert linha.endswith("Desenvolvimento de software|Horas: 10|Valor/hora: 10,00")
+    assert RPS.ler_txt(caminho.read_text(encoding="latin-1")) == lista_rps
+
+
+def test_linha_txt_aliquota_fora_do_layout():
+    with pytest.raises(ValueError, match="99,99%"):
+        criar_rps(1, aliquota_servicos=1.0).linha_txt()
+    assert criar_rps(1, aliquota_servicos=0.9999).linha_txt()[67:71] == "9999"
+
+
+def test_escritor_rps_txt():
+    import io
+    from datetime import date
+    from .envio_rps import EscritorRPSTxt
+
+    destino = io.BytesIO()
+    with EscritorRPSTxt(destino, 39617106, date(2025, 12, 1), date(2025, 12, 31)) as escritor:
+        for numero in range(1, 101):
+            escritor.escrever(
+                criar_rps(numero, discriminacao="Linha 1\nLinha 2", valor_deducoes_centavos=0)
+            )
+    assert not destino.closed
+    assert escritor.quantidade_rps == 100
+    assert escritor.valor_total_servicos_centavos == 100_00 * 5050
+
+    destino.seek(0)
+    lidos = list(RPS.iter_txt(destino))
+    assert [rps.numero_rps for rps in lidos] == list(range(1, 101))
+    assert lidos[0].discriminacao == "Linha 1\nLinha 2"
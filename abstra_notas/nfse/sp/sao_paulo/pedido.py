@@ -1,8 +1,13 @@
 from abc import ABC, abstractmethod
 from abstra_notas.assinatura import Assinador
+from abstra_notas.nfse.construtor import Construtor
+from abstra_notas.nfse.schemas import validar_xml
 from lxml.etree import ElementBase
 from .templates import load_template
 from jinja2 import Template
+from pathlib import Path
+
+XSDS = Path(__file__).parent / "xsds"
 
 
 class Pedido(ABC):
@@ -10,6 +15,31 @@ class Pedido(ABC):
     def gerar_xml(self, assinador: Assinador) -> ElementBase:
         raise NotImplementedError
 
+    def construir_xml(self, assinador: Assinador) -> ElementBase:
+        """
+        Monta o XML do pedido diretamente com o lxml. Pedidos sem construtor
+        próprio usam o template.
+        """
+        return self.gerar_xml(assinador)
+
+    def gerar_xml_assinado(
+        self,
+        assinador: Assinador,
+        construtor: Construtor = "template",
+        validar: bool = False,
+    ) -> ElementBase:
+        """
+        :param validar: Valida o XML assinado com o schema do pedido em `xsds/`,
+            lançando `lxml.etree.DocumentInvalid` se ele for inválido.
+        """
+        if construtor == "lxml":
+            xml = assinador.assinar_xml(self.construir_xml(assinador), copiar=False)
+        else:
+            xml = assinador.assinar_xml(self.gerar_xml(assinador))
+        if validar:
+            validar_xml(XSDS, xml)
+        return xml
+
     @property
     def template(self) -> Template:
         return load_template(self.__class__.__name__)
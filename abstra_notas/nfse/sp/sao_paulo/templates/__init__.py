@@ -1,9 +1,9 @@
 from pathlib import Path
 from jinja2 import Template
+from abstra_notas.nfse.templates import carregar_template
 
 current_path = Path(__file__).parent
 
 
-def load_template(class_name):
-    with open(current_path / f"{class_name}.xml", "r", encoding="utf-8") as file:
-        return Template(file.read())
+def load_template(class_name) -> Template:
+    return carregar_template(current_path, class_name)
@@ -0,0 +1,53 @@
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader, Template
+from pathlib import Path
+from threading import Lock
+from typing import Dict, Optional, Union
+
+_ambientes: Dict[Path, Environment] = {}
+_cache_bytecode: Optional[FileSystemBytecodeCache] = None
+_lock = Lock()
+
+
+def _ambiente(diretorio: Path) -> Environment:
+    ambiente = _ambientes.get(diretorio)
+    if ambiente is not None:
+        return ambiente
+
+    with _lock:
+        ambiente = _ambientes.get(diretorio)
+        if ambiente is None:
+            # As opções padrão do Environment são as mesmas de `Template(...)`,
+            # então o XML gerado não muda.
+            ambiente = Environment(
+                loader=FileSystemLoader(str(diretorio)),
+                auto_reload=False,
+                cache_size=-1,
+                bytecode_cache=_cache_bytecode,
+            )
+            _ambientes[diretorio] = ambiente
+        return ambiente
+
+
+def carregar_template(diretorio: Path, nome: str) -> Template:
+    """
+    Retorna o template `diretorio/{nome}.xml`, compilado uma única vez por
+    processo e compartilhado por todas as chamadas.
+    """
+    return _ambiente(Path(diretorio)).get_template(f"{nome}.xml")
+
+
+def usar_cache_de_bytecode(diretorio: Optional[Union[str, Path]] = None):
+    """
+    Guarda os templates compilados em disco, para que novos processos (por
+    exemplo, workers) não precisem compilá-los novamente.
+
+    :param diretorio: Diretório do cache. Por padrão, o diretório temporário
+        do sistema.
+    """
+    global _cache_bytecode
+    with _lock:
+        _cache_bytecode = FileSystemBytecodeCache(
+            str(diretorio) if diretorio is not None else None
+        )
+        for ambiente in _ambientes.values():
+            ambiente.bytecode_cache = _cache_bytecode
@@ -0,0 +1,45 @@
+from unittest import TestCase
+from unittest.mock import patch
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from jinja2 import Template
+from . import templates
+
+
+class TemplatesTest(TestCase):
+    def setUp(self):
+        self.diretorio = TemporaryDirectory()
+        self.addCleanup(self.diretorio.cleanup)
+        self.caminho = Path(self.diretorio.name)
+        (self.caminho / "Pedido.xml").write_text(
+            "<Pedido>\n{% if valor %}<Valor>{{ valor }}</Valor>{% endif %}\n</Pedido>\n",
+            encoding="utf-8",
+        )
+        for nome, valor in (("_ambientes", {}), ("_cache_bytecode", None)):
+            patcher = patch.object(templates, nome, valor)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_render_igual_a_template(self):
+        fonte = (self.caminho / "Pedido.xml").read_text(encoding="utf-8")
+        for valor in (None, "<1&2>"):
+            self.assertEqual(
+                templates.carregar_template(self.caminho, "Pedido").render(valor=valor),
+                Template(fonte).render(valor=valor),
+            )
+
+    def test_compilado_uma_vez(self):
+        primeiro = templates.carregar_template(self.caminho, "Pedido")
+        (self.caminho / "Pedido.xml").write_text("<Outro/>", encoding="utf-8")
+        self.assertIs(templates.carregar_template(self.caminho, "Pedido"), primeiro)
+
+    def test_cache_de_bytecode(self):
+        cache = self.caminho / "cache"
+        cache.mkdir()
+        templates.carregar_template(self.caminho, "Pedido")
+        templates.usar_cache_de_bytecode(cache)
+        self.assertEqual(list(cache.iterdir()), [])
+
+        templates._ambientes.clear()
+        templates.carregar_template(self.caminho, "Pedido")
+        self.assertEqual(len(list(cache.iterdir())), 1)
@@ -0,0 +1,301 @@
+from abstra_notas.assinatura import Assinador
+from abstra_notas.nfse.wsdl import obter_cache_wsdl
+from requests import RequestException
+from requests.adapters import HTTPAdapter
+from zeep import AsyncClient, Settings
+from zeep.exceptions import Error as ZeepError
+from zeep.plugins import HistoryPlugin
+from zeep.transports import AsyncTransport
+from zeep.wsdl import Document
+from datetime import datetime
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from threading import Lock
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple, Type, Union
+from weakref import WeakKeyDictionary
+import asyncio
+import ssl
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+ERROS_TRANSPORTE: Tuple[Type[Exception], ...] = (ZeepError, RequestException) + (
+    (httpx.HTTPError,) if httpx is not None else ()
+)
+"""
+Erros da comunicação com o webservice: falhas de SOAP e de HTTP.
+"""
+
+Depuracao = Callable[[str, str, str], None]
+"""
+Função chamada a cada operação com `(operacao, requisicao, resposta)`, onde
+requisição e resposta são os XMLs trocados com o webservice.
+"""
+
+_contextos: "WeakKeyDictionary[Assinador, Dict[Tuple, ssl.SSLContext]]" = (
+    WeakKeyDictionary()
+)
+_contextos_sem_certificado: Dict[Tuple, ssl.SSLContext] = {}
+_lock = Lock()
+
+
+def _criar_contexto_ssl(
+    assinador: Optional[Assinador], verificar: bool, cifras: Optional[str]
+) -> ssl.SSLContext:
+    contexto = ssl.create_default_context()
+    contexto.minimum_version = ssl.TLSVersion.TLSv1_2
+    contexto.options |= getattr(ssl, "OP_NO_COMPRESSION", 0)
+    if cifras is not None:
+        contexto.set_ciphers(cifras)
+    if not verificar:
+        contexto.check_hostname = False
+        contexto.verify_mode = ssl.CERT_NONE
+    if assinador is None:
+        return contexto
+
+    # O módulo ssl só carrega certificados a partir de arquivos. Eles existem
+    # apenas durante o carregamento, em um diretório acessível só ao usuário.
+    with TemporaryDirectory() as diretorio:
+        certfile = Path(diretorio) / "cert.pem"
+        certfile.write_bytes(assinador.cert_pem_bytes)
+        keyfile = Path(diretorio) / "key.pem"
+        keyfile.touch(mode=0o600)
+        keyfile.write_bytes(assinador.private_key_pem_bytes)
+        contexto.load_cert_chain(certfile, keyfile)
+    return contexto
+
+
+def contexto_ssl(
+    assinador: Optional[Assinador], verificar: bool = True, cifras: Optional[str] = None
+) -> ssl.SSLContext:
+    """
+    Retorna o `SSLContext` com o certificado cliente do assinador, ou sem
+    certificado cliente se `assinador` for `None`.
+
+    O contexto é criado uma única vez por assinador e configuração, e
+    reaproveitado enquanto o assinador existir.
+
+    :param verificar: Se o certificado do servidor deve ser verificado.
+    :param cifras: Lista de cifras no formato do OpenSSL.
+    """
+    chave = (verificar, cifras)
+    with _lock:
+        if assinador is None:
+            contextos = _contextos_sem_certificado
+        else:
+            contextos = _contextos.setdefault(assinador, {})
+        if chave not in contextos:
+            contextos[chave] = _criar_contexto_ssl(assinador, verificar, cifras)
+        return contextos[chave]
+
+
+class AdaptadorSSL(HTTPAdapter):
+    """
+    Adaptador HTTP que usa um `SSLContext` já carregado em todas as conexões
+    do pool, inclusive as feitas através de proxy.
+
+    A verificação do certificado do servidor é definida pelo contexto, e não
+    pelo `verify` da sessão, que o requests pode substituir por variáveis de
+    ambiente como `REQUESTS_CA_BUNDLE`.
+    """
+
+    def __init__(self, contexto: ssl.SSLContext, **kwargs):
+        self.contexto = contexto
+        super().__init__(**kwargs)
+
+    def send(self, request, verify=True, **kwargs):
+        if self.contexto.verify_mode == ssl.CERT_NONE:
+            verify = False
+        elif verify is False:
+            verify = True
+        return super().send(request, verify=verify, **kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        kwargs["ssl_context"] = self.contexto
+        return super().init_poolmanager(*args, **kwargs)
+
+    def proxy_manager_for(self, *args, **kwargs):
+        kwargs["ssl_context"] = self.contexto
+        return super().proxy_manager_for(*args, **kwargs)
+
+
+def criar_transporte_async(
+    contexto: ssl.SSLContext, conexoes: int = 10, timeout: float = 300
+) -> AsyncTransport:
+    """
+    Cria o transporte assíncrono do zeep, baseado em httpx, usando o
+    `SSLContext` informado tanto nas chamadas quanto no download do WSDL.
+
+    Requer o httpx, instalado com `pip install abstra_notas[async]`.
+
+    :param conexoes: Número máximo de conexões abertas ao mesmo tempo.
+    """
+    if httpx is None:
+        raise ImportError(
+            "O cliente assíncrono depende do httpx. "
+            "Instale com `pip install abstra_notas[async]`."
+        )
+    return AsyncTransport(
+        client=httpx.AsyncClient(
+            verify=contexto,
+            timeout=timeout,
+            limits=httpx.Limits(
+                max_connections=conexoes, max_keepalive_connections=conexoes
+            ),
+        ),
+        wsdl_client=httpx.Client(verify=contexto, timeout=timeout),
+        cache=obter_cache_wsdl(),
+    )
+
+
+async def fechar_transporte_async(transporte: AsyncTransport):
+    transporte.wsdl_client.close()
+    await transporte.aclose()
+
+
+CarregadorWsdl = Callable[[AsyncTransport, Settings], Document]
+"""
+Função que carrega o WSDL do webservice com o transporte e as configurações
+do cliente SOAP.
+"""
+
+
+class AsyncClienteBase:
+    """
+    Base dos clientes assíncronos dos municípios. O transporte, as conexões e o
+    cliente SOAP são criados na primeira chamada e compartilhados pelas
+    seguintes, com no máximo `concorrencia` chamadas em andamento.
+
+    Operações de outros serviços do mesmo município (veja `_chamar_operacao`)
+    usam o mesmo transporte e o mesmo limite de chamadas, com um cliente SOAP
+    por WSDL.
+
+    O zeep baixa o WSDL com um cliente HTTP síncrono, então os clientes SOAP são
+    criados em uma thread, sem bloquear o loop. Em Python 3.8 e 3.9, crie o
+    cliente dentro do loop em que ele será usado.
+    """
+
+    _transport: Optional[AsyncTransport] = None
+
+    def __init__(
+        self,
+        carregar_wsdl: CarregadorWsdl,
+        contexto: ssl.SSLContext,
+        concorrencia: int = 10,
+        depuracao: Optional[Depuracao] = None,
+        timeout: float = 300,
+    ):
+        """
+        :param carregar_wsdl: Função que carrega o WSDL do webservice.
+        :param contexto: `SSLContext` usado nas chamadas e no download do WSDL.
+            Veja `contexto_ssl`.
+        :param concorrencia: Número máximo de chamadas simultâneas ao webservice.
+            É também o tamanho do pool de conexões.
+        :param depuracao: Função chamada com a operação, a requisição e a resposta
+            de cada chamada. Veja `depuracao_em_diretorio`.
+        """
+        self._carregar_wsdl = carregar_wsdl
+        self._contexto = contexto
+        self.concorrencia = concorrencia
+        self.depuracao = depuracao
+        self.timeout = timeout
+        self.history = HistoryPlugin()
+        self._clients: Dict[CarregadorWsdl, AsyncClient] = {}
+        self._semaforo = asyncio.Semaphore(concorrencia)
+        self._lock = asyncio.Lock()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        await self.aclose()
+
+    async def _obter_client(
+        self, carregar_wsdl: Optional[CarregadorWsdl] = None
+    ) -> AsyncClient:
+        carregar_wsdl = carregar_wsdl or self._carregar_wsdl
+        client = self._clients.get(carregar_wsdl)
+        if client is None:
+            async with self._lock:
+                client = self._clients.get(carregar_wsdl)
+                if client is None:
+                    client = await asyncio.get_running_loop().run_in_executor(
+                        None, self._criar_client, carregar_wsdl
+                    )
+                    self._clients[carregar_wsdl] = client
+        return client
+
+    def _criar_client(self, carregar_wsdl: CarregadorWsdl) -> AsyncClient:
+        if self._transport is None:
+            self._transport = criar_transporte_async(
+                self._contexto, conexoes=self.concorrencia, timeout=self.timeout
+            )
+        settings = Settings(strict=True, xml_huge_tree=True)
+        try:
+            wsdl = carregar_wsdl(self._transport, settings)
+        except BaseException:
+            if not self._clients:
+                self._transport.wsdl_client.close()
+                self._transport = None
+            raise
+        return AsyncClient(
+            wsdl, transport=self._transport, settings=settings, plugins=[self.history]
+        )
+
+    async def aclose(self):
+        """
+        Encerra as conexões abertas. O cliente será recriado na próxima chamada.
+        """
+        transport = self._transport
+        self._clients.clear()
+        self._transport = None
+        if transport is not None:
+            await fechar_transporte_async(transport)
+
+    async def _chamar_operacao(
+        self,
+        operacao: str,
+        preparar: Callable[[], str],
+        argumentos: Callable[[str], Sequence[Any]],
+        carregar_wsdl: Optional[CarregadorWsdl] = None,
+    ) -> str:
+        """
+        Gera a requisição com `preparar`, em uma thread, já que a geração e a
+        assinatura do XML usam CPU, e chama a operação com `argumentos(requisicao)`.
+        Retorna a resposta sem processá-la.
+
+        :param carregar_wsdl: WSDL do serviço que expõe a operação, se não for o
+            do cliente.
+        """
+        client = await self._obter_client(carregar_wsdl)
+        async with self._semaforo:
+            requisicao = await asyncio.get_running_loop().run_in_executor(
+                None, preparar
+            )
+            response: str = await getattr(client.service, operacao)(
+                *argumentos(requisicao)
+            )
+
+        if self.depuracao is not None:
+            self.depuracao(operacao, requisicao, response)
+        return response
+
+
+def depuracao_em_diretorio(diretorio: Union[str, Path]) -> Depuracao:
+    """
+    Cria uma função de depuração que salva cada requisição e resposta em
+    arquivos XML dentro de `diretorio`.
+    """
+    diretorio = Path(diretorio)
+
+    def salvar(operacao: str, requisicao: str, resposta: str):
+        diretorio.mkdir(parents=True, exist_ok=True)
+        prefixo = f"{datetime.now():%Y%m%d%H%M%S%f}-{operacao}"
+        (diretorio / f"{prefixo}-requisicao.xml").write_text(
+            requisicao, encoding="utf-8"
+        )
+        (diretorio / f"{prefixo}-resposta.xml").write_text(resposta, encoding="utf-8")
+
+    return salvar
@@ -0,0 +1,61 @@
+from unittest import TestCase
+from unittest.mock import patch
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from abstra_notas.assinatura import Assinador, gerar_pfx_autoassinado
+from .transporte import AdaptadorSSL, contexto_ssl, depuracao_em_diretorio
+import ssl
+
+
+class TransporteTest(TestCase):
+    def setUp(self):
+        self.diretorio = TemporaryDirectory()
+        self.raiz = Path(self.diretorio.name)
+        caminho_pfx = gerar_pfx_autoassinado(self.raiz / "certificado.pfx", "senha")
+        self.assinador = Assinador(caminho_pfx, "senha")
+
+    def tearDown(self):
+        self.diretorio.cleanup()
+
+    def test_contexto_ssl_criado_uma_vez(self):
+        contexto = contexto_ssl(self.assinador)
+        self.assertIs(contexto_ssl(self.assinador), contexto)
+        self.assertEqual(contexto.verify_mode, ssl.CERT_REQUIRED)
+
+        sem_verificacao = contexto_ssl(self.assinador, verificar=False)
+        self.assertIsNot(sem_verificacao, contexto)
+        self.assertEqual(sem_verificacao.verify_mode, ssl.CERT_NONE)
+
+    def test_contexto_ssl_sem_certificado(self):
+        contexto = contexto_ssl(None, verificar=False, cifras="HIGH:!DH:!aNULL")
+        self.assertIs(
+            contexto_ssl(None, verificar=False, cifras="HIGH:!DH:!aNULL"), contexto
+        )
+        self.assertIsNot(contexto_ssl(self.assinador, verificar=False), contexto)
+        self.assertEqual(contexto.verify_mode, ssl.CERT_NONE)
+
+    def test_adaptador_usa_contexto(self):
+        contexto = contexto_ssl(self.assinador)
+        adaptador = AdaptadorSSL(contexto)
+        self.assertIs(adaptador.poolmanager.connection_pool_kw["ssl_context"], contexto)
+        proxy = adaptador.proxy_manager_for("http://proxy:3128")
+        self.assertIs(proxy.connection_pool_kw["ssl_context"], contexto)
+
+    def test_adaptador_verificacao_definida_pelo_contexto(self):
+        with patch("requests.adapters.HTTPAdapter.send") as send:
+            AdaptadorSSL(contexto_ssl(self.assinador, verificar=False)).send(
+                None, verify="/etc/ssl/certs/ca-certificates.crt"
+            )
+            self.assertIs(send.call_args.kwargs["verify"], False)
+
+            AdaptadorSSL(contexto_ssl(self.assinador)).send(None, verify=False)
+            self.assertIs(send.call_args.kwargs["verify"], True)
+
+    def test_depuracao_em_diretorio(self):
+        destino = self.raiz / "depuracao"
+        depuracao_em_diretorio(destino)("ConsultaCNPJ", "<pedido/>", "<retorno/>")
+
+        [requisicao] = destino.glob("*-ConsultaCNPJ-requisicao.xml")
+        [resposta] = destino.glob("*-ConsultaCNPJ-resposta.xml")
+        self.assertEqual(requisicao.read_text(encoding="utf-8"), "<pedido/>")
+        self.assertEqual(resposta.read_text(encoding="utf-8"), "<retorno/>")
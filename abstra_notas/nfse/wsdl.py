@@ -0,0 +1,104 @@
+from zeep import Settings, Transport
+from zeep.cache import Base, InMemoryCache, SqliteCache
+from zeep.wsdl import Document
+from pathlib import Path
+from threading import Lock
+from typing import Dict, Optional, Union
+import sqlite3
+
+VALIDADE_PADRAO = 24 * 60 * 60
+"""
+Tempo, em segundos, que um WSDL baixado permanece válido no cache.
+"""
+
+_cache: Optional[Base] = None
+_cache_configurado = False
+_documentos: Dict[str, Document] = {}
+_lock = Lock()
+
+
+def configurar_cache_wsdl(cache: Optional[Base]) -> None:
+    """
+    Define o cache usado para os WSDLs e XSDs baixados dos webservices.
+
+    Qualquer cache do zeep é aceito (`zeep.cache.InMemoryCache`,
+    `zeep.cache.SqliteCache` ou uma implementação própria de `zeep.cache.Base`).
+    Use `None` para desativar o cache. Veja `obter_cache_wsdl` para o padrão.
+    """
+    global _cache, _cache_configurado
+    with _lock:
+        _cache = cache
+        _cache_configurado = True
+        _documentos.clear()
+
+
+def usar_cache_wsdl_em_disco(
+    caminho: Optional[Union[str, Path]] = None,
+    validade: int = VALIDADE_PADRAO,
+) -> SqliteCache:
+    """
+    Passa a guardar os WSDLs em um arquivo SQLite, compartilhado entre processos.
+
+    :param caminho: Arquivo do cache. Por padrão, o diretório de cache do usuário.
+    :param validade: Tempo, em segundos, até um WSDL ser baixado novamente.
+    """
+    cache = SqliteCache(
+        path=str(caminho) if caminho is not None else None, timeout=validade
+    )
+    configurar_cache_wsdl(cache)
+    return cache
+
+
+def obter_cache_wsdl() -> Optional[Base]:
+    """
+    Retorna o cache configurado em `configurar_cache_wsdl`. Por padrão, os WSDLs
+    sem arquivo empacotado são guardados em disco (`zeep.cache.SqliteCache`, no
+    diretório de cache do usuário), para que apenas o primeiro processo da
+    máquina os baixe. Se o diretório não puder ser usado, o cache fica em memória.
+    """
+    global _cache, _cache_configurado
+    if not _cache_configurado:
+        with _lock:
+            if not _cache_configurado:
+                _cache = _criar_cache_padrao()
+                _cache_configurado = True
+    return _cache
+
+
+def _criar_cache_padrao() -> Base:
+    try:
+        return SqliteCache(timeout=VALIDADE_PADRAO)
+    except (OSError, RuntimeError, sqlite3.Error):
+        return InMemoryCache(timeout=VALIDADE_PADRAO)
+
+
+def localizar_wsdl(diretorio: Path, nome: str, url: str) -> str:
+    """
+    Retorna o WSDL empacotado em `diretorio/wsdl/{nome}.wsdl` ou, caso ele não
+    exista, a URL remota do serviço.
+
+    Os arquivos empacotados são gerados por `abstra_notas/scripts/atualizar_wsdls.py`.
+    """
+    caminho = Path(diretorio) / "wsdl" / f"{nome}.wsdl"
+    if caminho.exists():
+        return str(caminho)
+    return url
+
+
+def carregar_wsdl(wsdl: str, transport: Transport, settings: Settings) -> Document:
+    """
+    Carrega e interpreta o WSDL uma única vez por processo.
+
+    O documento interpretado é compartilhado por todos os clientes que usam o
+    mesmo WSDL. O download passa pelo cache configurado em `configurar_cache_wsdl`.
+    """
+    documento = _documentos.get(wsdl)
+    if documento is not None:
+        return documento
+
+    with _lock:
+        documento = _documentos.get(wsdl)
+        if documento is None:
+            documento = Document(wsdl, transport, settings=settings)
+            _documentos[wsdl] = documento
+        return documento
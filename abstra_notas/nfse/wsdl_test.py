@@ -0,0 +1,92 @@
+from unittest import TestCase
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from zeep import Settings, Transport
+from zeep.cache import InMemoryCache, SqliteCache
+from unittest.mock import patch
+from . import wsdl
+
+WSDL = """<?xml version="1.0" encoding="utf-8"?>
+<definitions xmlns="http://schemas.xmlsoap.org/wsdl/"
+    xmlns:soap="http://schemas.xmlsoap.org/wsdl/soap/"
+    xmlns:tns="http://exemplo.com/servico"
+    targetNamespace="http://exemplo.com/servico">
+    <message name="Vazio"/>
+    <portType name="ServicoPortType">
+        <operation name="Ping">
+            <input message="tns:Vazio"/>
+            <output message="tns:Vazio"/>
+        </operation>
+    </portType>
+    <binding name="ServicoBinding" type="tns:ServicoPortType">
+        <soap:binding transport="http://schemas.xmlsoap.org/soap/http"/>
+        <operation name="Ping">
+            <soap:operation soapAction="Ping"/>
+            <input><soap:body use="literal"/></input>
+            <output><soap:body use="literal"/></output>
+        </operation>
+    </binding>
+    <service name="Servico">
+        <port name="ServicoPort" binding="tns:ServicoBinding">
+            <soap:address location="http://exemplo.com/servico"/>
+        </port>
+    </service>
+</definitions>
+"""
+
+
+class WsdlTest(TestCase):
+    def setUp(self):
+        self.diretorio = TemporaryDirectory()
+        self.addCleanup(self.diretorio.cleanup)
+        self.raiz = Path(self.diretorio.name)
+        for atributo in ("_cache", "_cache_configurado", "_documentos"):
+            patcher = patch.object(wsdl, atributo, getattr(wsdl, atributo))
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        wsdl._cache_configurado = False
+        wsdl._documentos = {}
+
+    def test_cache_padrao_em_disco(self):
+        caminho = self.raiz / "cache.db"
+        with patch("zeep.cache._get_default_cache_path", return_value=str(caminho)):
+            cache = wsdl.obter_cache_wsdl()
+        self.assertIsInstance(cache, SqliteCache)
+        self.assertTrue(caminho.exists())
+        self.assertIs(wsdl.obter_cache_wsdl(), cache)
+
+    def test_cache_padrao_sem_disco_fica_em_memoria(self):
+        with patch(
+            "zeep.cache._get_default_cache_path", side_effect=PermissionError
+        ):
+            self.assertIsInstance(wsdl.obter_cache_wsdl(), InMemoryCache)
+
+    def test_configurar_cache_substitui_o_padrao(self):
+        wsdl.configurar_cache_wsdl(None)
+        self.assertIsNone(wsdl.obter_cache_wsdl())
+
+    def test_localizar_wsdl_sem_arquivo_usa_url(self):
+        url = "https://exemplo.com/servico?wsdl"
+        self.assertEqual(wsdl.localizar_wsdl(self.raiz, "servico", url), url)
+
+    def test_localizar_wsdl_empacotado(self):
+        caminho = self.raiz / "wsdl" / "servico.wsdl"
+        caminho.parent.mkdir()
+        caminho.write_text(WSDL, encoding="utf-8")
+        self.assertEqual(
+            wsdl.localizar_wsdl(self.raiz, "servico", "https://exemplo.com"),
+            str(caminho),
+        )
+
+    def test_carregar_wsdl_uma_vez_por_processo(self):
+        caminho = self.raiz / "servico.wsdl"
+        caminho.write_text(WSDL, encoding="utf-8")
+        settings = Settings(strict=True, xml_huge_tree=True)
+
+        primeiro = wsdl.carregar_wsdl(str(caminho), Transport(), settings)
+        segundo = wsdl.carregar_wsdl(str(caminho), Transport(), settings)
+        self.assertIs(primeiro, segundo)
+
+        wsdl.configurar_cache_wsdl(None)
+        terceiro = wsdl.carregar_wsdl(str(caminho), Transport(), settings)
+        self.assertIsNot(primeiro, terceiro)
@@ -1,5 +1,8 @@
 from requests import get
 from datetime import date
+from json import dumps
+from pathlib import Path
+from abstra_notas.validacoes.cidades.tabela import TabelaMunicipios
 
 header = "\n".join(
     [
@@ -14,3 +17,9 @@ header = "\n".join(
 
 url = "https://servicodados.ibge.gov.br/api/v1/localidades/municipios"
 data = get(url).json()
+
+destino = Path(__file__).parent.parent / "validacoes" / "cidades"
+(destino / "municipios.json").write_text(
+    dumps(data, ensure_ascii=False), encoding="utf-8"
+)
+TabelaMunicipios.de_ibge(data).escrever(destino / "municipios.bin")
@@ -0,0 +1,68 @@
+from argparse import ArgumentParser
+from requests import get
+from pathlib import Path
+from urllib.parse import urlparse
+
+"""
+Script para atualizar os WSDLs empacotados dos webservices municipais.
+Path: abstra_notas/scripts/atualizar_wsdls.py
+
+Os clientes usam o arquivo `wsdl/{nome}.wsdl` de cada município quando ele
+existe, evitando baixar a descrição do serviço a cada início de processo.
+
+Os endereços dos serviços definem para onde as requisições assinadas são
+enviadas, então os certificados TLS são sempre verificados. Como os clientes
+de Fortaleza e do Rio de Janeiro, `--sem-verificar-tls` desliga a verificação,
+apenas para os hosts dessas prefeituras.
+"""
+
+nfse = Path(__file__).parent.parent / "nfse"
+
+wsdls = {
+    nfse / "sp" / "sao_paulo" / "wsdl" / "lotenfe.wsdl": (
+        "https://nfe.prefeitura.sp.gov.br/ws/lotenfe.asmx?WSDL"
+    ),
+    nfse / "ce" / "fortaleza" / "wsdl" / "producao.wsdl": (
+        "https://iss.fortaleza.ce.gov.br/grpfor-iss/ServiceGinfesImplService?wsdl"
+    ),
+    nfse / "ce" / "fortaleza" / "wsdl" / "homologacao.wsdl": (
+        "http://isshomo.sefin.fortaleza.ce.gov.br/grpfor-iss/ServiceGinfesImplService?wsdl"
+    ),
+    nfse / "ce" / "fortaleza" / "wsdl" / "paginacao_producao.wsdl": (
+        "https://iss.fortaleza.ce.gov.br/grpfor-iss/ServiceConsultarNfseImplService?wsdl"
+    ),
+    nfse / "ce" / "fortaleza" / "wsdl" / "paginacao_homologacao.wsdl": (
+        "http://isshomo.sefin.fortaleza.ce.gov.br/grpfor-iss/ServiceConsultarNfseImplService?wsdl"
+    ),
+    nfse / "rj" / "rio_de_janeiro" / "wsdl" / "producao.wsdl": (
+        "https://notacarioca.rio.gov.br/WSNacional/nfse.asmx?wsdl"
+    ),
+    nfse / "rj" / "rio_de_janeiro" / "wsdl" / "homologacao.wsdl": (
+        "https://notacariocahom.rio.gov.br/WSNacional/nfse.asmx?wsdl"
+    ),
+}
+
+hosts_sem_verificacao = {
+    "iss.fortaleza.ce.gov.br",
+    "isshomo.sefin.fortaleza.ce.gov.br",
+    "notacarioca.rio.gov.br",
+    "notacariocahom.rio.gov.br",
+}
+
+parser = ArgumentParser(description="Atualiza os WSDLs empacotados.")
+parser.add_argument(
+    "--sem-verificar-tls",
+    action="store_true",
+    help="Não verifica os certificados TLS de Fortaleza e do Rio de Janeiro.",
+)
+argumentos = parser.parse_args()
+
+for caminho, url in wsdls.items():
+    verificar = not (
+        argumentos.sem_verificar_tls and urlparse(url).hostname in hosts_sem_verificacao
+    )
+    resposta = get(url, timeout=60, verify=verificar)
+    resposta.raise_for_status()
+    caminho.parent.mkdir(parents=True, exist_ok=True)
+    caminho.write_bytes(resposta.content)
+    print(f"{url} -> {caminho}")
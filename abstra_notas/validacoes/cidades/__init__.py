@@ -1,7 +1,16 @@
 from json import loads
 from pathlib import Path
 from enum import Enum
+from typing import Dict, Optional, Tuple, Union
+from .tabela import Municipio, TabelaMunicipios
+import re
+import unicodedata
 
+CAMINHO_TABELA = Path(__file__).parent / "municipios.bin"
+"""
+Tabela compacta gerada por `abstra_notas/scripts/atualizar_municipios.py`. Sem
+ela, os municípios são lidos de `municipios.json`.
+"""
 
 _cidades = None
 
@@ -16,17 +25,80 @@ def ler_cidades():
     return _cidades
 
 
-def validar_codigo_cidade(codigo: int) -> bool:
-    cidades = ler_cidades()
-    return any(cidade["id"] == codigo for cidade in cidades)
+def normalizar_nome_municipio(nome: str) -> str:
+    """
+    Forma usada na busca por nome: sem acentos, em minúsculas e com qualquer
+    sequência de espaços, hífens ou apóstrofos trocada por um espaço.
+
+    Ex: "Santa Bárbara d'Oeste" -> "santa barbara d oeste"
+    """
+    sem_acentos = "".join(
+        c for c in unicodedata.normalize("NFKD", nome) if not unicodedata.combining(c)
+    )
+    return re.sub(r"[\W_]+", " ", sem_acentos.casefold()).strip()
+
+
+_tabela: Optional[TabelaMunicipios] = None
+_por_nome: Optional[Dict[Tuple[str, str], int]] = None
+
+
+def tabela() -> TabelaMunicipios:
+    """
+    Tabela dos municípios, carregada uma única vez, na primeira consulta.
+    """
+    global _tabela
+    if _tabela is None:
+        if CAMINHO_TABELA.exists():
+            _tabela = TabelaMunicipios.ler(CAMINHO_TABELA)
+        else:
+            _tabela = TabelaMunicipios.de_ibge(ler_cidades())
+    return _tabela
+
+
+def _indice_por_nome() -> Dict[Tuple[str, str], int]:
+    global _por_nome
+    if _por_nome is None:
+        _por_nome = {
+            (municipio.uf, normalizar_nome_municipio(municipio.nome)): municipio.codigo
+            for municipio in tabela()
+        }
+    return _por_nome
+
+
+def municipio_por_codigo(codigo: Union[int, str]) -> Optional[Municipio]:
+    """
+    Retorna o município com o código do IBGE informado, ou `None` se ele não
+    existir.
+    """
+    try:
+        codigo = int(codigo)
+    except ValueError:
+        return None
+    return tabela().municipio_por_codigo(codigo)
+
+
+def codigo_por_nome(uf: str, nome: str) -> Optional[int]:
+    """
+    Retorna o código do IBGE do município pelo nome, sem diferenciar
+    maiúsculas, acentos e pontuação, ou `None` se ele não existir na UF.
+
+    Ex: codigo_por_nome("SP", "sao paulo") -> 3550308
+    """
+    return _indice_por_nome().get((uf.upper(), normalizar_nome_municipio(nome)))
+
+
+def validar_codigo_cidade(codigo: Union[int, str]) -> bool:
+    try:
+        codigo = int(codigo)
+    except ValueError:
+        return False
+    return codigo in tabela()
 
 
 def normalizar_uf(uf: str) -> str:
-    cidades = ler_cidades()
     uf = uf.upper()
-    assert any(
-        cidade["regiao-imediata"]["regiao-intermediaria"]["UF"]["sigla"] == uf
-        for cidade in cidades
+    assert (
+        uf in tabela().conjunto_ufs
     ), "UF não encontrada. Insira uma UF válida no formato de sigla (ex: SP, RJ, MG, etc)"
     return uf
 
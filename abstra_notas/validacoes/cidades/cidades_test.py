@@ -0,0 +1,67 @@
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+from . import (
+    Municipio,
+    TabelaMunicipios,
+    codigo_por_nome,
+    ler_cidades,
+    municipio_por_codigo,
+    normalizar_uf,
+    validar_codigo_cidade,
+)
+
+
+class CidadesTest(TestCase):
+    def test_municipio_por_codigo(self):
+        self.assertEqual(
+            municipio_por_codigo(3550308),
+            Municipio(codigo=3550308, nome="São Paulo", uf="SP"),
+        )
+        self.assertEqual(municipio_por_codigo("2304400").nome, "Fortaleza")
+        self.assertIsNone(municipio_por_codigo(1234567))
+        self.assertIsNone(municipio_por_codigo("abc"))
+
+    def test_codigo_por_nome(self):
+        self.assertEqual(codigo_por_nome("SP", "São Paulo"), 3550308)
+        self.assertEqual(codigo_por_nome("sp", "SAO  PAULO"), 3550308)
+        self.assertEqual(codigo_por_nome("PB", "joao-pessoa"), 2507507)
+        self.assertIsNone(codigo_por_nome("RJ", "São Paulo"))
+
+    def test_validar_codigo_cidade(self):
+        self.assertTrue(validar_codigo_cidade(3304557))
+        self.assertFalse(validar_codigo_cidade(3304558))
+
+    def test_normalizar_uf(self):
+        self.assertEqual(normalizar_uf("ce"), "CE")
+        with self.assertRaises(AssertionError):
+            normalizar_uf("XX")
+
+
+class TabelaMunicipiosTest(TestCase):
+    def test_ler_e_escrever(self):
+        original = TabelaMunicipios.de_ibge(ler_cidades())
+        with TemporaryDirectory() as diretorio:
+            caminho = Path(diretorio) / "municipios.bin"
+            original.escrever(caminho)
+            tabela = TabelaMunicipios.ler(caminho)
+
+        self.assertEqual(list(tabela), list(original))
+        self.assertEqual(list(tabela.codigos), sorted(tabela.codigos))
+        self.assertEqual(
+            tabela.municipio_por_codigo(2507507),
+            Municipio(codigo=2507507, nome="João Pessoa", uf="PB"),
+        )
+        self.assertIsNone(tabela.municipio_por_codigo(0))
+        self.assertIsNone(tabela.municipio_por_codigo(9999999))
+        self.assertIn(3550308, tabela)
+        self.assertNotIn(3550309, tabela)
+        self.assertIn("SP", tabela.conjunto_ufs)
+        self.assertIs(tabela.conjunto_ufs, tabela.conjunto_ufs)
+
+    def test_arquivo_invalido(self):
+        with TemporaryDirectory() as diretorio:
+            caminho = Path(diretorio) / "municipios.bin"
+            caminho.write_bytes(b"JSON" + bytes(5))
+            with self.assertRaises(AssertionError):
+                TabelaMunicipios.ler(caminho)
@@ -0,0 +1,173 @@
+from array import array
+from bisect import bisect_left
+from dataclasses import dataclass
+from pathlib import Path
+from typing import FrozenSet, Iterable, Iterator, Optional, Tuple, Union
+import struct
+import sys
+
+MAGICO = b"MUN1"
+CABECALHO = struct.Struct("<4sIB")
+"""
+Mágico, número de municípios e número de UFs.
+"""
+
+
+@dataclass(frozen=True)
+class Municipio:
+    codigo: int
+    """
+    Código do município no IBGE.
+    """
+
+    nome: str
+    uf: str
+
+
+def _array_para_bytes(valores: array) -> bytes:
+    if sys.byteorder == "big":
+        valores = array(valores.typecode, valores)
+        valores.byteswap()
+    return valores.tobytes()
+
+
+def _array_de_bytes(dados: memoryview) -> array:
+    valores = array("I")
+    valores.frombytes(dados)
+    if sys.byteorder == "big":
+        valores.byteswap()
+    return valores
+
+
+class TabelaMunicipios:
+    """
+    Tabela compacta de municípios, ordenada por código: os códigos ficam em um
+    `array("I")`, as UFs como índices de um byte e os nomes em um único bloco
+    UTF-8. As buscas por código são binárias.
+
+    Formato do arquivo (inteiros little-endian):
+
+    - cabeçalho: `MUN1`, número de municípios (uint32) e de UFs (uint8);
+    - siglas das UFs, 2 bytes ASCII cada;
+    - códigos (uint32), em ordem crescente;
+    - índice da UF de cada município (uint8);
+    - posição inicial do nome de cada município no bloco de nomes, mais a
+      posição final do último (uint32);
+    - bloco de nomes, em UTF-8.
+    """
+
+    def __init__(
+        self,
+        codigos: array,
+        siglas: Tuple[str, ...],
+        ufs: bytes,
+        posicoes: array,
+        nomes: bytes,
+    ):
+        assert codigos.itemsize == posicoes.itemsize == 4
+        self.codigos = codigos
+        self.siglas = siglas
+        self.ufs = ufs
+        self.posicoes = posicoes
+        self.nomes = nomes
+        self._conjunto_ufs = frozenset(siglas)
+
+    @classmethod
+    def de_municipios(cls, municipios: Iterable[Municipio]) -> "TabelaMunicipios":
+        ordenados = sorted(municipios, key=lambda municipio: municipio.codigo)
+        siglas = tuple(sorted({municipio.uf for municipio in ordenados}))
+        indice_uf = {sigla: indice for indice, sigla in enumerate(siglas)}
+
+        posicoes = array("I", [0])
+        nomes = bytearray()
+        for municipio in ordenados:
+            nomes += municipio.nome.encode("utf-8")
+            posicoes.append(len(nomes))
+
+        return cls(
+            codigos=array("I", (municipio.codigo for municipio in ordenados)),
+            siglas=siglas,
+            ufs=bytes(indice_uf[municipio.uf] for municipio in ordenados),
+            posicoes=posicoes,
+            nomes=bytes(nomes),
+        )
+
+    @classmethod
+    def de_ibge(cls, cidades: Iterable[dict]) -> "TabelaMunicipios":
+        """
+        Monta a tabela a partir da lista de municípios da API do IBGE.
+        """
+        return cls.de_municipios(
+            Municipio(
+                codigo=cidade["id"],
+                nome=cidade["nome"],
+                uf=cidade["regiao-imediata"]["regiao-intermediaria"]["UF"]["sigla"],
+            )
+            for cidade in cidades
+        )
+
+    @classmethod
+    def ler(cls, caminho: Union[str, Path]) -> "TabelaMunicipios":
+        dados = memoryview(Path(caminho).read_bytes())
+        magico, quantidade, quantidade_ufs = CABECALHO.unpack_from(dados)
+        assert magico == MAGICO, f"Arquivo de municípios inválido: {caminho}"
+
+        inicio = CABECALHO.size
+        fim = inicio + 2 * quantidade_ufs
+        siglas = bytes(dados[inicio:fim]).decode("ascii")
+        inicio, fim = fim, fim + 4 * quantidade
+        codigos = _array_de_bytes(dados[inicio:fim])
+        inicio, fim = fim, fim + quantidade
+        ufs = bytes(dados[inicio:fim])
+        inicio, fim = fim, fim + 4 * (quantidade + 1)
+        posicoes = _array_de_bytes(dados[inicio:fim])
+
+        return cls(
+            codigos=codigos,
+            siglas=tuple(siglas[i : i + 2] for i in range(0, len(siglas), 2)),
+            ufs=ufs,
+            posicoes=posicoes,
+            nomes=bytes(dados[fim:]),
+        )
+
+    def escrever(self, caminho: Union[str, Path]):
+        Path(caminho).write_bytes(
+            CABECALHO.pack(MAGICO, len(self), len(self.siglas))
+            + "".join(self.siglas).encode("ascii")
+            + _array_para_bytes(self.codigos)
+            + self.ufs
+            + _array_para_bytes(self.posicoes)
+            + self.nomes
+        )
+
+    def __len__(self) -> int:
+        return len(self.codigos)
+
+    def __iter__(self) -> Iterator[Municipio]:
+        return (self._municipio(indice) for indice in range(len(self)))
+
+    def _municipio(self, indice: int) -> Municipio:
+        return Municipio(
+            codigo=self.codigos[indice],
+            nome=self.nomes[
+                self.posicoes[indice] : self.posicoes[indice + 1]
+            ].decode("utf-8"),
+            uf=self.siglas[self.ufs[indice]],
+        )
+
+    def _indice(self, codigo: int) -> Optional[int]:
+        indice = bisect_left(self.codigos, codigo)
+        if indice < len(self) and self.codigos[indice] == codigo:
+            return indice
+        return None
+
+    def municipio_por_codigo(self, codigo: int) -> Optional[Municipio]:
+        indice = self._indice(codigo)
+        return self._municipio(indice) if indice is not None else None
+
+    def __contains__(self, codigo: int) -> bool:
+        return self._indice(codigo) is not None
+
+    @property
+    def conjunto_ufs(self) -> FrozenSet[str]:
+        return self._conjunto_ufs
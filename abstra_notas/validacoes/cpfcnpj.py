@@ -1,25 +1,42 @@
-from .cpf import cpf_valido, normalizar_cpf
-from .cnpj import cnpj_valido, normalizar_cnpj
-from typing import Literal
+from .cpf import CpfInvalido, normalizar_cpf
+from .cnpj import CnpjInvalido, normalizar_cnpj
+from functools import lru_cache
+from typing import Literal, Optional, Tuple
 
+TipoDocumento = Literal["CPF", "CNPJ"]
 
-def cpf_ou_cnpj(valor: str, optional=False) -> Literal["CPF", "CNPJ", None]:
+
+@lru_cache(maxsize=4096)
+def _classificar(valor: str) -> Tuple[str, TipoDocumento]:
+    try:
+        return normalizar_cpf(valor), "CPF"
+    except CpfInvalido:
+        pass
+    try:
+        return normalizar_cnpj(valor), "CNPJ"
+    except CnpjInvalido:
+        raise ValueError("Valor não é um CPF ou CNPJ válido.") from None
+
+
+def classificar_cpf_ou_cnpj(
+    valor: str, optional=False
+) -> Tuple[Optional[str], Optional[TipoDocumento]]:
+    """
+    Normaliza o documento e identifica seu tipo com uma única validação.
+
+    Os resultados ficam em cache, já que os mesmos remetentes e tomadores se
+    repetem em milhares de notas.
+
+    Ex: classificar_cpf_ou_cnpj("083.941.150-20") -> ("08394115020", "CPF")
+    """
     if valor is None and optional:
-        return None
-    if cpf_valido(valor):
-        return "CPF"
-    elif cnpj_valido(valor):
-        return "CNPJ"
-    else:
-        raise ValueError("Valor não é um CPF ou CNPJ válido.")
+        return None, None
+    return _classificar(valor)
+
+
+def cpf_ou_cnpj(valor: str, optional=False) -> Literal["CPF", "CNPJ", None]:
+    return classificar_cpf_ou_cnpj(valor, optional)[1]
 
 
 def normalizar_cpf_ou_cnpj(valor: str, optional=False) -> str:
-    if valor is None and optional:
-        return None
-    if cpf_valido(valor):
-        return normalizar_cpf(valor)
-    elif cnpj_valido(valor):
-        return normalizar_cnpj(valor)
-    else:
-        raise ValueError("Valor não é um CPF ou CNPJ válido.")
+    return classificar_cpf_ou_cnpj(valor, optional)[0]
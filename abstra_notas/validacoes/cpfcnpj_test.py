@@ -0,0 +1,21 @@
+from unittest import TestCase
+from .cpfcnpj import _classificar, classificar_cpf_ou_cnpj, cpf_ou_cnpj
+
+
+class TestCpfOuCnpj(TestCase):
+    def test_classificar(self):
+        self.assertEqual(
+            classificar_cpf_ou_cnpj("083.941.150-20"), ("08394115020", "CPF")
+        )
+        self.assertEqual(
+            classificar_cpf_ou_cnpj("02.981.391/0001-06"), ("02981391000106", "CNPJ")
+        )
+        self.assertEqual(classificar_cpf_ou_cnpj(None, optional=True), (None, None))
+        with self.assertRaises(ValueError):
+            classificar_cpf_ou_cnpj("02981391000107")
+
+    def test_cache(self):
+        _classificar.cache_clear()
+        for _ in range(3):
+            self.assertEqual(cpf_ou_cnpj("08394115020"), "CPF")
+        self.assertEqual(_classificar.cache_info().hits, 2)
@@ -0,0 +1,176 @@
+from operator import mul
+from typing import Iterable, List, Literal, NamedTuple, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+Pesos = Tuple[Tuple[int, ...], Tuple[int, ...]]
+
+PESOS_CPF: Pesos = (
+    (1, 2, 3, 4, 5, 6, 7, 8, 9, 0, 0),
+    (0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 0),
+)
+"""
+Pesos do primeiro e do segundo dígito verificador, para cada um dos 11 dígitos
+do CPF.
+"""
+
+PESOS_CNPJ: Pesos = (
+    (6, 7, 8, 9, 2, 3, 4, 5, 6, 7, 8, 9, 0, 0),
+    (5, 6, 7, 8, 9, 2, 3, 4, 5, 6, 7, 8, 9, 0),
+)
+"""
+Pesos do primeiro e do segundo dígito verificador, para cada um dos 14 dígitos
+do CNPJ.
+"""
+
+_SEM_FORMATACAO = str.maketrans("", "", ".-/")
+
+
+class Documentos(NamedTuple):
+    validos: Sequence[bool]
+    """
+    Máscara com os documentos válidos.
+    """
+
+    normalizados: Sequence[Optional[str]]
+    """
+    Documentos sem formatação, ou `None` para os inválidos.
+    """
+
+
+class DocumentosClassificados(NamedTuple):
+    tipos: Sequence[Literal["CPF", "CNPJ", None]]
+    """
+    Tipo de cada documento, ou `None` para os inválidos.
+    """
+
+    normalizados: Sequence[Optional[str]]
+    """
+    Documentos sem formatação, ou `None` para os inválidos.
+    """
+
+
+def _limpar(valores: Iterable[str]) -> List[str]:
+    return [
+        valor.translate(_SEM_FORMATACAO) if isinstance(valor, str) else ""
+        for valor in valores
+    ]
+
+
+def _mascara_python(documentos: List[str], pesos: Pesos) -> List[bool]:
+    tamanho = len(pesos[0])
+    pesos_1, pesos_2 = pesos
+    # Os dígitos são lidos como bytes ASCII, com "0" valendo 48: o excesso
+    # 48 * sum(pesos) é descontado das somas.
+    excesso_1, excesso_2 = 48 * sum(pesos_1), 48 * sum(pesos_2)
+
+    mascara = []
+    for documento in documentos:
+        if len(documento) != tamanho or not (documento.isascii() and documento.isdigit()):
+            mascara.append(False)
+            continue
+        digitos = documento.encode("ascii")
+        dv_1 = (sum(map(mul, pesos_1, digitos)) - excesso_1) % 11 % 10
+        dv_2 = (sum(map(mul, pesos_2, digitos)) - excesso_2) % 11 % 10
+        mascara.append(digitos[-2] - 48 == dv_1 and digitos[-1] - 48 == dv_2)
+    return mascara
+
+
+def _mascara_numpy(documentos: List[str], pesos: Pesos) -> "np.ndarray":
+    tamanho = len(pesos[0])
+    mascara = np.zeros(len(documentos), dtype=bool)
+    indices = [i for i, documento in enumerate(documentos) if len(documento) == tamanho]
+    if not indices:
+        return mascara
+
+    # Caracteres fora do ASCII viram "?", preservando o tamanho de cada linha,
+    # e são rejeitados junto com os demais caracteres que não são dígitos.
+    texto = "".join([documentos[i] for i in indices]).encode("ascii", "replace")
+    digitos = (
+        np.frombuffer(texto, dtype=np.uint8)
+        .reshape(len(indices), tamanho)
+        .astype(np.int64)
+        - 48
+    )
+    dvs = digitos @ np.array(pesos, dtype=np.int64).T % 11 % 10
+    mascara[indices] = ((digitos >= 0) & (digitos <= 9)).all(axis=1) & (
+        dvs == digitos[:, -2:]
+    ).all(axis=1)
+    return mascara
+
+
+def _mascara(documentos: List[str], pesos: Pesos) -> Sequence[bool]:
+    if np is not None:
+        return _mascara_numpy(documentos, pesos)
+    return _mascara_python(documentos, pesos)
+
+
+def _saida(valores, resultado: List) -> Sequence:
+    if np is not None and isinstance(valores, np.ndarray):
+        saida = np.empty(len(resultado), dtype=object)
+        saida[:] = resultado
+        return saida
+    return resultado
+
+
+def _validar(valores: Iterable[str], pesos: Pesos) -> Documentos:
+    documentos = _limpar(valores)
+    mascara = _mascara(documentos, pesos)
+    normalizados = [
+        documento if valido else None for documento, valido in zip(documentos, mascara)
+    ]
+    if np is not None and isinstance(valores, np.ndarray):
+        return Documentos(np.asarray(mascara, dtype=bool), _saida(valores, normalizados))
+    return Documentos([bool(valido) for valido in mascara], normalizados)
+
+
+def validar_cpfs(valores: Iterable[str]) -> Documentos:
+    """
+    Valida vários CPFs de uma vez, com as mesmas regras de `normalizar_cpf`.
+
+    Os dígitos verificadores de todos os documentos são calculados juntos,
+    multiplicando a matriz de dígitos pela matriz de pesos. Com o NumPy
+    instalado (`pip install abstra_notas[numpy]`) a multiplicação é
+    vetorizada; sem ele, é feita em Python puro, com os mesmos pesos.
+
+    Se `valores` for um array do NumPy, o resultado também será: a máscara com
+    `dtype=bool` e os normalizados com `dtype=object`. Caso contrário, listas.
+    """
+    return _validar(valores, PESOS_CPF)
+
+
+def validar_cnpjs(valores: Iterable[str]) -> Documentos:
+    """
+    Valida vários CNPJs de uma vez, com as mesmas regras de `normalizar_cnpj`.
+    Veja `validar_cpfs`.
+    """
+    return _validar(valores, PESOS_CNPJ)
+
+
+def classificar_documentos(valores: Iterable[str]) -> DocumentosClassificados:
+    """
+    Versão em lote de `cpf_ou_cnpj` e `normalizar_cpf_ou_cnpj`: classifica cada
+    valor como CPF ou CNPJ pelo número de dígitos, validando cada grupo de uma
+    vez, em vez de testar os dois tipos em cada valor.
+
+    Assim como em `validar_cpfs`, o resultado é um array do NumPy se `valores`
+    também for.
+    """
+    documentos = _limpar(valores)
+    tipos: List[Optional[str]] = [None] * len(documentos)
+    normalizados: List[Optional[str]] = [None] * len(documentos)
+
+    for tipo, pesos in (("CPF", PESOS_CPF), ("CNPJ", PESOS_CNPJ)):
+        indices = [
+            i for i, documento in enumerate(documentos) if len(documento) == len(pesos[0])
+        ]
+        mascara = _mascara([documentos[i] for i in indices], pesos)
+        for i, valido in zip(indices, mascara):
+            if valido:
+                tipos[i] = tipo
+                normalizados[i] = documentos[i]
+
+    return DocumentosClassificados(_saida(valores, tipos), _saida(valores, normalizados))
@@ -0,0 +1,82 @@
+from random import Random
+from unittest import TestCase, skipIf
+from unittest.mock import patch
+from . import documentos
+from .cpfcnpj import normalizar_cpf_ou_cnpj
+from .documentos import classificar_documentos, validar_cnpjs, validar_cpfs
+
+VALORES = [
+    "083.941.150-20",
+    "08394115020",
+    "08394115021",
+    "02.981.391/0001-06",
+    "02981391000106",
+    "02981391000107",
+    "123",
+    "",
+    "0839411502a",
+    "0839411502²",
+    None,
+]
+
+
+def scalar(valor):
+    try:
+        return normalizar_cpf_ou_cnpj(valor)
+    except (ValueError, AttributeError):
+        return None
+
+
+class DocumentosTest(TestCase):
+    def test_validar_cpfs(self):
+        resultado = validar_cpfs(["083.941.150-20", "08394115021", "02981391000106"])
+        self.assertEqual(resultado.validos, [True, False, False])
+        self.assertEqual(resultado.normalizados, ["08394115020", None, None])
+
+    def test_validar_cnpjs(self):
+        resultado = validar_cnpjs(["02.981.391/0001-06", "02981391000107", "08394115020"])
+        self.assertEqual(resultado.validos, [True, False, False])
+        self.assertEqual(resultado.normalizados, ["02981391000106", None, None])
+
+    def test_classificar_documentos(self):
+        resultado = classificar_documentos(VALORES)
+        self.assertEqual(
+            resultado.tipos,
+            ["CPF", "CPF", None, "CNPJ", "CNPJ", None, None, None, None, None, None],
+        )
+        self.assertEqual(resultado.normalizados, [scalar(valor) for valor in VALORES])
+
+    def test_igual_a_validacao_individual(self):
+        aleatorio = Random(0)
+        valores = [
+            "".join(aleatorio.choice("0123456789") for _ in range(tamanho))
+            for tamanho in [11, 14] * 500
+        ]
+        # E os mesmos documentos com os dígitos verificadores corretos.
+        valores += [
+            next(
+                corrigido
+                for corrigido in (valor[:-2] + f"{dv:02}" for dv in range(100))
+                if scalar(corrigido)
+            )
+            for valor in valores
+        ]
+        with patch.object(documentos, "np", None):
+            self.assertEqual(
+                classificar_documentos(valores).normalizados,
+                [scalar(valor) for valor in valores],
+            )
+
+    @skipIf(documentos.np is None, "NumPy não instalado")
+    def test_numpy(self):
+        np = documentos.np
+        resultado = classificar_documentos(np.array(VALORES[:-1]))
+        self.assertIsInstance(resultado.tipos, np.ndarray)
+        self.assertEqual(
+            resultado.normalizados.tolist(), [scalar(valor) for valor in VALORES[:-1]]
+        )
+        cpfs = validar_cpfs(np.array(VALORES[:-1]))
+        self.assertEqual(cpfs.validos.dtype, bool)
+        self.assertEqual(
+            cpfs.validos.tolist(), [True, True] + [False] * (len(VALORES) - 3)
+        )
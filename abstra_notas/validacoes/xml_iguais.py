@@ -1,4 +1,4 @@
-from lxml.etree import ElementBase
+from lxml.etree import ElementBase, XMLParser, fromstring, tostring
 from typing import List
 
 
@@ -39,3 +39,16 @@ def assert_xml_iguais(
     else:
         for c1, c2 in zip(xml1, xml2):
             assert_xml_iguais(c1, c2, path + [xml1.tag], ignorar_tags=ignorar_tags)
+
+
+def assert_c14n_iguais(xml1: ElementBase, xml2: ElementBase):
+    """
+    Compara a forma canônica (C14N) dos dois XMLs, desconsiderando os textos
+    formados apenas por espaços entre elementos, como a indentação.
+    """
+    parser = XMLParser(remove_blank_text=True)
+    c14n1, c14n2 = (
+        tostring(fromstring(tostring(xml), parser), method="c14n")
+        for xml in (xml1, xml2)
+    )
+    assert c14n1 == c14n2, f"XMLs canônicos diferentes:\n{c14n1}\n!=\n{c14n2}"
@@ -0,0 +1,83 @@
+from abstra_notas.assinatura import Assinador, gerar_pfx_autoassinado
+from cryptography.hazmat.primitives import serialization, hashes
+from cryptography.hazmat.primitives.asymmetric import padding
+from lxml.etree import fromstring
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from timeit import timeit
+import xmlsec
+
+"""
+Compara o custo por assinatura de recarregar a chave a cada chamada (como o
+Assinador fazia antes) com o de reaproveitar a chave já carregada.
+
+Uso, a partir da raiz do repositório: python -m benchmarks.assinatura
+"""
+
+REPETICOES = 200
+
+XML = (
+    "<PedidoEnvioLoteRPS><Cabecalho Versao='1'><CPFCNPJRemetente>"
+    "<CNPJ>99999997000100</CNPJ></CPFCNPJRemetente></Cabecalho>"
+    + "<RPS><Assinatura>x</Assinatura><ValorServicos>1.00</ValorServicos></RPS>" * 50
+    + "</PedidoEnvioLoteRPS>"
+)
+DADOS = b"12345678OL03  000000000001120150101NN00000000000205000000000000000002685"
+
+
+def assinar_xml_recarregando(assinador: Assinador):
+    element = fromstring(XML)
+    key = xmlsec.Key.from_memory(
+        assinador.private_key_pem_bytes, format=xmlsec.constants.KeyDataFormatPem
+    )
+    signature_node = xmlsec.template.create(
+        element,
+        c14n_method=xmlsec.constants.TransformInclC14N,
+        sign_method=xmlsec.constants.TransformRsaSha1,
+    )
+    element.append(signature_node)
+    ref = xmlsec.template.add_reference(
+        signature_node, xmlsec.constants.TransformSha1, uri=""
+    )
+    xmlsec.template.add_transform(ref, xmlsec.constants.TransformEnveloped)
+    xmlsec.template.add_transform(ref, xmlsec.constants.TransformInclC14N)
+    key_info = xmlsec.template.ensure_key_info(signature_node)
+    xmlsec.template.add_x509_data(key_info)
+    ctx = xmlsec.SignatureContext()
+    ctx.key = key
+    ctx.key.load_cert_from_memory(
+        assinador.cert_pem_bytes, xmlsec.constants.KeyDataFormatPem
+    )
+    ctx.sign(signature_node)
+
+
+def assinar_bytes_recarregando(assinador: Assinador):
+    private_key = serialization.load_pem_private_key(
+        assinador.private_key_pem_bytes, password=None
+    )
+    private_key.sign(DADOS, padding.PKCS1v15(), hashes.SHA1())
+
+
+def medir(nome: str, antes, depois):
+    tempo_antes = timeit(antes, number=REPETICOES) / REPETICOES * 1000
+    tempo_depois = timeit(depois, number=REPETICOES) / REPETICOES * 1000
+    print(
+        f"{nome:<22} antes: {tempo_antes:7.3f} ms  depois: {tempo_depois:7.3f} ms"
+        f"  ({tempo_antes / tempo_depois:.1f}x)"
+    )
+
+
+with TemporaryDirectory() as diretorio:
+    caminho_pfx = gerar_pfx_autoassinado(Path(diretorio) / "certificado.pfx", "senha")
+    assinador = Assinador(caminho_pfx, "senha")
+
+    medir(
+        "assinar_xml",
+        lambda: assinar_xml_recarregando(assinador),
+        lambda: assinador.assinar_xml(fromstring(XML)),
+    )
+    medir(
+        "assinar_bytes_rsa_sh1",
+        lambda: assinar_bytes_recarregando(assinador),
+        lambda: assinador.assinar_bytes_rsa_sh1(DADOS),
+    )
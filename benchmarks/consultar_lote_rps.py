@@ -0,0 +1,166 @@
+from abstra_notas.nfse.ce import fortaleza
+from abstra_notas.nfse.rj import rio_de_janeiro
+from lxml.etree import ElementBase, fromstring
+from time import perf_counter
+from unittest.mock import patch
+
+"""
+Compara o tempo de ler um ConsultarLoteRpsResposta com 50 notas, em Fortaleza
+e no Rio de Janeiro, buscando os elementos com uma expressão XPath
+`local-name()` montada a cada chamada (como o `find_element` fazia antes) com o
+de buscá-los com o filtro de tags `{*}` do lxml.
+
+Uso, a partir da raiz do repositório: python -m benchmarks.consultar_lote_rps
+"""
+
+NOTAS = 50
+REPETICOES = 20
+
+COMP_NFSE = """
+    <CompNfse>
+      <tipos:Nfse>
+        <tipos:InfNfse Id="nfse{numero}">
+          <tipos:Numero>{numero}</tipos:Numero>
+          <tipos:CodigoVerificacao>ABCD1234</tipos:CodigoVerificacao>
+          <tipos:DataEmissao>2021-06-01T10:00:00</tipos:DataEmissao>
+          <tipos:IdentificacaoRps>
+            <tipos:Numero>{numero}</tipos:Numero>
+            <tipos:Serie>A</tipos:Serie>
+            <tipos:Tipo>1</tipos:Tipo>
+          </tipos:IdentificacaoRps>
+          <tipos:DataEmissaoRps>2021-06-01</tipos:DataEmissaoRps>
+          <tipos:NaturezaOperacao>1</tipos:NaturezaOperacao>
+          <tipos:OptanteSimplesNacional>2</tipos:OptanteSimplesNacional>
+          <tipos:IncentivadorCultural>2</tipos:IncentivadorCultural>
+          <tipos:Competencia>2021-06-01T00:00:00</tipos:Competencia>
+          <tipos:Servico>
+            <tipos:Valores>
+              <tipos:ValorServicos>1000.00</tipos:ValorServicos>
+              <tipos:ValorDeducoes>0.00</tipos:ValorDeducoes>
+              <tipos:ValorPis>0.00</tipos:ValorPis>
+              <tipos:ValorCofins>0.00</tipos:ValorCofins>
+              <tipos:ValorInss>0.00</tipos:ValorInss>
+              <tipos:ValorIr>0.00</tipos:ValorIr>
+              <tipos:ValorCsll>0.00</tipos:ValorCsll>
+              <tipos:IssRetido>2</tipos:IssRetido>
+              <tipos:ValorIss>50.00</tipos:ValorIss>
+              <tipos:BaseCalculo>1000.00</tipos:BaseCalculo>
+              <tipos:Aliquota>0.05</tipos:Aliquota>
+              <tipos:ValorLiquidoNfse>1000.00</tipos:ValorLiquidoNfse>
+            </tipos:Valores>
+            <tipos:ItemListaServico>0107</tipos:ItemListaServico>
+            <tipos:CodigoTributacaoMunicipio>620910000</tipos:CodigoTributacaoMunicipio>
+            <tipos:Discriminacao>Desenvolvimento de software</tipos:Discriminacao>
+            <tipos:CodigoMunicipio>2304400</tipos:CodigoMunicipio>
+          </tipos:Servico>
+          <tipos:ValorCredito>0.00</tipos:ValorCredito>
+          <tipos:PrestadorServico>
+            <tipos:IdentificacaoPrestador>
+              <tipos:Cnpj>11222333000181</tipos:Cnpj>
+              <tipos:InscricaoMunicipal>12345</tipos:InscricaoMunicipal>
+            </tipos:IdentificacaoPrestador>
+            <tipos:RazaoSocial>PRESTADOR LTDA</tipos:RazaoSocial>
+            <tipos:Endereco>
+              <tipos:Endereco>RUA TESTE</tipos:Endereco>
+              <tipos:Numero>100</tipos:Numero>
+              <tipos:Bairro>CENTRO</tipos:Bairro>
+              <tipos:CodigoMunicipio>2304400</tipos:CodigoMunicipio>
+              <tipos:Uf>CE</tipos:Uf>
+              <tipos:Cep>60000000</tipos:Cep>
+            </tipos:Endereco>
+            <tipos:Contato>
+              <tipos:Telefone>8531010001</tipos:Telefone>
+              <tipos:Email>prestador@exemplo.com.br</tipos:Email>
+            </tipos:Contato>
+          </tipos:PrestadorServico>
+          <tipos:TomadorServico>
+            <tipos:IdentificacaoTomador>
+              <tipos:CpfCnpj>
+                <tipos:Cnpj>11444777000161</tipos:Cnpj>
+              </tipos:CpfCnpj>
+            </tipos:IdentificacaoTomador>
+            <tipos:RazaoSocial>TOMADOR LTDA</tipos:RazaoSocial>
+            <tipos:Endereco>
+              <tipos:Endereco>AVENIDA TESTE</tipos:Endereco>
+              <tipos:Numero>200</tipos:Numero>
+              <tipos:Bairro>ALDEOTA</tipos:Bairro>
+              <tipos:CodigoMunicipio>2304400</tipos:CodigoMunicipio>
+              <tipos:Uf>CE</tipos:Uf>
+              <tipos:Cep>60150000</tipos:Cep>
+            </tipos:Endereco>
+            <tipos:Contato>
+              <tipos:Telefone>8532220002</tipos:Telefone>
+              <tipos:Email>tomador@exemplo.com.br</tipos:Email>
+            </tipos:Contato>
+          </tipos:TomadorServico>
+          <tipos:OrgaoGerador>
+            <tipos:CodigoMunicipio>2304400</tipos:CodigoMunicipio>
+            <tipos:Uf>CE</tipos:Uf>
+          </tipos:OrgaoGerador>
+        </tipos:InfNfse>
+      </tipos:Nfse>
+    </CompNfse>"""
+
+RESPOSTA = """<ConsultarLoteRpsResposta xmlns="{namespace}" xmlns:tipos="{tipos}">
+  <ListaNfse>{notas}
+  </ListaNfse>
+</ConsultarLoteRpsResposta>"""
+
+NAMESPACES = {
+    fortaleza: (
+        "http://www.ginfes.com.br/servico_consultar_lote_rps_resposta_v03.xsd",
+        "http://www.ginfes.com.br/tipos_v03.xsd",
+    ),
+    rio_de_janeiro: (
+        "http://www.abrasf.org.br/ABRASF/arquivos/nfse.xsd",
+        "http://www.abrasf.org.br/ABRASF/arquivos/nfse.xsd",
+    ),
+}
+
+
+def find_element_xpath(parent: ElementBase, tag_name: str):
+    element = parent.find(tag_name)
+    if element is not None:
+        return element
+    elements = parent.xpath(f".//*[local-name()='{tag_name}']")
+    if elements:
+        return elements[0]
+    for elem in parent.iter():
+        if elem.tag.split("}")[-1] == tag_name:
+            return elem
+    return None
+
+
+def find_all_elements_xpath(parent: ElementBase, tag_name: str):
+    elements = parent.findall(f".//{tag_name}")
+    if elements:
+        return elements
+    return parent.xpath(f".//*[local-name()='{tag_name}']")
+
+
+def medir(modulo, xml: ElementBase) -> float:
+    inicio = perf_counter()
+    for _ in range(REPETICOES):
+        resposta = modulo.ConsultarLoteRpsResposta.from_xml(xml)
+    duracao = (perf_counter() - inicio) / REPETICOES
+    assert len(resposta.comp_nfse) == NOTAS
+    return duracao
+
+
+for modulo, (namespace, tipos) in NAMESPACES.items():
+    xml = fromstring(
+        RESPOSTA.format(
+            namespace=namespace,
+            tipos=tipos,
+            notas="".join(COMP_NFSE.format(numero=n) for n in range(1, NOTAS + 1)),
+        )
+    )
+    with patch.object(modulo, "find_element", find_element_xpath), patch.object(
+        modulo, "find_all_elements", find_all_elements_xpath
+    ):
+        antes = medir(modulo, xml)
+    depois = medir(modulo, xml)
+
+    nome = modulo.__name__.rpartition(".")[2]
+    print(f"{nome}, {NOTAS} notas com XPath local-name(): {antes * 1000:.1f} ms")
+    print(f"{nome}, {NOTAS} notas com o filtro de tags: {depois * 1000:.1f} ms")
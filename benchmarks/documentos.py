@@ -0,0 +1,57 @@
+from abstra_notas.validacoes import documentos
+from abstra_notas.validacoes.cpfcnpj import normalizar_cpf_ou_cnpj
+from abstra_notas.validacoes.documentos import PESOS_CNPJ, PESOS_CPF, classificar_documentos
+from random import Random
+from time import perf_counter
+from unittest.mock import patch
+
+"""
+Compara o tempo de classificar e normalizar 200 mil CPFs e CNPJs, metade
+inválidos, um a um com `normalizar_cpf_ou_cnpj` e em lote com
+`classificar_documentos`, com e sem o NumPy.
+
+Uso, a partir da raiz do repositório: python -m benchmarks.documentos
+"""
+
+QUANTIDADE = 200_000
+
+
+def gerar(aleatorio: Random, pesos) -> str:
+    digitos = [aleatorio.randrange(10) for _ in range(len(pesos[0]) - 2)]
+    for pesos_dv in pesos:
+        digitos.append(sum(map(int.__mul__, pesos_dv, digitos)) % 11 % 10)
+    if aleatorio.random() < 0.5:
+        digitos[-1] = (digitos[-1] + 1) % 10
+    return "".join(map(str, digitos))
+
+
+aleatorio = Random(0)
+valores = [
+    gerar(aleatorio, PESOS_CPF if i % 2 else PESOS_CNPJ) for i in range(QUANTIDADE)
+]
+
+
+def individual():
+    for valor in valores:
+        try:
+            normalizar_cpf_ou_cnpj(valor)
+        except ValueError:
+            pass
+
+
+def medir(funcao) -> float:
+    inicio = perf_counter()
+    funcao()
+    return perf_counter() - inicio
+
+
+print(f"{QUANTIDADE} documentos, um a um: {medir(individual):.2f} s")
+with patch.object(documentos, "np", None):
+    tempo = medir(lambda: classificar_documentos(valores))
+print(f"{QUANTIDADE} documentos, em lote (Python puro): {tempo:.2f} s")
+if documentos.np is not None:
+    array = documentos.np.array(valores)
+    tempo = medir(lambda: classificar_documentos(array))
+    print(f"{QUANTIDADE} documentos, em lote (NumPy): {tempo:.2f} s")
+else:
+    print("NumPy não instalado: pip install abstra_notas[numpy]")
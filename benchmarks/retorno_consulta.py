@@ -0,0 +1,64 @@
+from abstra_notas.nfse.sp.sao_paulo import consulta
+from abstra_notas.nfse.sp.sao_paulo.consulta import RetornoConsulta, find_text
+from copy import deepcopy
+from dateutil.parser import parse
+from lxml.etree import fromstring
+from pathlib import Path
+from time import perf_counter
+from unittest.mock import patch
+
+"""
+Compara o tempo de ler um RetornoConsulta com 5 mil notas buscando cada campo
+com `find_text` e as datas com o `dateutil` (como o `RetornoNFe.ler_xml` fazia
+antes) com o de ler todos os campos de cada nota em uma única passada.
+
+Uso, a partir da raiz do repositório: python -m benchmarks.retorno_consulta
+"""
+
+QUANTIDADE = 5_000
+
+EXEMPLO = (
+    Path(consulta.__file__).parent / "exemplos" / "RetornoConsulta.xml"
+).read_bytes()
+
+
+class TextosComFind:
+    def __init__(self, xml):
+        self.xml = xml
+
+    def get(self, caminho):
+        return find_text(self.xml, f".//{caminho}")
+
+
+def optional_date_dateutil(arg):
+    return parse(arg).date() if arg is not None else None
+
+
+def montar_retorno():
+    retorno = fromstring(EXEMPLO)
+    notas = retorno.findall("NFe")
+    for nota in notas:
+        retorno.remove(nota)
+    for i in range(QUANTIDADE):
+        retorno.append(deepcopy(notas[i % len(notas)]))
+    return retorno
+
+
+def medir() -> float:
+    inicio = perf_counter()
+    resultado = RetornoConsulta.ler_xml(RETORNO)
+    duracao = perf_counter() - inicio
+    assert len(resultado.lista_nfe) == QUANTIDADE
+    return duracao
+
+
+RETORNO = montar_retorno()
+
+with patch.object(consulta, "_textos", TextosComFind), patch.object(
+    consulta, "optional_date", optional_date_dateutil
+):
+    antes = medir()
+depois = medir()
+
+print(f"{QUANTIDADE} notas com find_text e dateutil: {antes:.2f} s")
+print(f"{QUANTIDADE} notas em uma única passada: {depois:.2f} s")
@@ -0,0 +1,74 @@
+from abstra_notas.nfse.sp.sao_paulo import templates
+from abstra_notas.nfse.sp.sao_paulo.envio_rps import RPS
+from datetime import date
+from jinja2 import Template
+from pathlib import Path
+from time import perf_counter
+from unittest.mock import patch
+
+"""
+Compara o tempo de gerar o XML de 10 mil RPS compilando o template a cada
+chamada (como o `load_template` fazia antes) com o de reaproveitar o template
+já compilado.
+
+Uso, a partir da raiz do repositório: python -m benchmarks.templates
+"""
+
+QUANTIDADE = 10_000
+
+# A assinatura é informada já calculada para medir apenas a renderização.
+ASSINATURA = "A" * 344
+
+RPS_EXEMPLO = RPS(
+    inscricao_prestador="39617106",
+    serie_rps="BB",
+    numero_rps=4102,
+    tipo_rps="RPS",
+    data_emissao=date(2015, 1, 20),
+    status_rps="N",
+    tributacao_rps="T",
+    valor_servicos_centavos=100_00,
+    valor_deducoes_centavos=0,
+    valor_pis_centavos=1_01,
+    valor_cofins_centavos=1_02,
+    valor_inss_centavos=1_03,
+    valor_ir_centavos=1_04,
+    valor_csll_centavos=1_05,
+    codigo_servico=7811,
+    aliquota_servicos=0.05,
+    iss_retido=False,
+    tomador="99999999727",
+    razao_social_tomador="ANTONIO PRUDENTE",
+    endereco_tipo_logradouro="RUA",
+    endereco_logradouro="PEDRO AMERICO",
+    endereco_numero=1,
+    endereco_complemento="1 ANDAR",
+    endereco_bairro="CENTRO",
+    endereco_cidade=3550308,
+    endereco_uf="SP",
+    endereco_cep="00001045",
+    email_tomador="teste@teste.com",
+    discriminacao="Nota Fiscal de Teste Emitida por Cliente Web",
+)
+
+
+def load_template_compilando(class_name) -> Template:
+    with open(Path(templates.__file__).parent / f"{class_name}.xml") as file:
+        return Template(file.read())
+
+
+def medir() -> float:
+    inicio = perf_counter()
+    for _ in range(QUANTIDADE):
+        RPS_EXEMPLO.gerar_string_xml(None, assinatura=ASSINATURA)
+    return perf_counter() - inicio
+
+
+with patch(
+    "abstra_notas.nfse.sp.sao_paulo.envio_rps.load_template", load_template_compilando
+):
+    antes = medir()
+depois = medir()
+
+print(f"{QUANTIDADE} RPS compilando o template: {antes:.2f} s")
+print(f"{QUANTIDADE} RPS com o template em cache: {depois:.2f} s")
@@ -39,8 +39,12 @@ setup(
     url="https://github.com/abstra-app/abstra_notas",
     packages=find_packages(exclude=["tests"]),
     install_requires=REQUIREMENTS,
+    extras_require={
+        "async": ["httpx"],
+        "numpy": ["numpy"],
+    },
     package_data={
-        "": ["*.xml", "*.json"],
+        "": ["*.xml", "*.json", "*.wsdl", "*.bin"],
     },
     include_package_data=True,
 )